@@ -9,6 +9,15 @@ from models.stock_alert import StockAlert
 from models.payment import Payment
 from models.bill_item import BillItem
 from models.bill import Bill
+from models.bill_number_counter import BillNumberCounter
+from models.bill_daily_stats import BillDailyStats
+from models.product_sales_daily import ProductSalesDaily
+from models.catalog_version import CatalogVersion
+from models.product_read_model import ProductReadModel
+from models.product_tombstone import ProductTombstone
+from models.job import Job
+from models.outbox_message import OutboxMessage
+from models.idempotency_key import IdempotencyKey
 from models.product import Product
 from models.category import Category
 from models.client import Client
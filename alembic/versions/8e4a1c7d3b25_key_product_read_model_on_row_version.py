@@ -0,0 +1,52 @@
+"""key product_read_model freshness on products.row_version
+
+Revision ID: 8e4a1c7d3b25
+Revises: 7d2f4b8e1a39
+Create Date: 2026-10-18 09:12:44.203117
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "8e4a1c7d3b25"
+down_revision: Union[str, None] = "7d2f4b8e1a39"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "product_read_model", sa.Column("product_row_version", sa.BigInteger(), nullable=True)
+    )
+    # keep the blobs that are still fresh; the others are rebuilt on the
+    # next write (or with `python -m utils.product_read_model rebuild`)
+    op.execute(
+        """
+        UPDATE product_read_model AS m
+        SET product_row_version = p.row_version
+        FROM products AS p
+        WHERE p.id = m.product_id
+          AND m.product_updated_at = coalesce(p.updated_at, p.created_at)
+        """
+    )
+    op.drop_column("product_read_model", "product_updated_at")
+
+
+def downgrade() -> None:
+    op.add_column(
+        "product_read_model",
+        sa.Column("product_updated_at", sa.DateTime(timezone=True), nullable=True),
+    )
+    op.execute(
+        """
+        UPDATE product_read_model AS m
+        SET product_updated_at = coalesce(p.updated_at, p.created_at)
+        FROM products AS p
+        WHERE p.id = m.product_id AND m.product_row_version = p.row_version
+        """
+    )
+    op.drop_column("product_read_model", "product_row_version")
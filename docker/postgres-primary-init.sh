@@ -0,0 +1,6 @@
+#!/bin/sh
+# Runs once, when the primary's data volume is initialised.
+# Allows the db-replica container to stream WAL from the primary.
+set -e
+
+echo "host replication all all scram-sha-256" >> "$PGDATA/pg_hba.conf"
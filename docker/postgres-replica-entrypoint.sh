@@ -0,0 +1,19 @@
+#!/bin/sh
+# Streaming replica of the `db` service (local testing of DATABASE_REPLICA_URLS).
+# On first start, clones the primary with pg_basebackup -R (writes
+# standby.signal + primary_conninfo), then starts postgres as a hot standby.
+set -e
+
+if [ ! -s "$PGDATA/PG_VERSION" ]; then
+    until pg_isready -h "$PRIMARY_HOST" -U "$POSTGRES_USER"; do
+        echo "Waiting for primary $PRIMARY_HOST..."
+        sleep 1
+    done
+
+    PGPASSWORD="$POSTGRES_PASSWORD" pg_basebackup \
+        -h "$PRIMARY_HOST" -U "$POSTGRES_USER" \
+        -D "$PGDATA" -Fp -Xs -P -R
+    chmod 700 "$PGDATA"
+fi
+
+exec postgres -c hot_standby=on
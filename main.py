@@ -23,10 +23,22 @@ from routers import (
     store_auth_router,
     store_orders_router,
     proxy_router,
+    metrics_router,
+    jobs_router,
 )
 
 # Import de l'initialisation de la base de données - FIXED: Added server. prefix
-from utils.db import Base, create_sample_data, init_db, test_connection, engine
+from utils.db import (
+    Base,
+    create_sample_data,
+    init_db,
+    test_connection,
+    engine,
+    dispose_engines,
+)
+from utils.jobs import resume_jobs, shutdown_jobs
+from utils.outbox import start_outbox_dispatcher, stop_outbox_dispatcher
+from utils.rate_limit import RateLimitMiddleware
 from dotenv import load_dotenv
 import os
 
@@ -44,15 +56,23 @@ async def lifespan(app: FastAPI):
     if test_connection():
         print("📊 Database migrations managed by Alembic")
         print("💡 Run 'alembic upgrade head' to apply migrations")
+        # Background jobs left queued / interrupted by the previous run
+        resume_jobs()
     else:
         print("⚠️  Database connection failed, but continuing...")
 
+    # Outbox dispatcher (Telegram alerts...)
+    start_outbox_dispatcher()
+
     print("=" * 60)
     yield
 
     # Shutdown
     print("=" * 60)
     print("👋 Shutting down E-Commerce API...")
+    shutdown_jobs()
+    await stop_outbox_dispatcher()
+    await dispose_engines()
     print("=" * 60)
 
 
@@ -83,6 +103,10 @@ app = FastAPI(
     redoc_url="/redoc",
 )
 
+# Token buckets of the public endpoints (/public/orders, /public/track,
+# /otp/send); added before CORS so that CORS wraps the 429 responses
+app.add_middleware(RateLimitMiddleware)
+
 # Configuration CORS (Cross-Origin Resource Sharing)
 app.add_middleware(
     CORSMiddleware,
@@ -179,6 +203,8 @@ app.include_router(landing_blocks_router)
 app.include_router(store_auth_router)
 app.include_router(store_orders_router)
 app.include_router(proxy_router, prefix="/api")
+app.include_router(metrics_router)
+app.include_router(jobs_router)
 
 # Point d'entrée pour exécuter l'application
 if __name__ == "__main__":
@@ -4,7 +4,17 @@ Imports all models and database components for easy access
 """
 
 # Import database components from utils.db
-from utils.db import Base, engine, SessionLocal, get_db
+from utils.db import (
+    Base,
+    engine,
+    SessionLocal,
+    get_db,
+    async_engine,
+    AsyncSessionLocal,
+    get_async_db,
+    get_read_db,
+    get_async_read_db,
+)
 
 # Import all models
 from models.admin import Admin
@@ -13,6 +23,15 @@ from models.category import Category
 from models.product import Product
 from models.bill import Bill
 from models.bill_item import BillItem
+from models.bill_number_counter import BillNumberCounter
+from models.bill_daily_stats import BillDailyStats
+from models.product_sales_daily import ProductSalesDaily
+from models.catalog_version import CatalogVersion
+from models.product_read_model import ProductReadModel
+from models.product_tombstone import ProductTombstone
+from models.job import Job
+from models.outbox_message import OutboxMessage
+from models.idempotency_key import IdempotencyKey
 from models.payment import Payment
 from models.stock_alert import StockAlert
 from models.notification import Notification
@@ -27,6 +46,11 @@ __all__ = [
     "engine",
     "SessionLocal",
     "get_db",
+    "async_engine",
+    "AsyncSessionLocal",
+    "get_async_db",
+    "get_read_db",
+    "get_async_read_db",
     # Models
     "Admin",
     "Client",
@@ -34,6 +58,15 @@ __all__ = [
     "Product",
     "Bill",
     "BillItem",
+    "BillNumberCounter",
+    "BillDailyStats",
+    "ProductSalesDaily",
+    "CatalogVersion",
+    "ProductReadModel",
+    "ProductTombstone",
+    "Job",
+    "OutboxMessage",
+    "IdempotencyKey",
     "Payment",
     "StockAlert",
     "Notification",
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, Numeric, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, Numeric, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 
@@ -7,6 +7,13 @@ from utils.db import Base
 
 class Bill(Base):
     __tablename__ = "bills"
+    __table_args__ = (
+        # keyset pagination (utils/pagination.py)
+        Index("ix_bills_created_at_id", "created_at", "id"),
+    )
+    # fetch created_at (server default) with the INSERT: the statistics
+    # rollup (utils/bill_stats.py) needs it during the flush
+    __mapper_args__ = {"eager_defaults": True}
 
     id = Column(Integer, primary_key=True, index=True)
     client_id = Column(Integer, ForeignKey("clients.id"), nullable=False)
@@ -0,0 +1,24 @@
+from sqlalchemy import Column, Integer, SmallInteger, Numeric, Date
+
+from utils.db import Base
+
+
+class BillDailyStats(Base):
+    """
+    Rollup of bills per day and hour (by bill created_at), maintained
+    incrementally by utils/bill_stats.py — feeds /bill/statistics/*
+    """
+
+    __tablename__ = "bill_daily_stats"
+
+    day = Column(Date, primary_key=True)
+    hour = Column(SmallInteger, primary_key=True)  # 0-23
+    total_bills = Column(Integer, nullable=False, default=0)
+    total_revenue = Column(Numeric(15, 2), nullable=False, default=0)
+    total_paid = Column(Numeric(15, 2), nullable=False, default=0)
+    total_pending = Column(Numeric(15, 2), nullable=False, default=0)
+    paid_bills = Column(Integer, nullable=False, default=0)
+    unpaid_bills = Column(Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<BillDailyStats(day={self.day}, hour={self.hour}, total_bills={self.total_bills})>"
@@ -1,15 +1,23 @@
-from sqlalchemy import Column, Integer, String, DateTime, Numeric, ForeignKey, Text
+from sqlalchemy import Column, Integer, String, DateTime, Numeric, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 
-from utils.db import Base
+from utils.db import Base, JSONDocument
 
 
 class BillItem(Base):
     __tablename__ = "bill_items"
+    __table_args__ = (
+        Index(
+            "ix_bill_items_selected_variants_gin",
+            "selected_variants",
+            postgresql_using="gin",
+            postgresql_ops={"selected_variants": "jsonb_path_ops"},
+        ),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
-    bill_id = Column(Integer, ForeignKey("bills.id"), nullable=False)
+    bill_id = Column(Integer, ForeignKey("bills.id"), nullable=False, index=True)
     product_id = Column(Integer, ForeignKey("products.id"),
                         nullable=True)
 
@@ -20,8 +28,8 @@ class BillItem(Base):
     subtotal = Column(Numeric(15, 2), nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
-    # Store variants as JSON string
-    selected_variants = Column(Text, nullable=True)
+    # selected variants: {"taille": "M", ...}
+    selected_variants = Column(JSONDocument, nullable=True)
 
     # Relationships
     # many to one " billitems to bill" part of
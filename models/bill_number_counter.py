@@ -0,0 +1,16 @@
+from sqlalchemy import Column, Integer, String, Date
+
+from utils.db import Base
+
+
+class BillNumberCounter(Base):
+    """Last number handed out per series and per day (see utils/bill_number.py)"""
+
+    __tablename__ = "bill_number_counters"
+
+    series = Column(String(20), primary_key=True)  # e.g. "BILL", "HS" (Achats Hors Système)
+    day = Column(Date, primary_key=True)
+    last_value = Column(Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<BillNumberCounter(series='{self.series}', day={self.day}, last_value={self.last_value})>"
@@ -0,0 +1,19 @@
+from sqlalchemy import Column, Integer, BigInteger
+
+from utils.db import Base
+
+
+class CatalogVersion(Base):
+    """
+    Single row (id=1) bumped by every ORM product / category write
+    (utils/product_changes.py) — part of the ETags of the product lists
+    (utils/etag.py); on SQLite, also source of products.row_version
+    """
+
+    __tablename__ = "catalog_version"
+
+    id = Column(Integer, primary_key=True)
+    version = Column(BigInteger, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<CatalogVersion(version={self.version})>"
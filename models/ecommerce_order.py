@@ -6,15 +6,16 @@ from sqlalchemy import (
     Numeric,
     DateTime,
     ForeignKey,
-    Text,
     Boolean,
+    Index,
+    Sequence,
     Enum as SAEnum,
 )
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 import enum
 
-from utils.db import Base
+from utils.db import Base, JSONDocument
 
 
 class CallingStatus(str, enum.Enum):
@@ -36,8 +37,22 @@ class DeliveryStatus(str, enum.Enum):
     cancelled = "cancelled"  # ← replaces OrderStatus.cancelled
 
 
+# Feeds the tracking code allocator (utils/tracking.py)
+tracking_code_sequence = Sequence("tracking_code_seq", metadata=Base.metadata)
+
+
 class EcommerceOrder(Base):
     __tablename__ = "ecommerce_orders"
+    __table_args__ = (
+        # keyset pagination (utils/pagination.py)
+        Index("ix_ecommerce_orders_created_at_id", "created_at", "id"),
+        Index(
+            "ix_ecommerce_orders_selected_variants_gin",
+            "selected_variants",
+            postgresql_using="gin",
+            postgresql_ops={"selected_variants": "jsonb_path_ops"},
+        ),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
 
@@ -57,7 +72,7 @@ class EcommerceOrder(Base):
     product_name_snapshot = Column(String(300), nullable=False)
     unit_price_snapshot = Column(Numeric(10, 2), nullable=False)
     quantity = Column(Integer, nullable=False, default=1)
-    selected_variants = Column(Text, nullable=True)  # JSON string
+    selected_variants = Column(JSONDocument, nullable=True)  # {"taille": "M", ...}
     total_price = Column(Numeric(10, 2), nullable=False)
 
     # ── Tracking ──────────────────────────────────────────────────────────────
@@ -92,6 +107,11 @@ class EcommerceOrder(Base):
     )
     is_hidden_from_livreurs = Column(Boolean, nullable=False, default=False)
 
+    # ── Stock ─────────────────────────────────────────────────────────────────
+    # True while the order holds its quantity out of products.quantity_in_stock
+    # (reserved at creation, released on cancelled/returned)
+    stock_reserved = Column(Boolean, nullable=False, default=False)
+
     # ── Notification tracking ─────────────────────────────────────────────────
     telegram_notified = Column(Boolean, nullable=False, default=False)
 
@@ -0,0 +1,27 @@
+# models/idempotency_key.py
+from sqlalchemy import Column, Integer, String, DateTime
+from sqlalchemy.sql import func
+
+from utils.db import Base, JSONDocument
+
+
+class IdempotencyKey(Base):
+    """
+    First response of a request sent with an Idempotency-Key header
+    (utils/idempotency.py): replayed to retries until expires_at
+    """
+
+    __tablename__ = "idempotency_keys"
+
+    scope = Column(String(100), primary_key=True)  # endpoint (+ caller), e.g. "bill:client:12"
+    key = Column(String(255), primary_key=True)
+    request_hash = Column(String(64), nullable=False)  # SHA-256 of the request body
+
+    status_code = Column(Integer, nullable=False)
+    response_body = Column(JSONDocument, nullable=False)
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
+
+    def __repr__(self):
+        return f"<IdempotencyKey(scope='{self.scope}', key='{self.key}')>"
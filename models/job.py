@@ -0,0 +1,65 @@
+# models/job.py
+from sqlalchemy import (
+    Column,
+    Integer,
+    String,
+    Text,
+    Boolean,
+    DateTime,
+    ForeignKey,
+    LargeBinary,
+    Enum as SAEnum,
+)
+from sqlalchemy.sql import func
+import enum
+
+from utils.db import Base, JSONDocument
+
+
+class JobStatus(str, enum.Enum):
+    queued = "queued"
+    running = "running"
+    succeeded = "succeeded"
+    failed = "failed"
+    cancelled = "cancelled"
+
+
+class Job(Base):
+    """
+    Background admin job (bulk import, recalculation...), run by
+    utils/jobs.py and polled through GET /jobs/{id}
+    """
+
+    __tablename__ = "jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    kind = Column(String(50), nullable=False, index=True)
+    status = Column(
+        SAEnum(JobStatus, name="jobstatus"),
+        nullable=False,
+        default=JobStatus.queued,
+        index=True,
+    )
+
+    # JSON parameters + optional uploaded file (e.g. the Excel sheet)
+    payload = Column(JSONDocument, nullable=True)
+    input_data = Column(LargeBinary, nullable=True)
+
+    # progress: processed / total units (rows, products...)
+    processed = Column(Integer, nullable=False, default=0)
+    total = Column(Integer, nullable=True)
+
+    result = Column(JSONDocument, nullable=True)
+    error = Column(Text, nullable=True)
+    cancel_requested = Column(Boolean, nullable=False, default=False)
+    # refreshed by the worker at each progress report
+    heartbeat_at = Column(DateTime(timezone=True), nullable=True)
+
+    admin_id = Column(Integer, ForeignKey("admins.id", ondelete="SET NULL"), nullable=True)
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+
+    def __repr__(self):
+        return f"<Job(id={self.id}, kind='{self.kind}', status='{self.status}')>"
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 
@@ -7,6 +7,10 @@ from utils.db import Base
 
 class Notification(Base):
     __tablename__ = "notifications"
+    __table_args__ = (
+        # keyset pagination of an admin's notifications (utils/pagination.py)
+        Index("ix_notifications_admin_id_created_at_id", "admin_id", "created_at", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     admin_id = Column(Integer, ForeignKey("admins.id"), nullable=True)
@@ -0,0 +1,40 @@
+# models/outbox_message.py
+from sqlalchemy import Column, Integer, String, Text, DateTime, Index, text
+from sqlalchemy.sql import func
+
+from utils.db import Base, JSONDocument
+
+
+class OutboxMessage(Base):
+    """
+    Side effect to perform after a commit (e.g. a Telegram order alert),
+    written in the same transaction as the data it is about and delivered
+    by the dispatcher of utils/outbox.py
+    """
+
+    __tablename__ = "outbox_messages"
+    __table_args__ = (
+        # dispatcher scan: pending messages that are due
+        Index(
+            "ix_outbox_messages_pending",
+            "next_attempt_at",
+            postgresql_where=text("sent_at IS NULL AND failed_at IS NULL"),
+        ),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    topic = Column(String(50), nullable=False, index=True)
+    payload = Column(JSONDocument, nullable=False)
+
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    # lease of the dispatcher currently sending it (other workers skip it)
+    locked_until = Column(DateTime(timezone=True), nullable=True)
+    last_error = Column(Text, nullable=True)
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    sent_at = Column(DateTime(timezone=True), nullable=True)
+    failed_at = Column(DateTime(timezone=True), nullable=True)  # gave up
+
+    def __repr__(self):
+        return f"<OutboxMessage(id={self.id}, topic='{self.topic}')>"
@@ -1,20 +1,31 @@
 from sqlalchemy import (
     Column,
     Integer,
+    BigInteger,
     String,
     DateTime,
     Boolean,
     Numeric,
     ForeignKey,
     Text,
+    Index,
 )
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
-from utils.db import Base
+from utils.db import Base, JSONDocument
 
 
 class Product(Base):
     __tablename__ = "products"
+    __table_args__ = (
+        # variant filter: variants @> '{"variants": [{"type": ..., "options": [...]}]}'
+        Index(
+            "ix_products_variants_gin",
+            "variants",
+            postgresql_using="gin",
+            postgresql_ops={"variants": "jsonb_path_ops"},
+        ),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     category_id = Column(Integer, ForeignKey("categories.id"), nullable=False)
@@ -27,8 +38,8 @@ class Product(Base):
 
     barcode = Column(String(100), nullable=True, unique=True, index=True)
 
-    # as a JSON string of URLs
-    image_urls = Column(String(2500), nullable=True)
+    # list of image URLs
+    image_urls = Column(JSONDocument, nullable=True)
 
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
@@ -37,14 +48,18 @@ class Product(Base):
     # means a is enable to sell or not
     is_sold = Column(Boolean, default=False)
 
-    # JSON string for variant configurations
-    variants = Column(Text, nullable=True)
+    # variant configurations: {"variants": [{"type": "taille", "options": ["S", "M"]}]}
+    variants = Column(JSONDocument, nullable=True)
 
-    # NEW: JSON string for dynamic storefront landing-page blocks
+    # NEW: dynamic storefront landing-page blocks
     # (ordered list of {"type": "image", "url": "..."} / {"type": "text", "content": "..."})
     # Optional - managed from the Flutter admin app via PUT /product/{id}/landing-blocks.
     # When null/empty, the storefront falls back to showing `description` instead.
-    landing_blocks = Column(Text, nullable=True)
+    landing_blocks = Column(JSONDocument, nullable=True)
+
+    # catalog version of the last write to this product (or to its category):
+    # change feed of GET /product/changes (utils/product_changes.py)
+    row_version = Column(BigInteger, nullable=False, default=0, server_default="0", index=True)
 
     # Relationships
     # many to one "products to categroy" belongs to
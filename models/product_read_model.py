@@ -0,0 +1,23 @@
+from sqlalchemy import Column, Integer, BigInteger, Text, ForeignKey
+
+from utils.db import Base
+
+
+class ProductReadModel(Base):
+    """
+    Serialized JSON of a product, maintained by utils/product_read_model.py
+    """
+
+    __tablename__ = "product_read_model"
+
+    product_id = Column(
+        Integer, ForeignKey("products.id", ondelete="CASCADE"), primary_key=True
+    )
+    # products.row_version when the blobs were built: a blob is only served
+    # while it still matches
+    product_row_version = Column(BigInteger, nullable=True)
+    admin_json = Column(Text, nullable=False)  # ProductWithCategory
+    public_json = Column(Text, nullable=False)  # storefront product
+
+    def __repr__(self):
+        return f"<ProductReadModel(product_id={self.product_id})>"
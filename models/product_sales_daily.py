@@ -0,0 +1,24 @@
+from sqlalchemy import Column, Integer, Numeric, Date, ForeignKey
+
+from utils.db import Base
+
+
+class ProductSalesDaily(Base):
+    """
+    Sales of a product per day (by bill created_at), maintained
+    incrementally by utils/product_sales.py — feeds /product/{id}/statistics*
+    and /product/{id}/purchases/timeline
+    """
+
+    __tablename__ = "product_sales_daily"
+
+    product_id = Column(
+        Integer, ForeignKey("products.id", ondelete="CASCADE"), primary_key=True
+    )
+    day = Column(Date, primary_key=True)
+    quantity = Column(Integer, nullable=False, default=0)  # units sold
+    revenue = Column(Numeric(15, 2), nullable=False, default=0)
+    purchases = Column(Integer, nullable=False, default=0)  # number of bill lines
+
+    def __repr__(self):
+        return f"<ProductSalesDaily(product_id={self.product_id}, day={self.day}, quantity={self.quantity})>"
@@ -0,0 +1,20 @@
+from sqlalchemy import Column, Integer, BigInteger, DateTime
+from sqlalchemy.sql import func
+
+from utils.db import Base
+
+
+class ProductTombstone(Base):
+    """
+    Deleted product, reported by GET /product/changes (utils/product_changes.py)
+    """
+
+    __tablename__ = "product_tombstones"
+
+    # no foreign key: the product row is gone
+    product_id = Column(Integer, primary_key=True)
+    row_version = Column(BigInteger, nullable=False, index=True)
+    deleted_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    def __repr__(self):
+        return f"<ProductTombstone(product_id={self.product_id}, row_version={self.row_version})>"
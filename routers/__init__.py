@@ -16,6 +16,8 @@ from .landing_blocks import router as landing_blocks_router
 from .store_auth import router as store_auth_router
 from .store_orders import router as store_orders_router
 from .proxy import router as proxy_router
+from .metrics import router as metrics_router
+from .jobs import router as jobs_router
 
 # from routers.chat import router as chat_router
 
@@ -37,5 +39,7 @@ __all__ = [
     "store_auth_router",
     "store_orders_router",
     "proxy_router",
+    "metrics_router",
+    "jobs_router",
     # "chat_router"
 ]
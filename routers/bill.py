@@ -1,7 +1,7 @@
 from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.orm import Session
 from sqlalchemy import func, extract
-from typing import List, Optional
+from typing import List, Optional, Union
 from datetime import datetime, date, timedelta
 from decimal import Decimal
 from models.bill import Bill
@@ -11,72 +11,55 @@ from models.notification import Notification
 from models.product import Product
 from models.client import Client
 from schemas.bill import BillCreate, BillResponse, BillWithItems, BillWithClient, BillSummary
-from utils.db import get_db
+from utils.db import get_db, get_read_db
 from utils.auth import get_current_client, get_current_admin, get_current_user
-from utils.stock_manager import check_and_create_stock_alert
-from utils.notification_manager import create_bill_notification
+from utils.stock_manager import (
+    reserve_stock,
+    ProductNotFoundError,
+    ProductUnavailableError,
+    InsufficientStockError,
+    StockError,
+)
+from utils import domain_events
+from utils.bill_number import next_bill_number
+from utils.idempotency import begin_idempotent, idempotency_key_header
+from utils.bill_queries import bill_query, get_bill_or_404, serialize_bill, serialize_bills
+from utils.pagination import CURSOR_QUERY, CursorPage, apply_keyset, keyset_page
+from utils.bill_stats import bill_stats_series, reset_bill_daily_stats
+from utils.summary import count_of, sum_of, summarize
+from utils.product_sales import record_bill_sales, remove_bill_sales, reset_product_sales_daily
 from sqlalchemy import func, extract, and_, cast, Date
-import json
 
 router = APIRouter(prefix="/bill", tags=["Bill"])
 # all router has relation to bill table
 
 
-def format_bill_item(item):
-    """Helper function to format bill item with variants"""
-    return {
-        "id": item.id,
-        "product_id": item.product_id,
-        "product_name": item.product_name,
-        "unit_price": item.unit_price,
-        "quantity": item.quantity,
-        "subtotal": item.subtotal,
-        "selected_variants": json.loads(item.selected_variants) if item.selected_variants else None,
-        "created_at": item.created_at
-    }
+_AMOUNTS = ("total_revenue", "total_paid", "total_pending")
+
+
+def _float_amounts(rows: list) -> list:
+    """the statistics endpoints send amounts as JSON numbers (exact Decimal sums until here)"""
+    for row in rows:
+        for key in _AMOUNTS:
+            row[key] = float(row[key])
+    return rows
 
 
 # geting all statistics from bill table ,dayly
 @router.get("/statistics/daily", response_model=List[dict])
 def get_daily_bill_summary(
     year: int = Query(..., description="Year (e.g., 2024)"),
-    month: int = Query(..., description="Month (1-12)"),
+    month: int = Query(..., ge=1, le=12, description="Month (1-12)"),
     current_admin=Depends(get_current_admin),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Get daily bill summary """
 
-    # Query bills for the specific month and group by day
-    results = db.query(
-        func.to_char(Bill.created_at, 'YYYY-MM-DD').label("date"),
-        func.count(Bill.id).label("total_bills"),
-        func.sum(Bill.total_amount).label("total_revenue"),
-        func.sum(Bill.total_paid).label("total_paid"),
-        func.sum(Bill.total_remaining).label("total_pending"),
-        func.count(func.nullif(Bill.status == 'paid', False)
-                   ).label("paid_bills"),
-        func.count(func.nullif(Bill.status == 'not paid', False)
-                   ).label("unpaid_bills")
-    ).filter(
-        and_(
-            extract('year', Bill.created_at) == year,
-            extract('month', Bill.created_at) == month
-        )
-    ).group_by("date").order_by("date").all()
-
-    daily_summary = []
-    for row in results:
-        daily_summary.append({
-            "period": row.date,
-            "total_bills": row.total_bills or 0,
-            "total_revenue": float(row.total_revenue or Decimal('0.00')),
-            "total_paid": float(row.total_paid or Decimal('0.00')),
-            "total_pending": float(row.total_pending or Decimal('0.00')),
-            "paid_bills": row.paid_bills or 0,
-            "unpaid_bills": row.unpaid_bills or 0
-        })
+    # read from the bill_daily_stats rollup (utils/bill_stats.py)
+    first_day = date(year, month, 1)
+    last_day = (first_day + timedelta(days=32)).replace(day=1) - timedelta(days=1)
 
-    return daily_summary
+    return _float_amounts(bill_stats_series(db, "day", first_day, last_day))
 
 # geting all statistics from bill table , monthly
 
@@ -86,40 +69,14 @@ def get_monthly_bill_summary(
     year: Optional[int] = Query(
         None, description="Year (e.g., 2024). If not provided, returns all months"),
     current_admin=Depends(get_current_admin),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Get monthly bill summary"""
 
-    query = db.query(
-        func.to_char(Bill.created_at, 'YYYY-MM').label("month"),
-        func.count(Bill.id).label("total_bills"),
-        func.sum(Bill.total_amount).label("total_revenue"),
-        func.sum(Bill.total_paid).label("total_paid"),
-        func.sum(Bill.total_remaining).label("total_pending"),
-        func.count(func.nullif(Bill.status == 'paid', False)
-                   ).label("paid_bills"),
-        func.count(func.nullif(Bill.status == 'not paid', False)
-                   ).label("unpaid_bills")
-    )
-
     if year:
-        query = query.filter(extract('year', Bill.created_at) == year)
-
-    results = query.group_by("month").order_by("month").all()
-
-    monthly_summary = []
-    for row in results:
-        monthly_summary.append({
-            "period": row.month,
-            "total_bills": row.total_bills or 0,
-            "total_revenue": float(row.total_revenue or Decimal('0.00')),
-            "total_paid": float(row.total_paid or Decimal('0.00')),
-            "total_pending": float(row.total_pending or Decimal('0.00')),
-            "paid_bills": row.paid_bills or 0,
-            "unpaid_bills": row.unpaid_bills or 0
-        })
+        return _float_amounts(bill_stats_series(db, "month", date(year, 1, 1), date(year, 12, 31)))
 
-    return monthly_summary
+    return _float_amounts(bill_stats_series(db, "month"))
 
 # geting all statistics from bill table , yearly
 
@@ -127,35 +84,11 @@ def get_monthly_bill_summary(
 @router.get("/statistics/yearly", response_model=List[dict])
 def get_yearly_bill_summary(
     current_admin=Depends(get_current_admin),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Get yearly bill summary"""
 
-    results = db.query(
-        func.to_char(Bill.created_at, 'YYYY').label("year"),
-        func.count(Bill.id).label("total_bills"),
-        func.sum(Bill.total_amount).label("total_revenue"),
-        func.sum(Bill.total_paid).label("total_paid"),
-        func.sum(Bill.total_remaining).label("total_pending"),
-        func.count(func.nullif(Bill.status == 'paid', False)
-                   ).label("paid_bills"),
-        func.count(func.nullif(Bill.status == 'not paid', False)
-                   ).label("unpaid_bills")
-    ).group_by("year").order_by("year").all()
-
-    yearly_summary = []
-    for row in results:
-        yearly_summary.append({
-            "period": row.year,
-            "total_bills": row.total_bills or 0,
-            "total_revenue": float(row.total_revenue or Decimal('0.00')),
-            "total_paid": float(row.total_paid or Decimal('0.00')),
-            "total_pending": float(row.total_pending or Decimal('0.00')),
-            "paid_bills": row.paid_bills or 0,
-            "unpaid_bills": row.unpaid_bills or 0
-        })
-
-    return yearly_summary
+    return _float_amounts(bill_stats_series(db, "year"))
 
 
 # geting all statistics from bill table , bassed on the range period selected
@@ -165,55 +98,17 @@ def get_period_range_summary(
     end_date: date = Query(..., description="End date (YYYY-MM-DD)"),
     group_by: str = Query("day", description="Group by: day, month, or year"),
     current_admin=Depends(get_current_admin),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Get bill summary for a date range, grouped by specified period"""
 
-    # Determine the grouping format
-    format_map = {
-        "day": "YYYY-MM-DD",
-        "month": "YYYY-MM",
-        "year": "YYYY"
-    }
-
-    if group_by not in format_map:
+    if group_by not in ("day", "month", "year"):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="group_by must be 'day', 'month', or 'year'"
         )
 
-    date_format = format_map[group_by]
-
-    results = db.query(
-        func.to_char(Bill.created_at, date_format).label("period"),
-        func.count(Bill.id).label("total_bills"),
-        func.sum(Bill.total_amount).label("total_revenue"),
-        func.sum(Bill.total_paid).label("total_paid"),
-        func.sum(Bill.total_remaining).label("total_pending"),
-        func.count(func.nullif(Bill.status == 'paid', False)
-                   ).label("paid_bills"),
-        func.count(func.nullif(Bill.status == 'not paid', False)
-                   ).label("unpaid_bills")
-    ).filter(
-        and_(
-            cast(Bill.created_at, Date) >= start_date,
-            cast(Bill.created_at, Date) <= end_date
-        )
-    ).group_by("period").order_by("period").all()
-
-    summary = []
-    for row in results:
-        summary.append({
-            "period": row.period,
-            "total_bills": row.total_bills or 0,
-            "total_revenue": float(row.total_revenue or Decimal('0.00')),
-            "total_paid": float(row.total_paid or Decimal('0.00')),
-            "total_pending": float(row.total_pending or Decimal('0.00')),
-            "paid_bills": row.paid_bills or 0,
-            "unpaid_bills": row.unpaid_bills or 0
-        })
-
-    return summary
+    return _float_amounts(bill_stats_series(db, group_by, start_date, end_date))
 
 
 # create a new bill
@@ -221,9 +116,10 @@ def get_period_range_summary(
 def create_bill(
     bill_data: BillCreate,
     current_client=Depends(get_current_client),
+    idempotency_key: Optional[str] = Depends(idempotency_key_header),
     db: Session = Depends(get_db)
 ):
-    """create new bill """
+    """create new bill (a retry with the same Idempotency-Key gets the first bill back)"""
 
     # check his account active or not
     if current_client.is_active == False:
@@ -231,13 +127,43 @@ def create_bill(
             status_code=402,
             detail="Votre compte est actuellement inactif. Veuillez effectuer votre paiement afin qu'un administrateur puisse l'activer."
         )
-    # generate a unique nmbr
-    bill_count = db.query(Bill).count()
-    bill_number = f"BILL-{datetime.now().strftime('%Y%m%d')}-{bill_count + 1:04d}"
+    idempotent = begin_idempotent(db, f"bill:client:{current_client.id}", idempotency_key, bill_data)
+    if idempotent.replay is not None:
+        return idempotent.replay
+
+    # reserve the stock of every product in one locked batch:
+    # the whole bill fails if any item is missing, inactive or out of stock
+    try:
+        products = reserve_stock(
+            db, [(item.product_id, item.quantity) for item in bill_data.items]
+        )
+    except ProductNotFoundError as e:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Produit avec ID {e.product_id} non trouvé"
+        )
+    except ProductUnavailableError as e:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Le produit '{e.product.name}' n'est pas disponible"
+        )
+    except InsufficientStockError as e:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Stock insuffisant pour le produit '{e.product.name}'. Stock disponible: {e.available}"
+        )
+    except StockError as e:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=str(e)
+        )
 
     new_bill = Bill(
         client_id=current_client.id,
-        bill_number=bill_number,
         total_amount=Decimal('0.00'),
         total_paid=Decimal('0.00'),
         total_remaining=Decimal('0.00'),
@@ -245,39 +171,12 @@ def create_bill(
         delivery_status="not_delivered"
     )
 
-    db.add(new_bill)
-    db.flush()
-
     # add the articles of the bill
     total_amount = Decimal('0.00')
     bill_items = []
 
     for item in bill_data.items:
-        # chekc if the product is exist
-        product = db.query(Product).filter(
-            Product.id == item.product_id).first()
-        if not product:
-            db.rollback()
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail=f"Produit avec ID {item.product_id} non trouvé"
-            )
-
-        # chech status of the product
-        if not product.is_active:
-            db.rollback()
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Le produit '{product.name}' n'est pas disponible"
-            )
-
-        # check the stock
-        if product.quantity_in_stock < item.quantity:
-            db.rollback()
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Stock insuffisant pour le produit '{product.name}'. Stock disponible: {product.quantity_in_stock}"
-            )
+        product = products[item.product_id]
 
         # Calculate the sous total
         subtotal = product.price * item.quantity
@@ -292,54 +191,35 @@ def create_bill(
 
         # creat the article of the bill with the variants included
         bill_item = BillItem(
-            bill_id=new_bill.id,
+            bill=new_bill,
             product_id=product.id,
             product_name=product_name,  # Include variants in name
             unit_price=product.price,
             quantity=item.quantity,
             subtotal=subtotal,
-            selected_variants=json.dumps(
-                item.selected_variants) if item.selected_variants else None  # NEW
+            selected_variants=item.selected_variants or None  # NEW
         )
-        db.add(bill_item)
         bill_items.append(bill_item)
 
-        product.quantity_in_stock -= item.quantity
-
-        check_and_create_stock_alert(db, product)
-
     # update the total of the bill
     new_bill.total_amount = total_amount
     new_bill.total_remaining = total_amount
 
+    # generate a unique nmbr last: the per-day counter row stays locked until
+    # the commit, so nothing slow (product locks) may run after it
+    new_bill.bill_number = next_bill_number(db)
+    db.add(new_bill)
+    db.flush()
+    record_bill_sales(db, new_bill, bill_items)
+
+    # single commit: stock alerts ("stock_changed", emitted by reserve_stock)
+    # and admin notifications run after it in one batched pass
+    domain_events.emit(db, "bill_created", bill_id=new_bill.id)
+    response = BillWithItems.model_validate(serialize_bill(get_bill_or_404(db, new_bill.id)))
+    idempotent.store(status.HTTP_201_CREATED, response)
     db.commit()
-    db.refresh(new_bill)
-
-    create_bill_notification(db, new_bill, current_client)
-
-    return BillWithItems(
-        id=new_bill.id,
-        bill_number=new_bill.bill_number,
-        client_id=new_bill.client_id,
-        total_amount=new_bill.total_amount,
-        total_paid=new_bill.total_paid,
-        total_remaining=new_bill.total_remaining,
-        status=new_bill.status,
-        delivery_status=new_bill.delivery_status,
-        created_at=new_bill.created_at,
-        updated_at=new_bill.updated_at,
-        notification_sent=new_bill.notification_sent,
-        items=[{
-            "id": item.id,
-            "product_id": item.product_id,
-            "product_name": item.product_name,
-            "unit_price": item.unit_price,
-            "quantity": item.quantity,
-            "subtotal": item.subtotal,
-            "selected_variants": json.loads(item.selected_variants) if item.selected_variants else None,
-            "created_at": item.created_at
-        } for item in bill_items]
-    )
+
+    return response
 
 
 # get current user bills
@@ -352,28 +232,10 @@ def get_my_bills(
 ):
     """get all bills of the currenat user"""
 
-    bills = db.query(Bill).filter(Bill.client_id ==
+    bills = bill_query(db).filter(Bill.client_id ==
                                   current_client.id).offset(skip).limit(limit).all()
 
-    result = []
-    for bill in bills:
-        result.append(BillWithItems(
-            id=bill.id,
-            bill_number=bill.bill_number,
-            client_id=bill.client_id,
-            total_amount=bill.total_amount,
-            total_paid=bill.total_paid,
-            total_remaining=bill.total_remaining,
-            status=bill.status,
-            delivery_status=bill.delivery_status,
-            created_at=bill.created_at,
-            updated_at=bill.updated_at,
-            notification_sent=bill.notification_sent,
-            items=[format_bill_item(item)
-                   for item in bill.bill_items]
-        ))
-
-    return result
+    return serialize_bills(bills)
 
 
 # count all my bills
@@ -434,70 +296,49 @@ def count_my_bills(
 
 # retun all bills to admin
 
-@router.get("/all", response_model=List[BillWithClient])
+@router.get("/all", response_model=Union[List[BillWithClient], CursorPage[BillWithClient]])
 def get_all_bills(
     skip: int = 0,
     limit: int = 100,
     status_filter: str = None,
+    cursor: Optional[str] = CURSOR_QUERY,
     current_admin=Depends(get_current_admin),
     db: Session = Depends(get_db)
 ):
 
-    query = db.query(Bill)
+    query = bill_query(db, with_client=True)
 
     if status_filter:
         query = query.filter(Bill.status == status_filter)
 
+    # keyset mode (newest first)
+    if cursor is not None:
+        bills, next_cursor = keyset_page(
+            apply_keyset(query, Bill, cursor, limit).all(), limit)
+        return {"items": serialize_bills(bills, with_client=True), "next_cursor": next_cursor}
+
     bills = query.offset(skip).limit(limit).all()
 
-    result = []
-    for bill in bills:
-        result.append(BillWithClient(
-            id=bill.id,
-            bill_number=bill.bill_number,
-            client_id=bill.client_id,
-            total_amount=bill.total_amount,
-            total_paid=bill.total_paid,
-            total_remaining=bill.total_remaining,
-            status=bill.status,
-            delivery_status=bill.delivery_status,
-            created_at=bill.created_at,
-            updated_at=bill.updated_at,
-            notification_sent=bill.notification_sent,
-            client_name=bill.client.username,
-            client_email=bill.client.email,
-            client_phone=bill.client.phone_number,
-            items=[format_bill_item(item) for item in bill.bill_items]
-        ))
-
-    return result
+    return serialize_bills(bills, with_client=True)
 
 
 # retunr summary data to admin
 @router.get("/summary", response_model=BillSummary)
 def get_bill_summary(
     current_admin=Depends(get_current_admin),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
 
-    total_bills = db.query(Bill).count()
-    total_revenue = db.query(func.sum(Bill.total_amount)
-                             ).scalar() or Decimal('0.00')
-    total_paid = db.query(func.sum(Bill.total_paid)
-                          ).scalar() or Decimal('0.00')
-    total_pending = db.query(
-        func.sum(Bill.total_remaining)).scalar() or Decimal('0.00')
-    paid_bills = db.query(Bill).filter(Bill.status == "paid").count()
-    unpaid_bills = db.query(Bill).filter(Bill.status == "not paid").count()
-
-    return BillSummary(
-        total_bills=total_bills,
-        total_revenue=total_revenue,
-        total_paid=total_paid,
-        total_pending=total_pending,
-        paid_bills=paid_bills,
-        unpaid_bills=unpaid_bills,
-    )
+    # one SELECT with conditional aggregates
+    return BillSummary(**summarize(
+        db,
+        total_bills=count_of(Bill.id),
+        total_revenue=sum_of(Bill.total_amount),
+        total_paid=sum_of(Bill.total_paid),
+        total_pending=sum_of(Bill.total_remaining),
+        paid_bills=count_of(Bill.id, Bill.status == "paid"),
+        unpaid_bills=count_of(Bill.id, Bill.status == "not paid"),
+    ))
 
 
 # return summary monthly bills to admin
@@ -505,30 +346,20 @@ def get_bill_summary(
 @router.get("/summary/monthly", response_model=List[BillSummary])
 def get_monthly_bill_summary(
     current_admin=Depends(get_current_admin),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
 
-    monthly_summary = []
-
-    results = db.query(
-        func.to_char(Bill.created_at, 'YYYY-MM').label("month"),
-        func.count(Bill.id).label("total_bills"),
-        func.sum(Bill.total_amount).label("total_revenue"),
-        func.sum(Bill.total_paid).label("total_paid"),
-        func.sum(Bill.total_remaining).label("total_pending")
-    ).group_by("month").order_by("month").all()
-
-    for row in results:
-        monthly_summary.append(BillSummary(
-            total_bills=row.total_bills,
-            total_revenue=row.total_revenue or Decimal('0.00'),
-            total_paid=row.total_paid or Decimal('0.00'),
-            total_pending=row.total_pending or Decimal('0.00'),
-            paid_bills=0,
-            unpaid_bills=0
-        ))
-
-    return monthly_summary
+    return [
+        BillSummary(
+            total_bills=row["total_bills"],
+            total_revenue=row["total_revenue"],
+            total_paid=row["total_paid"],
+            total_pending=row["total_pending"],
+            paid_bills=row["paid_bills"],
+            unpaid_bills=row["unpaid_bills"],
+        )
+        for row in bill_stats_series(db, "month")
+    ]
 
 
 # return a bill by bill id
@@ -539,12 +370,7 @@ def get_bill_by_id(
     db: Session = Depends(get_db)
 ):
 
-    bill = db.query(Bill).filter(Bill.id == bill_id).first()
-    if not bill:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Facture non trouvée"
-        )
+    bill = get_bill_or_404(db, bill_id)
 
     if bill.client_id != current_client.id:
         raise HTTPException(
@@ -552,20 +378,7 @@ def get_bill_by_id(
             detail="Vous n'avez pas accès à cette facture"
         )
 
-    return BillWithItems(
-        id=bill.id,
-        bill_number=bill.bill_number,
-        client_id=bill.client_id,
-        total_amount=bill.total_amount,
-        total_paid=bill.total_paid,
-        total_remaining=bill.total_remaining,
-        status=bill.status,
-        delivery_status=bill.delivery_status,
-        created_at=bill.created_at,
-        updated_at=bill.updated_at,
-        notification_sent=bill.notification_sent,
-        items=[format_bill_item(item) for item in bill.bill_items]
-    )
+    return serialize_bill(bill)
 
 
 # post a new payment to a existing bill by admin
@@ -631,30 +444,9 @@ def get_bill_by_id_admin(
     db: Session = Depends(get_db)
 ):
 
-    bill = db.query(Bill).filter(Bill.id == bill_id).first()
-    if not bill:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Facture non trouvée"
-        )
+    bill = get_bill_or_404(db, bill_id, with_client=True)
 
-    return BillWithClient(
-        id=bill.id,
-        bill_number=bill.bill_number,
-        client_id=bill.client_id,
-        total_amount=bill.total_amount,
-        total_paid=bill.total_paid,
-        total_remaining=bill.total_remaining,
-        status=bill.status,
-        delivery_status=bill.delivery_status,
-        created_at=bill.created_at,
-        updated_at=bill.updated_at,
-        notification_sent=bill.notification_sent,
-        client_name=bill.client.username,
-        client_email=bill.client.email,
-        client_phone=bill.client.phone_number,
-        items=[format_bill_item(item) for item in bill.bill_items]
-    )
+    return serialize_bill(bill, with_client=True)
 
 
 # update the paymen of a bill by admin
@@ -707,7 +499,7 @@ def correct_bill_total_paid(
 def get_daily_hourly_summary(
     date: str,  # Format: YYYY-MM-DD
     current_admin=Depends(get_current_admin),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     try:
         target_date = datetime.strptime(date, '%Y-%m-%d').date()
@@ -717,25 +509,14 @@ def get_daily_hourly_summary(
             detail="Invalid date format. Use YYYY-MM-DD"
         )
 
-    # Query bills for the specific day grouped by hour
-    results = db.query(
-        extract('hour', Bill.created_at).label('hour'),
-        func.count(Bill.id).label('total_bills'),
-        func.sum(Bill.total_amount).label('total_revenue'),
-        func.sum(Bill.total_paid).label('total_paid'),
-        func.sum(Bill.total_remaining).label('total_pending')
-    ).filter(
-        func.date(Bill.created_at) == target_date
-    ).group_by('hour').all()
-
-    # Format the response with all 24 hours
-    hourly_data = {int(r.hour): {
-        'hour': int(r.hour),
-        'total_bills': int(r.total_bills or 0),
-        'total_revenue': float(r.total_revenue or 0),
-        'total_paid': float(r.total_paid or 0),
-        'total_pending': float(r.total_pending or 0)
-    } for r in results}
+    # hours of the day from the bill_daily_stats rollup
+    hourly_data = {row["period"]: {
+        'hour': row["period"],
+        'total_bills': row["total_bills"],
+        'total_revenue': row["total_revenue"],
+        'total_paid': row["total_paid"],
+        'total_pending': row["total_pending"]
+    } for row in _float_amounts(bill_stats_series(db, "hour", target_date, target_date))}
 
     # Fill in missing hours with zeros
     return [
@@ -779,29 +560,17 @@ def get_bills_by_delivery_status(
 ):
     """" get the status delivery of the bill"""
 
-    bill = db.query(Bill).filter(Bill.id == bill_id,
-                                 Bill.delivery_status == status_data).first()
+    bill = bill_query(db, with_client=True).filter(
+        Bill.id == bill_id,
+        Bill.client_id == current_user.id,
+        Bill.delivery_status == status_data).first()
     if not bill:
-        raise Exception(
-            status_code=status.HTTP_404_NOT_FOUND,)
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Bill not found"
+        )
 
-    return BillWithClient(
-        id=bill.id,
-        bill_number=bill.bill_number,
-        client_id=bill.client_id,
-        total_amount=bill.total_amount,
-        total_paid=bill.total_paid,
-        total_remaining=bill.total_remaining,
-        status=bill.status,
-        delivery_status=bill.delivery_status,
-        created_at=bill.created_at,
-        updated_at=bill.updated_at,
-        notification_sent=bill.notification_sent,
-        client_name=bill.client.username,
-        client_email=bill.client.email,
-        client_phone=bill.client.phone_number,
-        items=[format_bill_item(item) for item in bill.bill_items]
-    )
+    return [serialize_bill(bill, with_client=True)]
 
 
 # return the bills by status delivery
@@ -812,32 +581,15 @@ def get_bills_by_delivery_status(
     db: Session = Depends(get_db)
 ):
 
-    bills = db.query(Bill).filter(Bill.delivery_status == status_data).all()
+    bills = bill_query(db, with_client=True).filter(
+        Bill.delivery_status == status_data).all()
     if not bills:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Bill not found"
         )
 
-    for bill in bills:
-        return BillWithClient(
-            id=bill.id,
-            bill_number=bill.bill_number,
-            client_id=bill.client_id,
-            total_amount=bill.total_amount,
-            total_paid=bill.total_paid,
-            total_remaining=bill.total_remaining,
-            status=bill.status,
-            delivery_status=bill.delivery_status,
-            created_at=bill.created_at,
-            updated_at=bill.updated_at,
-            notification_sent=bill.notification_sent,
-            client_name=bill.client.username,
-            client_email=bill.client.email,
-            client_phone=bill.client.phone_number,
-            items=[format_bill_item(item) for item in bill.bill_items]
-        )
-    return bills
+    return serialize_bills(bills, with_client=True)
 
 
 # change the delivery status of a bill by admin
@@ -848,33 +600,15 @@ def change_delivery_status(
     db: Session = Depends(get_db)
 ):
 
-    bill = db.query(Bill).filter(Bill.id == bill_id).first()
-    if not bill:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Bill not found"
-        )
+    bill = get_bill_or_404(db, bill_id, with_items=False, detail="Bill not found")
 
-    old_status = bill.delivery_status
     # Update delivery status
     bill.delivery_status = new_status
 
     db.commit()
     db.refresh(bill)
 
-    return BillResponse(
-        id=bill.id,
-        bill_number=bill.bill_number,
-        client_id=bill.client_id,
-        total_amount=bill.total_amount,
-        total_paid=bill.total_paid,
-        total_remaining=bill.total_remaining,
-        status=bill.status,
-        delivery_status=bill.delivery_status,
-        created_at=bill.created_at,
-        updated_at=bill.updated_at,
-        notification_sent=bill.notification_sent
-    )
+    return serialize_bill(bill, with_items=False)
 
 
 # delete all bills by admin
@@ -886,6 +620,9 @@ def delete_all_bills(
     db.query(Notification).delete()
     db.query(BillItem).delete()
     db.query(Bill).delete()
+    # bulk delete bypasses the ORM: empty the statistics rollups as well
+    reset_bill_daily_stats(db)
+    reset_product_sales_daily(db)
     db.commit()
 
     return {"detail": "All bills deleted successfully"}
@@ -912,6 +649,7 @@ def delete_bill_by_id(
     db.query(Notification).filter(Notification.bill_id == bill_id).delete()
 
     # Delete associated bill items first
+    remove_bill_sales(db, [bill_id])
     db.query(BillItem).filter(BillItem.bill_id == bill_id).delete()
     # Then delete the bill
     db.delete(bill)
@@ -927,6 +665,7 @@ def delete_all_paid_bills(
 ):
 
     paid_bills = db.query(Bill).filter(Bill.status == "paid").all()
+    remove_bill_sales(db, [bill.id for bill in paid_bills])
 
     for bill in paid_bills:
 
@@ -951,6 +690,7 @@ def delete_old_bills(
 
     one_year_ago = datetime.utcnow() - timedelta(days=370)
     old_bills = db.query(Bill).filter(Bill.created_at < one_year_ago).all()
+    remove_bill_sales(db, [bill.id for bill in old_bills])
 
     for bill in old_bills:
         # delete related notifications first
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from sqlalchemy.orm import Session
 from sqlalchemy import func
 from typing import List
@@ -7,6 +7,7 @@ from models.product import Product
 from schemas.category import CategoryCreate, CategoryUpdate, CategoryResponse, CategoryWithCount
 from utils.db import get_db
 from utils.auth import get_current_admin
+from utils.response_cache import cached_json
 
 router = APIRouter(prefix="/category", tags=["Category"])
 
@@ -35,12 +36,18 @@ def create_category(
 
 @router.get("/", response_model=List[CategoryWithCount])
 def get_all_categories(
+    request: Request,
     skip: int = 0,
     limit: int = 100,
     db: Session = Depends(get_db)
 ):
-    """Obtenir toutes les catégories avec le nombre de produits"""
+    """Obtenir toutes les catégories avec le nombre de produits (mis en cache)"""
     
+    return cached_json(
+        request, lambda: _build_categories(db, skip, limit), tags=["categories"]
+    )
+
+def _build_categories(db: Session, skip: int, limit: int) -> List[CategoryWithCount]:
     categories = db.query(
         Category,
         func.count(Product.id).label('product_count')
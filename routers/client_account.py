@@ -4,6 +4,7 @@ from typing import List
 from decimal import Decimal
 
 from utils.db import get_db
+from utils.bill_number import next_bill_number, OUTSIDE_PURCHASE_SERIES
 from models.client_account import ClientAccount
 from models.client import Client
 from schemas.client_account import (
@@ -301,7 +302,6 @@ def update_client_account(
     """
     from models.bill import Bill
     from datetime import datetime
-    import uuid
 
     db_account = db.query(ClientAccount).filter(
         ClientAccount.id == account_id).first()
@@ -349,21 +349,8 @@ def update_client_account(
             outside_purchase_amount = new_total_remaining - bills_total_amount
 
             # Create a NEW bill for the outside purchases
-            # Generate unique bill number
-            # Format: Achats Hors Système - YYYYMMDD - UNIQUEID
-            date_str = datetime.now().strftime('%Y%m%d')
-            unique_id = str(uuid.uuid4())[:8].upper()  # First 8 chars of UUID
-            bill_number = f"Achats Hors Système - {date_str} - {unique_id}"
-
-            # Ensure uniqueness
-            counter = 1
-            original_bill_number = bill_number
-            while db.query(Bill).filter(Bill.bill_number == bill_number).first():
-                unique_id = str(uuid.uuid4())[:8].upper()
-                bill_number = f"Achats Hors Système - {date_str} - {unique_id}"
-                counter += 1
-                if counter > 10:  # Safety break after 10 attempts
-                    bill_number = f"{original_bill_number}-{counter}"
+            # Format: Achats Hors Système - YYYYMMDD - NNNN (per-day counter)
+            bill_number = next_bill_number(db, OUTSIDE_PURCHASE_SERIES)
 
             # Create new bill for outside purchases
             outside_bill = Bill(
@@ -0,0 +1,82 @@
+# routers/jobs.py
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.orm import Session
+from typing import List, Optional
+
+from models.job import Job, JobStatus
+from schemas.job import JobCreate, JobResponse
+from utils.auth import get_current_admin
+from utils.db import get_db
+from utils.jobs import cancel_job, startable_kinds, submit_job
+
+router = APIRouter(prefix="/jobs", tags=["Jobs"])
+
+
+def _get_job(db: Session, job_id: int) -> Job:
+    job = db.query(Job).filter(Job.id == job_id).first()
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Job not found"
+        )
+    return job
+
+
+@router.get("/", response_model=List[JobResponse])
+def list_jobs(
+    kind: Optional[str] = None,
+    job_status: Optional[JobStatus] = Query(None, alias="status"),
+    limit: int = Query(50, ge=1, le=200),
+    current_admin=Depends(get_current_admin),
+    db: Session = Depends(get_db),
+):
+    """Latest background jobs, newest first (admin only)"""
+    query = db.query(Job)
+    if kind:
+        query = query.filter(Job.kind == kind)
+    if job_status:
+        query = query.filter(Job.status == job_status)
+    return query.order_by(Job.id.desc()).limit(limit).all()
+
+
+@router.get("/kinds", response_model=List[str])
+def list_startable_kinds(current_admin=Depends(get_current_admin)):
+    """Jobs that can be started through POST /jobs/ (recalculations...)"""
+    return startable_kinds()
+
+
+@router.post("/", response_model=JobResponse, status_code=status.HTTP_202_ACCEPTED)
+def start_job(
+    job_data: JobCreate,
+    current_admin=Depends(get_current_admin),
+    db: Session = Depends(get_db),
+):
+    """Start a parameterless job (admin only); poll GET /jobs/{id}"""
+    if job_data.kind not in startable_kinds():
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown job kind. Available: {', '.join(startable_kinds())}",
+        )
+    return submit_job(db, job_data.kind, admin_id=current_admin.id)
+
+
+@router.get("/{job_id}", response_model=JobResponse)
+def get_job(
+    job_id: int,
+    current_admin=Depends(get_current_admin),
+    db: Session = Depends(get_db),
+):
+    """Status, progress (processed / total), result and error of a job"""
+    return _get_job(db, job_id)
+
+
+@router.post("/{job_id}/cancel", response_model=JobResponse)
+def cancel(
+    job_id: int,
+    current_admin=Depends(get_current_admin),
+    db: Session = Depends(get_db),
+):
+    """
+    Cancel a job: immediately if still queued, at its next progress report
+    if running (work already committed stays). Finished jobs are returned as is.
+    """
+    return cancel_job(db, _get_job(db, job_id))
@@ -1,21 +1,28 @@
 # routers/landing_blocks.py
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
 from sqlalchemy.orm import Session
-import json
 
 from models.product import Product
 from schemas.landing_blocks import LandingBlocksUpdate, LandingBlocksResponse
 from utils.db import get_db
 from utils.auth import get_current_admin
+from utils.etag import not_modified, product_etag, set_etag
 
 router = APIRouter(prefix="/product", tags=["Product Landing Blocks"])
 
 
 @router.get("/{product_id}/landing-blocks", response_model=LandingBlocksResponse)
-def get_landing_blocks(product_id: int, db: Session = Depends(get_db)):
+def get_landing_blocks(
+    product_id: int,
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_db),
+):
     """
     Obtenir les blocs de la page de vente d'un produit (accès public,
     utilisé aussi par le storefront, donc pas d'authentification requise).
+
+    ETag dérivé de updated_at du produit : If-None-Match → 304 sans corps.
     """
     product = db.query(Product).filter(Product.id == product_id).first()
     if not product:
@@ -23,14 +30,13 @@ def get_landing_blocks(product_id: int, db: Session = Depends(get_db)):
             status_code=status.HTTP_404_NOT_FOUND, detail="Produit non trouvé"
         )
 
-    blocks = []
-    if product.landing_blocks:
-        try:
-            blocks = json.loads(product.landing_blocks)
-        except (json.JSONDecodeError, TypeError):
-            blocks = []
+    etag = product_etag(product, scope="landing-blocks")
+    cached = not_modified(request, etag)
+    if cached:
+        return cached
+    set_etag(response, etag)
 
-    return LandingBlocksResponse(product_id=product.id, blocks=blocks)
+    return LandingBlocksResponse(product_id=product.id, blocks=product.landing_blocks or [])
 
 
 @router.put("/{product_id}/landing-blocks", response_model=LandingBlocksResponse)
@@ -54,7 +60,7 @@ def update_landing_blocks(
             status_code=status.HTTP_404_NOT_FOUND, detail="Produit non trouvé"
         )
 
-    product.landing_blocks = json.dumps(update_data.blocks, ensure_ascii=False)
+    product.landing_blocks = update_data.blocks
     db.commit()
     db.refresh(product)
 
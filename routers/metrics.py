@@ -0,0 +1,33 @@
+# routers/metrics.py
+from fastapi import APIRouter, Depends, status
+
+from utils import metrics
+from utils.auth import get_current_admin
+from utils.db import pool_status
+
+router = APIRouter(prefix="/metrics", tags=["Metrics"])
+
+
+@router.get("", dependencies=[Depends(get_current_admin)])
+def get_metrics():
+    """
+    Métriques du processus courant (admin seulement).
+
+    - pools   : état instantané de chaque pool (taille, connexions utilisées,
+                overflow utilisé)
+    - metrics : compteurs et histogrammes cumulés depuis le démarrage
+                (attente au checkout, durée de détention des connexions et
+                des sessions par route, timeouts, overflow...)
+    """
+    return {"pools": pool_status(), "metrics": metrics.snapshot()}
+
+
+@router.post(
+    "/reset",
+    status_code=status.HTTP_204_NO_CONTENT,
+    dependencies=[Depends(get_current_admin)],
+)
+def reset_metrics():
+    """Remettre à zéro les compteurs et histogrammes (admin seulement)"""
+    metrics.reset_all()
+    return None
@@ -1,12 +1,14 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy import or_
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional, Union
 from models import notification
 from models.notification import Notification
 from schemas.notification import NotificationCreate, NotificationResponse, NotificationSummary
 from utils.db import get_db
+from utils.pagination import CURSOR_QUERY, CursorPage, apply_keyset, keyset_page
 from utils.auth import get_current_admin, get_current_user
+from utils.summary import count_of, summarize
 
 router = APIRouter(prefix="/notification", tags=["Notification"])
 
@@ -94,12 +96,13 @@ def get_all_notifications(
     return notifications
 
 
-@router.get("/admin", response_model=List[NotificationResponse])
+@router.get("/admin", response_model=Union[List[NotificationResponse], CursorPage[NotificationResponse]])
 def get_admin_notifications(
     skip: int = 0,
     limit: int = 100,
     is_sent: bool = None,
     notification_type: str = None,
+    cursor: Optional[str] = CURSOR_QUERY,
     current_admin=Depends(get_current_admin),
     db: Session = Depends(get_db)
 ):
@@ -125,6 +128,12 @@ def get_admin_notifications(
             Notification.notification_type == notification_type
         )
 
+    # keyset mode (newest first)
+    if cursor is not None:
+        notifications, next_cursor = keyset_page(
+            apply_keyset(query, Notification, cursor, limit).all(), limit)
+        return {"items": notifications, "next_cursor": next_cursor}
+
     notifications = query.order_by(
         Notification.created_at.desc()).offset(skip).limit(limit).all()
 
@@ -145,6 +154,24 @@ def get_pending_notifications(
     return notifications
 
 
+# bill / stock alert notifications belong to the admin summary, the others
+# to the general one
+_ADMIN_NOTIFICATION_TYPES = ("new_bill", "stock_alert")
+
+
+def _notification_summary(db: Session, *filters) -> NotificationSummary:
+    """All counters of one notification summary in a single SELECT"""
+    return NotificationSummary(**summarize(
+        db,
+        (Notification.admin_id == 1, *filters),
+        total_notifications=count_of(Notification.id),
+        sent_notifications=count_of(Notification.id, Notification.is_sent == True),
+        pending_notifications=count_of(Notification.id, Notification.is_sent == False),
+        email_notifications=count_of(Notification.id, Notification.channel == "email"),
+        whatsapp_notifications=count_of(Notification.id, Notification.channel == "whatsapp"),
+    ))
+
+
 @router.get("/summary", response_model=NotificationSummary)
 def get_notification_summary(
     current_admin=Depends(get_current_admin),
@@ -152,37 +179,8 @@ def get_notification_summary(
 ):
     """Get notification summary (admin only)"""
 
-    total_notifications = db.query(Notification).filter(
-        Notification.admin_id == 1,
-        Notification.notification_type != "new_bill",
-        Notification.notification_type != "stock_alert").count()
-    sent_notifications = db.query(Notification).filter(
-        Notification.admin_id == 1,
-        Notification.is_sent == True,
-        Notification.notification_type != "new_bill",
-        Notification.notification_type != "stock_alert").count()
-    pending_notifications = db.query(Notification).filter(
-        Notification.admin_id == 1,
-        Notification.is_sent == False,
-        Notification.notification_type != "new_bill",
-        Notification.notification_type != "stock_alert").count()
-    email_notifications = db.query(Notification).filter(
-        Notification.admin_id == 1,
-        Notification.channel == "email",
-        Notification.notification_type != "new_bill",
-        Notification.notification_type != "stock_alert").count()
-    whatsapp_notifications = db.query(Notification).filter(
-        Notification.admin_id == 1,
-        Notification.channel == "whatsapp",
-        Notification.notification_type != "new_bill",
-        Notification.notification_type != "stock_alert").count()
-
-    return NotificationSummary(
-        total_notifications=total_notifications,
-        sent_notifications=sent_notifications,
-        pending_notifications=pending_notifications,
-        email_notifications=email_notifications,
-        whatsapp_notifications=whatsapp_notifications
+    return _notification_summary(
+        db, Notification.notification_type.notin_(_ADMIN_NOTIFICATION_TYPES)
     )
 
 
@@ -193,48 +191,8 @@ def get_notification_summary(
 ):
     """Get notification summary (admin only)"""
 
-    total_notifications = db.query(Notification).filter(
-        Notification.admin_id == 1,
-        or_(
-            Notification.notification_type == "new_bill",
-            Notification.notification_type == "stock_alert"
-        )
-    ).count()
-    sent_notifications = db.query(Notification).filter(
-        Notification.admin_id == 1,
-        Notification.is_sent == True,
-        or_(
-            Notification.notification_type == "new_bill",
-            Notification.notification_type == "stock_alert"
-        )).count()
-    pending_notifications = db.query(Notification).filter(
-        Notification.admin_id == 1,
-        Notification.is_sent == False,
-        or_(
-            Notification.notification_type == "new_bill",
-            Notification.notification_type == "stock_alert"
-        )).count()
-    email_notifications = db.query(Notification).filter(
-        Notification.admin_id == 1,
-        Notification.channel == "email",
-        or_(
-            Notification.notification_type == "new_bill",
-            Notification.notification_type == "stock_alert"
-        )).count()
-    whatsapp_notifications = db.query(Notification).filter(
-        Notification.admin_id == 1,
-        Notification.channel == "whatsapp",
-        or_(
-            Notification.notification_type == "new_bill",
-            Notification.notification_type == "stock_alert"
-        )).count()
-
-    return NotificationSummary(
-        total_notifications=total_notifications,
-        sent_notifications=sent_notifications,
-        pending_notifications=pending_notifications,
-        email_notifications=email_notifications,
-        whatsapp_notifications=whatsapp_notifications
+    return _notification_summary(
+        db, Notification.notification_type.in_(_ADMIN_NOTIFICATION_TYPES)
     )
 
 
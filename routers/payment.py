@@ -1,11 +1,12 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional, Union
 from decimal import Decimal
 from models.payment import Payment
 from models.bill import Bill
 from schemas.payment import PaymentCreate, PaymentUpdate, PaymentResponse, PaymentHistory
 from utils.db import get_db
+from utils.pagination import CURSOR_QUERY, CursorPage, apply_keyset, keyset_page
 from utils.auth import get_current_admin
 
 router = APIRouter(prefix="/payment", tags=["Payment"])
@@ -95,15 +96,22 @@ def get_bill_payment_history(
         ) for p in payments]
     )
 
-@router.get("/", response_model=List[PaymentResponse])
+@router.get("/", response_model=Union[List[PaymentResponse], CursorPage[PaymentResponse]])
 def get_all_payments(
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = CURSOR_QUERY,
     current_admin = Depends(get_current_admin),
     db: Session = Depends(get_db)
 ):
     """Obtenir tous les paiements (admin seulement)"""
     
+    # Mode curseur (plus récents d'abord)
+    if cursor is not None:
+        payments, next_cursor = keyset_page(
+            apply_keyset(db.query(Payment), Payment, cursor, limit).all(), limit)
+        return {"items": payments, "next_cursor": next_cursor}
+    
     payments = db.query(Payment).offset(skip).limit(limit).all()
     return payments
 
@@ -1,7 +1,5 @@
-from io import BytesIO
 from fastapi import UploadFile, File
-import pandas as pd
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
 from sqlalchemy.orm import Session
 from typing import List, Optional
 import json
@@ -9,6 +7,7 @@ from sqlalchemy import func, extract, case
 from models.product import Product
 from models.category import Category
 from schemas.product import (
+    ProductChanges,
     ProductCount,
     ProductCreate,
     ProductUpdate,
@@ -18,9 +17,18 @@ from schemas.product import (
     ProductStockStatus,
     StockUpdate,
 )
-from utils.db import get_db
+from utils.db import get_db, get_read_db
 from utils.auth import get_current_admin
 from utils.stock_manager import check_and_create_stock_alert
+from utils.response_cache import cached_json, search_backend
+from utils.etag import catalog_etag, not_modified, product_etag, set_etag
+from utils.product_changes import CHANGES_PAGE_SIZE, product_changes
+from utils.product_filters import variant_filter
+from utils.product_import import sheet_missing_columns
+from utils.jobs import submit_job
+from utils.product_read_model import ADMIN, blob_select, product_list_body
+from utils.product_search import normalize_query, search_select, similarity_threshold_statement
+from utils.product_sales import database_today, product_sales_periods, product_purchases_timeline
 
 import cloudinary.uploader
 import re
@@ -118,9 +126,9 @@ def create_product(
             )
 
     # Handle multiple variants
-    variants_json = None
+    variants_data = None
     if product_data.variants:
-        variants_json = json.dumps(product_data.variants.model_dump())
+        variants_data = product_data.variants.model_dump()
 
     # FIXED: Exclude 'variants' to avoid duplicate argument error
     product_dict = product_data.dict(exclude={"category_id", "image_urls", "variants"})
@@ -128,8 +136,8 @@ def create_product(
         **product_dict,
         category_id=product_data.category_id,
         admin_id=current_admin.id,
-        image_urls=json.dumps(product_data.image_urls),
-        variants=variants_json,
+        image_urls=product_data.image_urls,
+        variants=variants_data,
     )
 
     db.add(new_product)
@@ -186,7 +194,7 @@ def update_product(
 
     # Handle image updates: delete old images that are being replaced
     if "image_urls" in update_data:
-        old_urls = json.loads(product.image_urls) if product.image_urls else []
+        old_urls = product.image_urls or []
         new_urls = update_data["image_urls"]
 
         # Find images that are being removed
@@ -198,14 +206,8 @@ def update_product(
             if deletion_result["failed"]:
                 print(f"Failed to delete old images: {deletion_result['failed']}")
 
-        update_data["image_urls"] = json.dumps(new_urls)
-
-    # FIXED: Handle variants update properly
-    # FIXED: Handle variants update properly
-    if "variants" in update_data:
-        if update_data["variants"] is not None:
-            update_data["variants"] = json.dumps(update_data["variants"])
-        # If variants is explicitly set to None, it will clear the variants
+    # variants / image_urls are JSON columns: the dicts and lists are stored
+    # as they are (variants=None clears the variants)
 
     for field, value in update_data.items():
         setattr(product, field, value)
@@ -357,7 +359,11 @@ def get_product_count(db: Session = Depends(get_db)):
 
 
 @router.get("/all/unfiltered", response_model=List[ProductWithCategory])
-def get_all_products_unfiltered(db: Session = Depends(get_db)):
+def get_all_products_unfiltered(
+    request: Request,
+    variant: Optional[str] = None,
+    db: Session = Depends(get_db),
+):
     """
     Get ALL products without filters.
 
@@ -365,38 +371,25 @@ def get_all_products_unfiltered(db: Session = Depends(get_db)):
       1. In-stock + special offer (is_sold=True)  → top
       2. In-stock regular                          → middle
       3. Out of stock (quantity_in_stock == 0)     → bottom
+
+    variant: "type:option" (e.g. taille:M) keeps the products offering it.
+
+    Served from the response cache (utils/response_cache.py) between writes;
+    If-None-Match → 304 (utils/etag.py).
     """
-    products = db.query(Product).order_by(_product_priority(), Product.id).all()
+    filters = variant_filter(variant)
+    etag = catalog_etag(db, request, *filters)
+    return not_modified(request, etag) or set_etag(
+        cached_json(
+            request, lambda: _build_all_products_unfiltered(db, filters), tags=["products"]
+        ),
+        etag,
+    )
 
-    result = []
-    for p in products:
-        variants_data = None
-        if p.variants:
-            try:
-                variants_data = ProductVariant(**json.loads(p.variants))
-            except (json.JSONDecodeError, ValueError):
-                pass
-        result.append(
-            ProductWithCategory(
-                id=p.id,
-                name=p.name,
-                description=p.description,
-                price=p.price,
-                quantity_in_stock=p.quantity_in_stock,
-                minimum_stock_level=p.minimum_stock_level,
-                image_urls=json.loads(p.image_urls) if p.image_urls else [],
-                category_id=p.category_id,
-                admin_id=p.admin_id,
-                barcode=p.barcode,
-                variants=variants_data,
-                is_sold=p.is_sold,
-                is_active=p.is_active,
-                created_at=p.created_at,
-                updated_at=p.updated_at,
-                category_name=p.category.name,
-            )
-        )
-    return result
+
+def _build_all_products_unfiltered(db: Session, filters: list = ()) -> bytes:
+    stmt = blob_select(ADMIN, *filters).order_by(_product_priority(), Product.id)
+    return product_list_body(db, ADMIN, stmt)
 
 
 # ============================================================
@@ -406,65 +399,131 @@ def get_all_products_unfiltered(db: Session = Depends(get_db)):
 
 @router.get("/", response_model=List[ProductWithCategory])
 def get_all_products(
+    request: Request,
     skip: int = 0,
     limit: int = 3000,
     category_id: Optional[int] = None,
     is_active: Optional[bool] = None,
+    variant: Optional[str] = None,
     db: Session = Depends(get_db),
 ):
     """
     Get all products with optional filters.
+    variant: "type:option" (e.g. taille:M) keeps the products offering it.
 
     Ordering:
       1. In-stock + special offer (is_sold=True)  → top
       2. In-stock regular                          → middle
       3. Out of stock (quantity_in_stock == 0)     → bottom
-    """
-    query = db.query(Product)
 
+    Served from the response cache (utils/response_cache.py) between writes;
+    If-None-Match → 304 (utils/etag.py).
+    """
+    filters = variant_filter(variant)
+    tags = ["products"]
     if category_id is not None:
-        query = query.filter(Product.category_id == category_id)
+        filters.append(Product.category_id == category_id)
+        tags.append(f"category:{category_id}")
     if is_active is not None:
-        query = query.filter(Product.is_active == is_active)
+        filters.append(Product.is_active == is_active)
+
+    etag = catalog_etag(db, request, *filters)
+    return not_modified(request, etag) or set_etag(
+        cached_json(
+            request,
+            lambda: _build_all_products(db, skip, limit, filters),
+            tags=tags,
+        ),
+        etag,
+    )
 
-    products = (
-        query.order_by(_product_priority(), Product.id).offset(skip).limit(limit).all()
+
+def _build_all_products(
+    db: Session,
+    skip: int,
+    limit: int,
+    filters: list,
+) -> bytes:
+    # stored JSON of each product (utils/product_read_model.py)
+    stmt = (
+        blob_select(ADMIN, *filters)
+        .order_by(_product_priority(), Product.id)
+        .offset(skip)
+        .limit(limit)
     )
+    return product_list_body(db, ADMIN, stmt)
 
-    result = []
-    for p in products:
-        variants_data = None
-        if p.variants:
-            try:
-                variants_data = ProductVariant(**json.loads(p.variants))
-            except (json.JSONDecodeError, ValueError):
-                pass
-        result.append(
-            ProductWithCategory(
-                id=p.id,
-                name=p.name,
-                description=p.description,
-                price=p.price,
-                quantity_in_stock=p.quantity_in_stock,
-                minimum_stock_level=p.minimum_stock_level,
-                image_urls=json.loads(p.image_urls) if p.image_urls else [],
-                category_id=p.category_id,
-                admin_id=p.admin_id,
-                barcode=p.barcode,
-                variants=variants_data,
-                is_sold=p.is_sold,
-                is_active=p.is_active,
-                created_at=p.created_at,
-                updated_at=p.updated_at,
-                category_name=p.category.name,
-            )
-        )
-    return result
+
+# ============================================================
+# SEARCH
+# ============================================================
+
+
+@router.get("/search", response_model=List[ProductWithCategory])
+def search_products(
+    request: Request,
+    q: str = Query(..., min_length=2, max_length=100),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=100),
+    category_id: Optional[int] = None,
+    is_active: Optional[bool] = None,
+    db: Session = Depends(get_db),
+):
+    """
+    Search products by name, barcode and description, best match first
+    (typo tolerant, see utils/product_search.py).
+
+    Served from the response cache (utils/response_cache.py) between writes,
+    filled from the primary (a lagging replica would cache stale rows).
+    """
+    q = normalize_query(q)
+    filters = []
+    tags = ["products"]
+    if category_id is not None:
+        filters.append(Product.category_id == category_id)
+        tags.append(f"category:{category_id}")
+    if is_active is not None:
+        filters.append(Product.is_active == is_active)
+
+    def build() -> bytes:
+        threshold = similarity_threshold_statement()
+        if threshold is not None:
+            db.execute(threshold)
+        stmt = search_select(ADMIN, q, *filters).offset(skip).limit(limit)
+        return product_list_body(db, ADMIN, stmt)
+
+    return cached_json(request, build, tags=tags, cache=search_backend)
+
+
+# ============================================================
+# CHANGE FEED
+# ============================================================
+
+
+@router.get("/changes", response_model=ProductChanges)
+def get_product_changes(
+    since: int = Query(0, ge=0),
+    limit: int = Query(CHANGES_PAGE_SIZE, ge=1, le=CHANGES_PAGE_SIZE),
+    db: Session = Depends(get_read_db),
+):
+    """
+    Products created / updated and IDs of products deleted since `since`
+    (utils/product_changes.py).
+
+    since=0 returns the whole catalog. Store the returned `token` and send it
+    as `since` next time; call again right away while `has_more` is true.
+    """
+    return Response(content=product_changes(db, since, limit), media_type="application/json")
 
 
 @router.get("/{product_id}", response_model=ProductWithCategory)
-def get_product_by_id(product_id: int, db: Session = Depends(get_db)):
-    """Get product by ID"""
+def get_product_by_id(
+    product_id: int,
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_db),
+):
+    """Get product by ID (If-None-Match → 304)"""
 
     product = db.query(Product).filter(Product.id == product_id).first()
     if not product:
@@ -472,12 +531,18 @@ def get_product_by_id(product_id: int, db: Session = Depends(get_db)):
             status_code=status.HTTP_404_NOT_FOUND, detail="Product not found"
         )
 
+    # the body embeds category_name: a renamed category changes the ETag too
+    etag = product_etag(product, scope=f"product:{product.category.name}")
+    cached = not_modified(request, etag)
+    if cached:
+        return cached
+    set_etag(response, etag)
+
     variants_data = None
     if product.variants:
         try:
-            variants_dict = json.loads(product.variants)
-            variants_data = ProductVariant(**variants_dict)
-        except (json.JSONDecodeError, ValueError):
+            variants_data = ProductVariant(**product.variants)
+        except (TypeError, ValueError):
             pass
 
     return ProductWithCategory(
@@ -487,7 +552,7 @@ def get_product_by_id(product_id: int, db: Session = Depends(get_db)):
         price=product.price,
         quantity_in_stock=product.quantity_in_stock,
         minimum_stock_level=product.minimum_stock_level,
-        image_urls=json.loads(product.image_urls) if product.image_urls else [],
+        image_urls=product.image_urls or [],
         category_id=product.category_id,
         admin_id=product.admin_id,
         barcode=product.barcode,
@@ -514,9 +579,8 @@ def get_product_by_barcode(barcode: str, db: Session = Depends(get_db)):
     variants_data = None
     if product.variants:
         try:
-            variants_dict = json.loads(product.variants)
-            variants_data = ProductVariant(**variants_dict)
-        except (json.JSONDecodeError, ValueError):
+            variants_data = ProductVariant(**product.variants)
+        except (TypeError, ValueError):
             pass
 
     return ProductWithCategory(
@@ -526,7 +590,7 @@ def get_product_by_barcode(barcode: str, db: Session = Depends(get_db)):
         price=product.price,
         quantity_in_stock=product.quantity_in_stock,
         minimum_stock_level=product.minimum_stock_level,
-        image_urls=json.loads(product.image_urls) if product.image_urls else [],
+        image_urls=product.image_urls or [],
         category_id=product.category_id,
         admin_id=product.admin_id,
         barcode=product.barcode,
@@ -684,7 +748,7 @@ def delete_product(
         )
 
     # Delete images from Cloudinary before deleting product
-    image_urls = json.loads(product.image_urls) if product.image_urls else []
+    image_urls = product.image_urls or []
     if image_urls:
         deletion_result = delete_cloudinary_images(image_urls)
         # Log failures but don't block deletion
@@ -706,9 +770,8 @@ def _format_product_response(product: Product) -> ProductResponse:
     variants_data = None
     if product.variants:
         try:
-            variants_dict = json.loads(product.variants)
-            variants_data = ProductVariant(**variants_dict)
-        except (json.JSONDecodeError, ValueError):
+            variants_data = ProductVariant(**product.variants)
+        except (TypeError, ValueError):
             pass
 
     return ProductResponse(
@@ -718,7 +781,7 @@ def _format_product_response(product: Product) -> ProductResponse:
         price=product.price,
         quantity_in_stock=product.quantity_in_stock,
         minimum_stock_level=product.minimum_stock_level,
-        image_urls=json.loads(product.image_urls) if product.image_urls else [],
+        image_urls=product.image_urls or [],
         category_id=product.category_id,
         admin_id=product.admin_id,
         barcode=product.barcode,  # NEW
@@ -772,7 +835,7 @@ def delete_product_image(
         )
 
     # Get current images
-    current_urls = json.loads(product.image_urls) if product.image_urls else []
+    current_urls = list(product.image_urls or [])
 
     # Check if image exists
     if image_url not in current_urls:
@@ -791,7 +854,7 @@ def delete_product_image(
 
     # Remove from product
     current_urls.remove(image_url)
-    product.image_urls = json.dumps(current_urls)
+    product.image_urls = current_urls
 
     db.commit()
     db.refresh(product)
@@ -830,11 +893,9 @@ def generate_barcode(db: Session = Depends(get_db)):
 def get_product_statistics(
     product_id: int,
     current_admin=Depends(get_current_admin),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
 ):
     """Get product sales statistics (admin only)"""
-    from models.bill_item import BillItem
-    from models.bill import Bill
 
     product = db.query(Product).filter(Product.id == product_id).first()
     if not product:
@@ -842,53 +903,18 @@ def get_product_statistics(
             status_code=status.HTTP_404_NOT_FOUND, detail="Product not found"
         )
 
-    now = datetime.now()
-    today_start = datetime(now.year, now.month, now.day)
-    month_start = datetime(now.year, now.month, 1)
-    year_start = datetime(now.year, 1, 1)
-
-    # Daily sales
-    daily = (
-        db.query(
-            func.sum(BillItem.quantity).label("quantity"),
-            func.sum(BillItem.subtotal).label("revenue"),
-        )
-        .join(Bill)
-        .filter(BillItem.product_id == product_id, Bill.created_at >= today_start)
-        .first()
-    )
-
-    # Monthly sales
-    monthly = (
-        db.query(
-            func.sum(BillItem.quantity).label("quantity"),
-            func.sum(BillItem.subtotal).label("revenue"),
-        )
-        .join(Bill)
-        .filter(BillItem.product_id == product_id, Bill.created_at >= month_start)
-        .first()
-    )
-
-    # Yearly sales
-    yearly = (
-        db.query(
-            func.sum(BillItem.quantity).label("quantity"),
-            func.sum(BillItem.subtotal).label("revenue"),
-        )
-        .join(Bill)
-        .filter(BillItem.product_id == product_id, Bill.created_at >= year_start)
-        .first()
-    )
+    # today / month / year from the product_sales_daily rollup (one query)
+    sales = product_sales_periods(db, product_id)
 
     return {
         "product_id": product_id,
         "product_name": product.name,
-        "daily_sales": int(daily.quantity or 0),
-        "daily_revenue": float(daily.revenue or 0),
-        "monthly_sales": int(monthly.quantity or 0),
-        "monthly_revenue": float(monthly.revenue or 0),
-        "yearly_sales": int(yearly.quantity or 0),
-        "yearly_revenue": float(yearly.revenue or 0),
+        "daily_sales": sales["today"]["quantity"],
+        "daily_revenue": sales["today"]["revenue"],
+        "monthly_sales": sales["month"]["quantity"],
+        "monthly_revenue": sales["month"]["revenue"],
+        "yearly_sales": sales["year"]["quantity"],
+        "yearly_revenue": sales["year"]["revenue"],
         "current_stock": product.quantity_in_stock,
         "stock_value": float(product.price * product.quantity_in_stock),
     }
@@ -902,7 +928,7 @@ def get_product_statistics(
 def get_product_detailed_statistics(
     product_id: int,
     current_admin=Depends(get_current_admin),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
 ):
     """Get detailed product sales statistics with hourly/daily/monthly breakdown (admin only)"""
     from models.bill_item import BillItem
@@ -914,12 +940,11 @@ def get_product_detailed_statistics(
             status_code=status.HTTP_404_NOT_FOUND, detail="Product not found"
         )
 
-    now = datetime.now()
-    today_start = datetime(now.year, now.month, now.day)
-    month_start = datetime(now.year, now.month, 1)
-    year_start = datetime(now.year, 1, 1)
+    # the database's day, like the rollup buckets
+    today = database_today(db)
+    today_start = datetime(today.year, today.month, today.day)
 
-    # Today's sales by hour
+    # Today's sales by hour (the rollup is per day: read today's bill items)
     today_sales = (
         db.query(
             extract("hour", Bill.created_at).label("hour"),
@@ -932,70 +957,16 @@ def get_product_detailed_statistics(
         .all()
     )
 
-    # Month's sales by day
-    month_sales = (
-        db.query(
-            extract("day", Bill.created_at).label("day"),
-            func.sum(BillItem.quantity).label("quantity"),
-            func.sum(BillItem.subtotal).label("revenue"),
-        )
-        .join(Bill)
-        .filter(BillItem.product_id == product_id, Bill.created_at >= month_start)
-        .group_by("day")
-        .all()
-    )
-
-    # Year's sales by month
-    year_sales = (
-        db.query(
-            extract("month", Bill.created_at).label("month"),
-            func.sum(BillItem.quantity).label("quantity"),
-            func.sum(BillItem.subtotal).label("revenue"),
-        )
-        .join(Bill)
-        .filter(BillItem.product_id == product_id, Bill.created_at >= year_start)
-        .group_by("month")
-        .all()
-    )
-
-    # Calculate totals
-    daily_total = (
-        db.query(
-            func.sum(BillItem.quantity).label("quantity"),
-            func.sum(BillItem.subtotal).label("revenue"),
-        )
-        .join(Bill)
-        .filter(BillItem.product_id == product_id, Bill.created_at >= today_start)
-        .first()
-    )
-
-    monthly_total = (
-        db.query(
-            func.sum(BillItem.quantity).label("quantity"),
-            func.sum(BillItem.subtotal).label("revenue"),
-        )
-        .join(Bill)
-        .filter(BillItem.product_id == product_id, Bill.created_at >= month_start)
-        .first()
-    )
-
-    yearly_total = (
-        db.query(
-            func.sum(BillItem.quantity).label("quantity"),
-            func.sum(BillItem.subtotal).label("revenue"),
-        )
-        .join(Bill)
-        .filter(BillItem.product_id == product_id, Bill.created_at >= year_start)
-        .first()
-    )
+    # Totals, month by day and year by month from the rollup
+    sales = product_sales_periods(db, product_id, today)
 
     return {
         "product_id": product_id,
         "product_name": product.name,
         "barcode": product.barcode,
         "today": {
-            "total_quantity": int(daily_total.quantity or 0),
-            "total_revenue": float(daily_total.revenue or 0),
+            "total_quantity": sales["today"]["quantity"],
+            "total_revenue": sales["today"]["revenue"],
             "data": [
                 {
                     "hour": int(item.hour),
@@ -1006,27 +977,27 @@ def get_product_detailed_statistics(
             ],
         },
         "month": {
-            "total_quantity": int(monthly_total.quantity or 0),
-            "total_revenue": float(monthly_total.revenue or 0),
+            "total_quantity": sales["month"]["quantity"],
+            "total_revenue": sales["month"]["revenue"],
             "data": [
                 {
-                    "day": int(item.day),
-                    "quantity": int(item.quantity or 0),
-                    "revenue": float(item.revenue or 0),
+                    "day": day,
+                    "quantity": totals["quantity"],
+                    "revenue": totals["revenue"],
                 }
-                for item in month_sales
+                for day, totals in sales["month_by_day"].items()
             ],
         },
         "year": {
-            "total_quantity": int(yearly_total.quantity or 0),
-            "total_revenue": float(yearly_total.revenue or 0),
+            "total_quantity": sales["year"]["quantity"],
+            "total_revenue": sales["year"]["revenue"],
             "data": [
                 {
-                    "month": int(item.month),
-                    "quantity": int(item.quantity or 0),
-                    "revenue": float(item.revenue or 0),
+                    "month": month,
+                    "quantity": totals["quantity"],
+                    "revenue": totals["revenue"],
                 }
-                for item in year_sales
+                for month, totals in sales["year_by_month"].items()
             ],
         },
         "current_stock": product.quantity_in_stock,
@@ -1043,11 +1014,9 @@ def get_product_purchases_timeline(
     product_id: int,
     period: str = "week",  # 'week', 'month', 'year'
     current_admin=Depends(get_current_admin),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
 ):
     """Get product purchase count timeline (admin only)"""
-    from models.bill_item import BillItem
-    from models.bill import Bill
 
     product = db.query(Product).filter(Product.id == product_id).first()
     if not product:
@@ -1055,70 +1024,16 @@ def get_product_purchases_timeline(
             status_code=status.HTTP_404_NOT_FOUND, detail="Product not found"
         )
 
-    now = datetime.now()
-
-    if period == "week":
-        start_date = now - timedelta(days=6)
-        results = (
-            db.query(
-                func.date(Bill.created_at).label("date"),
-                func.count(BillItem.id).label("purchases"),
-            )
-            .join(Bill)
-            .filter(BillItem.product_id == product_id, Bill.created_at >= start_date)
-            .group_by(func.date(Bill.created_at))
-            .all()
-        )
-
-        return {
-            "period": period,
-            "data": [
-                {"date": str(item.date), "purchases": int(item.purchases)}
-                for item in results
-            ],
-        }
-
-    elif period == "month":
-        start_date = datetime(now.year, now.month, 1)
-        results = (
-            db.query(
-                func.date(Bill.created_at).label("date"),
-                func.count(BillItem.id).label("purchases"),
-            )
-            .join(Bill)
-            .filter(BillItem.product_id == product_id, Bill.created_at >= start_date)
-            .group_by(func.date(Bill.created_at))
-            .all()
-        )
-
-        return {
-            "period": period,
-            "data": [
-                {"date": str(item.date), "purchases": int(item.purchases)}
-                for item in results
-            ],
-        }
-
-    elif period == "year":
-        start_date = datetime(now.year, 1, 1)
-        results = (
-            db.query(
-                extract("month", Bill.created_at).label("month"),
-                func.count(BillItem.id).label("purchases"),
-            )
-            .join(Bill)
-            .filter(BillItem.product_id == product_id, Bill.created_at >= start_date)
-            .group_by("month")
-            .all()
+    if period not in ("week", "month", "year"):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="period must be 'week', 'month' or 'year'",
         )
 
-        return {
-            "period": period,
-            "data": [
-                {"month": int(item.month), "purchases": int(item.purchases)}
-                for item in results
-            ],
-        }
+    return {
+        "period": period,
+        "data": product_purchases_timeline(db, product_id, period),
+    }
 
 
 # Add these imports at the top
@@ -1330,9 +1245,12 @@ def get_product_purchases_timeline(
 #             detail=f"Error processing file: {str(e)}"
 #         )
 @router.post(
-    "/bulk-upload", response_model=dict, dependencies=[Depends(get_current_admin)]
+    "/bulk-upload",
+    response_model=dict,
+    status_code=status.HTTP_202_ACCEPTED,
+    dependencies=[Depends(get_current_admin)],
 )
-async def bulk_upload_products(
+def bulk_upload_products(
     file: UploadFile = File(...),
     current_admin=Depends(get_current_admin),
     db: Session = Depends(get_db),
@@ -1351,6 +1269,10 @@ async def bulk_upload_products(
     - is_active (optional, default: True)
     - is_sold (optional, default: False)
     - variants (optional - Simple format: "size: S, M, L | color: Red, Blue")
+
+    The file is imported by a background job (utils/product_import.py,
+    utils/jobs.py): the response only carries the job id, poll
+    GET /jobs/{job_id} for progress, row counts and per-row errors.
     """
 
     if not file.filename.endswith((".xlsx", ".xls")):
@@ -1359,261 +1281,30 @@ async def bulk_upload_products(
             detail="Only Excel files (.xlsx, .xls) are allowed",
         )
 
-    def parse_simple_variants(variants_str: str) -> Optional[str]:
-        """
-        Parse simple variant format into JSON
-        Input: "size: S, M, L, XL | color: Red, Blue, Black"
-        Output: JSON string for database storage
-        """
-        try:
-            if not variants_str or variants_str.strip() == "":
-                return None
-
-            variants_list = []
-
-            # Split by pipe (|) to get each variant type
-            variant_groups = variants_str.split("|")
-
-            for group in variant_groups:
-                group = group.strip()
-                if not group:
-                    continue
-
-                # Split by colon to get type and options
-                if ":" not in group:
-                    raise ValueError(
-                        f"Invalid format: '{group}'. Expected format: 'type: option1, option2'"
-                    )
-
-                parts = group.split(":", 1)
-                variant_type = parts[0].strip().lower()
-                options_str = parts[1].strip()
-
-                if not variant_type:
-                    raise ValueError("Variant type cannot be empty")
-
-                # Split options by comma
-                options = [opt.strip() for opt in options_str.split(",") if opt.strip()]
-
-                if not options:
-                    raise ValueError(
-                        f"No options provided for variant type: {variant_type}"
-                    )
-
-                variants_list.append({"type": variant_type, "options": options})
-
-            if not variants_list:
-                return None
-
-            # Return JSON string in the format expected by the database
-            return json.dumps({"variants": variants_list})
-
-        except Exception as e:
-            raise ValueError(f"Invalid variants format: {str(e)}")
-
+    content = file.file.read()
     try:
-        # Read Excel file
-        contents = await file.read()
-        df = pd.read_excel(BytesIO(contents))
-
-        # Validate required columns
-        required_columns = ["name", "price", "quantity_in_stock"]
-        missing_columns = [col for col in required_columns if col not in df.columns]
-
-        if missing_columns:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Missing required columns: {', '.join(missing_columns)}",
-            )
-
-        results = {"total_rows": len(df), "added": 0, "skipped": 0, "errors": []}
-
-        # Get all categories for lookup
-        # categories = {
-        #     cat.name.lower(): cat.id for cat in db.query(Category).all()}
-
-        # # Get or create default category
-        # default_category = db.query(Category).first()
-        # if not default_category:
-        #     # Create a default category if none exists
-        #     default_category = Category(
-        #         name="Uncategorized",
-        #         description="Default category for bulk uploads"
-        #     )
-        #     db.add(default_category)
-        #     db.flush()
-
-        # default_category_id = default_category.id
-
-        for index, row in df.iterrows():
-            try:
-                # Skip empty rows
-                if pd.isna(row["name"]) or str(row["name"]).strip() == "":
-                    results["skipped"] += 1
-                    results["errors"].append(
-                        {
-                            "row": index + 2,  # Excel rows start at 1, header is row 1
-                            "error": "Empty product name",
-                        }
-                    )
-                    continue
-
-                # Check if product name already exists
-                product_name = str(row["name"]).strip()
-                existing_name = (
-                    db.query(Product).filter(Product.name == product_name).first()
-                )
-                if existing_name:
-                    results["skipped"] += 1
-                    results["errors"].append(
-                        {
-                            "row": index + 2,
-                            "error": f'Product with name "{product_name}" already exists (ID: {existing_name.id})',
-                        }
-                    )
-                    continue
-
-                # Handle barcode
-                barcode = None
-                if "barcode" in df.columns and not pd.isna(row["barcode"]):
-                    barcode_value = row["barcode"]
-                    # Convert to string, removing decimal if it's a float
-                    if isinstance(barcode_value, float):
-                        barcode = str(int(barcode_value))
-                    else:
-                        barcode = str(barcode_value).strip()
-
-                    # Check if barcode already exists
-                    if barcode:
-                        existing_barcode = (
-                            db.query(Product).filter(Product.barcode == barcode).first()
-                        )
-                        if existing_barcode:
-                            results["skipped"] += 1
-                            results["errors"].append(
-                                {
-                                    "row": index + 2,
-                                    "error": f'Barcode "{barcode}" already exists for product: {existing_barcode.name}',
-                                }
-                            )
-                            continue
-
-                # Generate barcode if empty
-                if not barcode:
-                    import random
-
-                    while True:
-                        barcode_base = "".join(
-                            [str(random.randint(0, 9)) for _ in range(12)]
-                        )
-                        odd_sum = sum(int(barcode_base[i]) for i in range(0, 12, 2))
-                        even_sum = sum(int(barcode_base[i]) for i in range(1, 12, 2))
-                        total = odd_sum + (even_sum * 3)
-                        check_digit = (10 - (total % 10)) % 10
-                        barcode = barcode_base + str(check_digit)
-
-                        if (
-                            not db.query(Product)
-                            .filter(Product.barcode == barcode)
-                            .first()
-                        ):
-                            break
-
-                # # Handle category
-                # category_id = default_category_id
-                # if 'category_name' in df.columns and not pd.isna(row['category_name']):
-                #     category_name = str(row['category_name']).strip().lower()
-                #     if category_name in categories:
-                #         category_id = categories[category_name]
-
-                # Handle variants with SIMPLE format
-                variants_json = None
-                if "variants" in df.columns and not pd.isna(row["variants"]):
-                    try:
-                        variants_str = str(row["variants"]).strip()
-                        if variants_str:
-                            variants_json = parse_simple_variants(variants_str)
-                    except ValueError as e:
-                        results["skipped"] += 1
-                        results["errors"].append({"row": index + 2, "error": str(e)})
-                        continue
-
-                # Prepare product data
-                product_data = {
-                    "name": product_name,
-                    "description": (
-                        str(row["description"]).strip()
-                        if "description" in df.columns
-                        and not pd.isna(row["description"])
-                        else None
-                    ),
-                    "price": float(row["price"]),
-                    "quantity_in_stock": int(row["quantity_in_stock"]),
-                    "minimum_stock_level": (
-                        int(row["minimum_stock_level"])
-                        if "minimum_stock_level" in df.columns
-                        and not pd.isna(row["minimum_stock_level"])
-                        else 10
-                    ),
-                    "category_id": 2,
-                    "barcode": barcode,
-                    "is_active": (
-                        bool(row["is_active"])
-                        if "is_active" in df.columns and not pd.isna(row["is_active"])
-                        else True
-                    ),
-                    "is_sold": (
-                        bool(row["is_sold"])
-                        if "is_sold" in df.columns and not pd.isna(row["is_sold"])
-                        else False
-                    ),
-                    "image_urls": json.dumps([]),
-                    "variants": variants_json,  # Can be None
-                    "admin_id": 1,
-                }
-
-                # Validate price and quantity
-                if product_data["price"] <= 0:
-                    results["skipped"] += 1
-                    results["errors"].append(
-                        {"row": index + 2, "error": "Price must be greater than 0"}
-                    )
-                    continue
-
-                if product_data["quantity_in_stock"] < 0:
-                    results["skipped"] += 1
-                    results["errors"].append(
-                        {"row": index + 2, "error": "Quantity cannot be negative"}
-                    )
-                    continue
-
-                # Create product
-                new_product = Product(**product_data)
-                db.add(new_product)
-                db.flush()  # Get ID without committing
-
-                # Check and create stock alert if needed
-                check_and_create_stock_alert(db, new_product)
-
-                results["added"] += 1
-
-            except Exception as e:
-                results["skipped"] += 1
-                results["errors"].append({"row": index + 2, "error": str(e)})
-                # Continue processing other rows
-
-        # Commit all changes at once
-        db.commit()
-
-        return {
-            "success": True,
-            "message": f'Processed {results["total_rows"]} rows',
-            "results": results,
-        }
-
+        missing_columns = sheet_missing_columns(content)
     except Exception as e:
-        db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error processing file: {str(e)}",
         )
+    if missing_columns:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Missing required columns: {', '.join(missing_columns)}",
+        )
+
+    job = submit_job(
+        db,
+        "product_import",
+        payload={"category_id": 2, "admin_id": 1, "filename": file.filename},
+        input_data=content,
+        admin_id=current_admin.id,
+    )
+    return {
+        "success": True,
+        "message": "Import started",
+        "job_id": job.id,
+        "status": job.status,
+    }
@@ -1,8 +1,8 @@
 # routers/public_order.py
-from fastapi import APIRouter, Depends, HTTPException, Query, status
-from typing import List, Optional
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Request, Response, status
+from fastapi.concurrency import run_in_threadpool
+from typing import List, Optional, Union
 from decimal import Decimal
-import json
 import logging
 
 from models.ecommerce_order import EcommerceOrder, DeliveryStatus
@@ -15,19 +15,53 @@ from schemas.ecommerce_order import (
     EcommerceOrderCreatedResponse,
     OrderTrackingResponse,
 )
-from utils.db import get_db
+from utils.db import get_db, get_async_db, get_async_read_db, primary_async_session
+from utils.pagination import CURSOR_QUERY, CursorPage, apply_keyset, keyset_page
 from utils.auth import get_current_admin
+from utils.product_filters import variant_filter
+from utils.product_search import normalize_query, search_select, similarity_threshold_statement
+from utils.response_cache import cached_json_async, search_backend
+from utils.product_read_model import (
+    PUBLIC,
+    blob_select,
+    product_body_async,
+    product_list_body_async,
+)
+from utils.etag import (
+    catalog_etag_from_row,
+    catalog_etag_query,
+    not_modified,
+    set_etag,
+)
 from utils.wilaya_data import (
     get_all_wilayas,
     get_communes_by_wilaya,
     get_wilaya_by_id,
     get_commune_by_id,
 )
-from utils.telegram_service import send_new_order_telegram_alert
-from utils.tracking import generate_tracking_code, generate_tracking_assets
+from utils.idempotency import begin_idempotent, idempotency_key_header
+from utils.telegram_service import queue_new_order_telegram_alert
+from utils.tracking import (
+    generate_tracking_assets,
+    next_tracking_code,
+    prerender_tracking_qr,
+    tracking_qr_digest,
+    tracking_qr_png,
+)
+from utils.stock_manager import (
+    reserve_stock,
+    set_order_delivery_status,
+    release_order_stock,
+    ProductNotFoundError,
+    ProductUnavailableError,
+    InsufficientStockError,
+    StockError,
+)
 
 from sqlalchemy.orm import Session
-from sqlalchemy import case, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import case, func, select
+from sqlalchemy.exc import IntegrityError
 
 logger = logging.getLogger(__name__)
 
@@ -58,36 +92,116 @@ def list_baladias_for_wilaya(wilaya_id: int):
 
 
 @router.get("/products")
-def list_public_products(
+async def list_public_products(
+    request: Request,
     skip: int = 0,
     limit: int = 50,
     category_id: Optional[int] = None,
-    db: Session = Depends(get_db),
+    variant: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_read_db),
 ):
-    query = db.query(Product).filter(Product.is_active == True)
+    filters = [Product.is_active == True, *variant_filter(variant)]
     if category_id is not None:
-        query = query.filter(Product.category_id == category_id)
+        filters.append(Product.category_id == category_id)
 
-    priority = case(
-        (Product.quantity_in_stock == 0, 2),
-        (Product.is_sold == True, 0),
-        else_=1,
+    # If-None-Match → 304 from one aggregate query (utils/etag.py)
+    etag = catalog_etag_from_row(
+        request, (await db.execute(catalog_etag_query(*filters))).one()
     )
-    return query.order_by(priority, Product.id).offset(skip).limit(limit).all()
+    cached = not_modified(request, etag)
+    if cached:
+        return cached
+
+    async def build():
+        nonlocal etag
+        # cache miss: body (and its ETag) from the primary, never from a
+        # replica that may not have replayed the write that invalidated it
+        async with primary_async_session(db) as primary:
+            etag = catalog_etag_from_row(
+                request, (await primary.execute(catalog_etag_query(*filters))).one()
+            )
+            # stored JSON of each product (utils/product_read_model.py)
+            priority = case(
+                (Product.quantity_in_stock == 0, 2),
+                (Product.is_sold == True, 0),
+                else_=1,
+            )
+            stmt = (
+                blob_select(PUBLIC, *filters)
+                .order_by(priority, Product.id)
+                .offset(skip)
+                .limit(limit)
+            )
+            return await product_list_body_async(primary, PUBLIC, stmt)
+
+    tags = ["products"]
+    if category_id is not None:
+        tags.append(f"category:{category_id}")
+    response = await cached_json_async(request, build, tags=tags)
+    return set_etag(response, etag)
+
+
+@router.get("/products/search")
+async def search_public_products(
+    request: Request,
+    q: str = Query(..., min_length=2, max_length=100),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=50),
+    category_id: Optional[int] = None,
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Active products matching `q`, best match first (utils/product_search.py).
+    Cache filled from the primary: a lagging replica would cache stale rows.
+    """
+    q = normalize_query(q)
+    filters = [Product.is_active == True]
+    tags = ["products"]
+    if category_id is not None:
+        filters.append(Product.category_id == category_id)
+        tags.append(f"category:{category_id}")
+
+    async def build():
+        threshold = similarity_threshold_statement()
+        if threshold is not None:
+            await db.execute(threshold)
+        stmt = search_select(PUBLIC, q, *filters).offset(skip).limit(limit)
+        return await product_list_body_async(db, PUBLIC, stmt)
+
+    return await cached_json_async(request, build, tags=tags, cache=search_backend)
 
 
 @router.get("/products/{product_id}")
-def get_public_product(product_id: int, db: Session = Depends(get_db)):
-    product = (
-        db.query(Product)
-        .filter(Product.id == product_id, Product.is_active == True)
-        .first()
-    )
-    if not product:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND, detail="Produit non trouvé"
-        )
-    return product
+async def get_public_product(
+    request: Request,
+    product_id: int,
+    db: AsyncSession = Depends(get_async_read_db),
+):
+    filters = [Product.id == product_id, Product.is_active == True]
+
+    etag_row = (await db.execute(catalog_etag_query(*filters))).one()
+    etag = catalog_etag_from_row(request, etag_row)
+    if etag_row[0]:
+        cached = not_modified(request, etag)
+        if cached:
+            return cached
+
+    async def build():
+        nonlocal etag
+        # cache miss: body and ETag from the primary (see list_public_products)
+        async with primary_async_session(db) as primary:
+            etag = catalog_etag_from_row(
+                request, (await primary.execute(catalog_etag_query(*filters))).one()
+            )
+            body = await product_body_async(primary, PUBLIC, blob_select(PUBLIC, *filters))
+        if body is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail="Produit non trouvé"
+            )
+        return body
+
+    response = await cached_json_async(request, build, tags=[f"product:{product_id}"])
+    return set_etag(response, etag)
 
 
 # ── Order creation ────────────────────────────────────────────────────────────
@@ -99,33 +213,52 @@ def get_public_product(product_id: int, db: Session = Depends(get_db)):
     status_code=status.HTTP_201_CREATED,
 )
 def create_public_order(
-    order_data: EcommerceOrderCreate, db: Session = Depends(get_db)
+    order_data: EcommerceOrderCreate,
+    background_tasks: BackgroundTasks,
+    idempotency_key: Optional[str] = Depends(idempotency_key_header),
+    db: Session = Depends(get_db),
 ):
-    # 1. Validate product
-    product = db.query(Product).filter(Product.id == order_data.product_id).first()
-    if not product:
+    # 0. Retry of an order already placed (Idempotency-Key): same response
+    idempotent = begin_idempotent(db, "public_orders", idempotency_key, order_data)
+    if idempotent.replay is not None:
+        return idempotent.replay
+
+    # 1. Validate product and reserve its stock (row locked until commit)
+    try:
+        product = reserve_stock(db, {order_data.product_id: order_data.quantity})[
+            order_data.product_id
+        ]
+    except ProductNotFoundError:
+        db.rollback()
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Produit non trouvé"
         )
-    if not product.is_active:
+    except ProductUnavailableError:
+        db.rollback()
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Ce produit n'est plus disponible",
         )
-    if product.quantity_in_stock < order_data.quantity:
+    except InsufficientStockError as e:
+        db.rollback()
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Stock insuffisant. Quantité disponible: {product.quantity_in_stock}",
+            detail=f"Stock insuffisant. Quantité disponible: {e.available}",
         )
+    except StockError as e:
+        db.rollback()
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
 
     # 2. Validate location
     wilaya = get_wilaya_by_id(order_data.wilaya_id)
     if not wilaya:
+        db.rollback()
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST, detail="Wilaya invalide"
         )
     baladia = get_commune_by_id(order_data.baladia_id, wilaya_id=order_data.wilaya_id)
     if not baladia:
+        db.rollback()
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Baladia invalide pour cette wilaya",
@@ -134,29 +267,7 @@ def create_public_order(
     # 3. Price
     unit_price = product.price
     total_price = (unit_price * order_data.quantity).quantize(Decimal("0.01"))
-    selected_variants_json = (
-        json.dumps(order_data.selected_variants, ensure_ascii=False)
-        if order_data.selected_variants
-        else None
-    )
-
-    # 4. Generate unique tracking code
-    tracking_code = None
-    for _ in range(_TRACKING_CODE_MAX_RETRIES):
-        candidate = generate_tracking_code()
-        exists = (
-            db.query(EcommerceOrder)
-            .filter(EcommerceOrder.tracking_code == candidate)
-            .first()
-        )
-        if not exists:
-            tracking_code = candidate
-            break
-
-    if not tracking_code:
-        logger.error("Could not generate a unique tracking code after max retries")
-
-    # 5. Create order — delivery_status starts at not_shipped (default)
+    # 4. Create order — delivery_status starts at not_shipped (default)
     new_order = EcommerceOrder(
         full_name=order_data.full_name,
         phone_number=order_data.phone_number,
@@ -169,53 +280,63 @@ def create_public_order(
         product_name_snapshot=product.name,
         unit_price_snapshot=unit_price,
         quantity=order_data.quantity,
-        selected_variants=selected_variants_json,
+        selected_variants=order_data.selected_variants or None,
         total_price=total_price,
-        tracking_code=tracking_code,
+        stock_reserved=True,
         # delivery_status defaults to not_shipped via model default
     )
 
-    db.add(new_order)
-    db.commit()
-    db.refresh(new_order)
+    # 5. Tracking code: allocated unique (utils/tracking.py); the unique
+    #    constraint only fires for codes issued before the allocator
+    for attempt in range(_TRACKING_CODE_MAX_RETRIES):
+        new_order.tracking_code = next_tracking_code(db, attempt)
+        try:
+            with db.begin_nested():
+                db.add(new_order)
+                db.flush()
+            break
+        except IntegrityError:
+            logger.warning(f"Tracking code {new_order.tracking_code} already taken, allocating another one")
+    else:
+        db.rollback()
+        logger.error("Could not allocate a unique tracking code after max retries")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Impossible de créer la commande, veuillez réessayer.",
+        )
 
-    # 6. Telegram notification
-    try:
-        sent = send_new_order_telegram_alert(new_order)
-        if sent:
-            new_order.telegram_notified = True
-            db.commit()
-    except Exception as e:
-        logger.error(f"Telegram alert error for order #{new_order.id}: {e}")
-
-    # 7. QR assets
-    assets = (
-        generate_tracking_assets(new_order.tracking_code)
-        if new_order.tracking_code
-        else {"tracking_code": "", "qr_code_base64": "", "tracking_url": ""}
-    )
+    # 6. Telegram notification: outbox row in the same transaction, sent in
+    #    the background (utils/outbox.py)
+    queue_new_order_telegram_alert(db, new_order)
 
-    return EcommerceOrderCreatedResponse(
+    # 7. Tracking links; the QR image is rendered once, after the response
+    assets = generate_tracking_assets(new_order.tracking_code)
+    response = EcommerceOrderCreatedResponse(
         message="Commande passée avec succès. Nous vous contacterons bientôt.",
         order_id=new_order.id,
         total_price=total_price,
         tracking_code=assets["tracking_code"],
-        qr_code_base64=assets["qr_code_base64"],
+        qr_code_url=assets["qr_code_url"],
         tracking_url=assets["tracking_url"],
     )
+    idempotent.store(status.HTTP_201_CREATED, response)
+
+    db.commit()
+    background_tasks.add_task(prerender_tracking_qr, new_order.tracking_code)
+    return response
 
 
 # ── Public tracking ───────────────────────────────────────────────────────────
 
 
 @router.get("/track", response_model=OrderTrackingResponse)
-def track_order(
+async def track_order(
     code: str = Query(...),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     code = code.strip().upper()
-    order = (
-        db.query(EcommerceOrder).filter(EcommerceOrder.tracking_code == code).first()
+    order = await db.scalar(
+        select(EcommerceOrder).where(EcommerceOrder.tracking_code == code)
     )
     if not order:
         raise HTTPException(
@@ -235,24 +356,61 @@ def track_order(
     )
 
 
+# The image of a tracking code never changes (content-addressed)
+_QR_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+@router.get("/track/{code}/qr.png", response_class=Response)
+async def track_order_qr(
+    code: str,
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
+):
+    code = code.strip().upper()
+    exists = await db.scalar(
+        select(EcommerceOrder.id).where(EcommerceOrder.tracking_code == code)
+    )
+    if not exists:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Code de suivi introuvable. Vérifiez le code et réessayez.",
+        )
+    etag = f'"{tracking_qr_digest(code)[:32]}"'
+    cached = not_modified(request, etag, cache_control=_QR_CACHE_CONTROL)
+    if cached is not None:
+        return cached
+    png, _ = await run_in_threadpool(tracking_qr_png, code)
+    return set_etag(
+        Response(content=png, media_type="image/png"), etag, cache_control=_QR_CACHE_CONTROL
+    )
+
+
 # ── Admin management ──────────────────────────────────────────────────────────
 
 
 @router.get(
     "/admin/orders",
-    response_model=List[EcommerceOrderResponse],
+    response_model=Union[
+        List[EcommerceOrderResponse], CursorPage[EcommerceOrderResponse]
+    ],
     tags=["Public Storefront - Admin"],
 )
 def get_all_ecommerce_orders(
     skip: int = 0,
     limit: int = 100,
     delivery_status_filter: Optional[DeliveryStatus] = None,
+    cursor: Optional[str] = CURSOR_QUERY,
     current_admin=Depends(get_current_admin),
     db: Session = Depends(get_db),
 ):
     query = db.query(EcommerceOrder)
     if delivery_status_filter:
         query = query.filter(EcommerceOrder.delivery_status == delivery_status_filter)
+    if cursor is not None:
+        items, next_cursor = keyset_page(
+            apply_keyset(query, EcommerceOrder, cursor, limit).all(), limit
+        )
+        return {"items": items, "next_cursor": next_cursor}
     return (
         query.order_by(EcommerceOrder.created_at.desc()).offset(skip).limit(limit).all()
     )
@@ -293,7 +451,13 @@ def update_ecommerce_order(
             status_code=status.HTTP_404_NOT_FOUND, detail="Commande non trouvée"
         )
     if update_data.delivery_status is not None:
-        order.delivery_status = update_data.delivery_status
+        try:
+            set_order_delivery_status(db, order, update_data.delivery_status)
+        except StockError as e:
+            db.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST, detail=str(e)
+            )
     if update_data.notes is not None:
         order.notes = update_data.notes
     db.commit()
@@ -316,6 +480,7 @@ def delete_ecommerce_order(
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Commande non trouvée"
         )
+    release_order_stock(db, order)
     db.delete(order)
     db.commit()
     return None
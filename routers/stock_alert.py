@@ -8,6 +8,7 @@ from models.product import Product
 from schemas.stock_alert import StockAlertResponse, StockAlertWithProduct, StockAlertUpdate, StockAlertSummary
 from utils.db import get_db
 from utils.auth import get_current_admin
+from utils.summary import count_in, count_of, summarize
 
 router = APIRouter(prefix="/stock-alert", tags=["Stock Alert"])
 
@@ -84,17 +85,14 @@ def get_stock_alert_summary(
 ):
     """Obtenir le résumé des alertes de stock (admin seulement)"""
     
-    total_alerts = db.query(StockAlert).count()
-    unresolved_alerts = db.query(StockAlert).filter(StockAlert.is_resolved == False).count()
-    resolved_alerts = db.query(StockAlert).filter(StockAlert.is_resolved == True).count()
-    critical_products = db.query(Product).filter(Product.quantity_in_stock == 0).count()
-    
-    return StockAlertSummary(
-        total_alerts=total_alerts,
-        unresolved_alerts=unresolved_alerts,
-        resolved_alerts=resolved_alerts,
-        critical_products=critical_products
-    )
+    # une seule requête : agrégats conditionnels + sous-requête sur les produits
+    return StockAlertSummary(**summarize(
+        db,
+        total_alerts=count_of(StockAlert.id),
+        unresolved_alerts=count_of(StockAlert.id, StockAlert.is_resolved == False),
+        resolved_alerts=count_of(StockAlert.id, StockAlert.is_resolved == True),
+        critical_products=count_in(Product.id, Product.quantity_in_stock == 0),
+    ))
 
 @router.get("/{alert_id}", response_model=StockAlertWithProduct)
 def get_stock_alert_by_id(
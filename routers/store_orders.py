@@ -1,8 +1,10 @@
 # routers/store_orders.py
 from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.orm import Session
-from sqlalchemy import func
-from typing import List, Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
+from typing import List, Optional, Union
+from datetime import date
 
 from models.ecommerce_order import (
     EcommerceOrder,
@@ -15,9 +17,21 @@ from schemas.ecommerce_order import (
     EcommerceOrderLivreurUpdate,
     EcommerceOrderResponse,
     EcommerceOrderSummary,
+    LivreurOrderSummary,
+)
+from utils.db import get_db, get_async_db
+from utils.order_summary import order_summary, order_summary_by_livreur
+from utils.pagination import CURSOR_QUERY, CursorPage, apply_keyset, keyset_page
+from utils.stock_manager import (
+    set_order_delivery_status,
+    release_order_stock,
+    StockError,
+)
+from utils.store_auth import (
+    get_current_store_user,
+    get_current_store_user_async,
+    get_current_store_admin,
 )
-from utils.db import get_db
-from utils.store_auth import get_current_store_user, get_current_store_admin
 
 router = APIRouter(prefix="/store/orders", tags=["Store Dashboard - Orders"])
 
@@ -43,13 +57,30 @@ def _assert_livreur_can_see(order: EcommerceOrder) -> None:
         )
 
 
+def _set_delivery_status(
+    order: EcommerceOrder, new_status: DeliveryStatus, db: Session
+) -> None:
+    """Apply a delivery status change, reserving/releasing the order's stock."""
+    try:
+        set_order_delivery_status(db, order, new_status)
+    except StockError as e:
+        db.rollback()
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+
 # ── List orders ───────────────────────────────────────────────────────────────
 
 
-@router.get("", response_model=List[EcommerceOrderResponse])
-def list_orders(
+@router.get(
+    "",
+    response_model=Union[
+        List[EcommerceOrderResponse], CursorPage[EcommerceOrderResponse]
+    ],
+)
+async def list_orders(
     skip: int = Query(0, ge=0),
     limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = CURSOR_QUERY,
     calling_status_filter: Optional[CallingStatus] = Query(
         None, alias="calling_status"
     ),
@@ -59,31 +90,37 @@ def list_orders(
     wilaya_id: Optional[int] = Query(None),
     assigned_livreur_id: Optional[int] = Query(None),
     search_phone: Optional[str] = Query(None),
-    current_user: StoreUser = Depends(get_current_store_user),
-    db: Session = Depends(get_db),
+    current_user: StoreUser = Depends(get_current_store_user_async),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    query = db.query(EcommerceOrder)
+    query = select(EcommerceOrder)
 
     if current_user.role == StoreUserRole.livreur:
-        query = query.filter(EcommerceOrder.is_hidden_from_livreurs == False)
+        query = query.where(EcommerceOrder.is_hidden_from_livreurs == False)
 
     if calling_status_filter:
-        query = query.filter(EcommerceOrder.calling_status == calling_status_filter)
+        query = query.where(EcommerceOrder.calling_status == calling_status_filter)
     if delivery_status_filter:
-        query = query.filter(EcommerceOrder.delivery_status == delivery_status_filter)
+        query = query.where(EcommerceOrder.delivery_status == delivery_status_filter)
     if wilaya_id is not None:
-        query = query.filter(EcommerceOrder.wilaya_id == wilaya_id)
+        query = query.where(EcommerceOrder.wilaya_id == wilaya_id)
     if assigned_livreur_id is not None:
-        query = query.filter(EcommerceOrder.assigned_livreur_id == assigned_livreur_id)
+        query = query.where(EcommerceOrder.assigned_livreur_id == assigned_livreur_id)
     if search_phone:
-        query = query.filter(EcommerceOrder.phone_number.ilike(f"%{search_phone}%"))
+        query = query.where(EcommerceOrder.phone_number.ilike(f"%{search_phone}%"))
+
+    if cursor is not None:
+        result = await db.execute(apply_keyset(query, EcommerceOrder, cursor, limit))
+        items, next_cursor = keyset_page(result.scalars().all(), limit)
+        return {"items": items, "next_cursor": next_cursor}
 
-    return (
-        query.order_by(EcommerceOrder.created_at.desc()).offset(skip).limit(limit).all()
+    result = await db.execute(
+        query.order_by(EcommerceOrder.created_at.desc()).offset(skip).limit(limit)
     )
+    return result.scalars().all()
 
 
-# ── Summary (admin only) ──────────────────────────────────────────────────────
+# ── Summaries ─────────────────────────────────────────────────────────────────
 
 
 @router.get(
@@ -92,43 +129,43 @@ def list_orders(
     tags=["Store Dashboard - Orders (Admin)"],
 )
 def get_orders_summary(
+    date_from: Optional[date] = Query(None),
+    date_to: Optional[date] = Query(None),
+    livreur_id: Optional[int] = Query(None),
     _admin: StoreUser = Depends(get_current_store_admin),
     db: Session = Depends(get_db),
 ):
-    def count(filters) -> int:
-        return db.query(func.count(EcommerceOrder.id)).filter(*filters).scalar()
-
-    return EcommerceOrderSummary(
-        total_orders=count([]),
-        # Delivery axis
-        not_shipped_orders=count(
-            [EcommerceOrder.delivery_status == DeliveryStatus.not_shipped]
-        ),
-        in_delivery_orders=count(
-            [EcommerceOrder.delivery_status == DeliveryStatus.shipped]
-        ),
-        delivered_orders=count(
-            [EcommerceOrder.delivery_status == DeliveryStatus.delivered]
-        ),
-        returned_orders=count(
-            [EcommerceOrder.delivery_status == DeliveryStatus.returned]
-        ),
-        cancelled_orders=count(
-            [EcommerceOrder.delivery_status == DeliveryStatus.cancelled]
-        ),
-        # Calling axis
-        not_called_orders=count(
-            [EcommerceOrder.calling_status == CallingStatus.not_called]
-        ),
-        confirmed_by_phone_orders=count(
-            [EcommerceOrder.calling_status == CallingStatus.confirmed_by_phone]
-        ),
-        cancelled_by_phone_orders=count(
-            [EcommerceOrder.calling_status == CallingStatus.cancelled_by_phone]
-        ),
-        unreachable_orders=count(
-            [EcommerceOrder.calling_status == CallingStatus.unreachable]
-        ),
+    return order_summary(db, date_from, date_to, livreur_id)
+
+
+@router.get(
+    "/summary/by-livreur",
+    response_model=List[LivreurOrderSummary],
+    tags=["Store Dashboard - Orders (Admin)"],
+)
+def get_orders_summary_by_livreur(
+    date_from: Optional[date] = Query(None),
+    date_to: Optional[date] = Query(None),
+    _admin: StoreUser = Depends(get_current_store_admin),
+    db: Session = Depends(get_db),
+):
+    return order_summary_by_livreur(db, date_from, date_to)
+
+
+@router.get("/summary/me", response_model=EcommerceOrderSummary)
+def get_my_orders_summary(
+    date_from: Optional[date] = Query(None),
+    date_to: Optional[date] = Query(None),
+    current_user: StoreUser = Depends(get_current_store_user),
+    db: Session = Depends(get_db),
+):
+    """Counters of the orders assigned to the current user (livreur view)"""
+    return order_summary(
+        db,
+        date_from,
+        date_to,
+        livreur_id=current_user.id,
+        visible_only=current_user.role == StoreUserRole.livreur,
     )
 
 
@@ -167,7 +204,7 @@ def update_order(
         )
 
     if update_data.delivery_status is not None:
-        order.delivery_status = update_data.delivery_status
+        _set_delivery_status(order, update_data.delivery_status, db)
     if update_data.calling_status is not None:
         order.calling_status = update_data.calling_status
     if update_data.notes is not None:
@@ -220,7 +257,7 @@ def livreur_update_order(
     if update_data.calling_status is not None:
         order.calling_status = update_data.calling_status
     if update_data.delivery_status is not None:
-        order.delivery_status = update_data.delivery_status
+        _set_delivery_status(order, update_data.delivery_status, db)
     if update_data.livreur_notes is not None:
         order.livreur_notes = update_data.livreur_notes
 
@@ -304,6 +341,7 @@ def delete_order(
     db: Session = Depends(get_db),
 ):
     order = _get_order_or_404(order_id, db)
+    release_order_stock(db, order)
     db.delete(order)
     db.commit()
     return None
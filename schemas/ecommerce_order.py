@@ -1,4 +1,5 @@
 # schemas/ecommerce_order.py
+import json
 from pydantic import BaseModel, field_validator
 from typing import Optional, Dict, Any
 from decimal import Decimal
@@ -32,7 +33,7 @@ class EcommerceOrderCreatedResponse(BaseModel):
     order_id: int
     total_price: Decimal
     tracking_code: str
-    qr_code_base64: str
+    qr_code_url: str  # GET /public/track/{code}/qr.png
     tracking_url: str
 
 
@@ -102,6 +103,14 @@ class EcommerceOrderResponse(BaseModel):
 
     model_config = {"from_attributes": True}
 
+    @field_validator("selected_variants", mode="before")
+    @classmethod
+    def variants_as_json_string(cls, v):
+        # stored as JSONB; the API keeps returning the JSON string
+        if v is None or isinstance(v, str):
+            return v
+        return json.dumps(v, ensure_ascii=False)
+
 
 # ── Summary ───────────────────────────────────────────────────────────────────
 
@@ -119,3 +128,7 @@ class EcommerceOrderSummary(BaseModel):
     confirmed_by_phone_orders: int
     cancelled_by_phone_orders: int
     unreachable_orders: int
+
+
+class LivreurOrderSummary(EcommerceOrderSummary):
+    livreur_id: Optional[int]  # None = orders not assigned yet
@@ -0,0 +1,29 @@
+from pydantic import BaseModel, Field
+from datetime import datetime
+from typing import Any, Optional
+
+from models.job import JobStatus
+
+
+# Job Create Schema (parameterless jobs, see GET /jobs/kinds)
+class JobCreate(BaseModel):
+    kind: str = Field(..., max_length=50)
+
+
+# Job Response Schema
+class JobResponse(BaseModel):
+    id: int
+    kind: str
+    status: JobStatus
+    processed: int
+    total: Optional[int]
+    result: Optional[Any]
+    error: Optional[str]
+    cancel_requested: bool
+    admin_id: Optional[int]
+    created_at: datetime
+    started_at: Optional[datetime]
+    finished_at: Optional[datetime]
+
+    class Config:
+        from_attributes = True
@@ -135,6 +135,14 @@ class ProductWithCategory(ProductResponse):
         from_attributes = True
 
 
+class ProductChanges(BaseModel):
+    """Change feed page (GET /product/changes)"""
+    token: int  # `since` of the next call
+    has_more: bool
+    deleted: List[int]  # IDs of deleted products
+    products: List[ProductWithCategory]  # created / updated, oldest change first
+
+
 class ProductStockStatus(BaseModel):
     id: int
     name: str
@@ -10,9 +10,27 @@ from .auth import (
 from .stock_manager import (
     check_and_create_stock_alert,
     check_product_availability,
-    update_product_stock
+    update_product_stock,
+    reserve_stock,
+    release_stock,
+    StockError,
+    ProductNotFoundError,
+    ProductUnavailableError,
+    InsufficientStockError,
 )
 
+from .bill_stats import rebuild_bill_daily_stats
+from .product_sales import rebuild_product_sales_daily
+from .order_summary import invalidate_order_summary
+from .response_cache import invalidate_tags
+from .product_read_model import rebuild_product_read_model
+
+# Background jobs (the import module registers the "product_import" job)
+from .jobs import submit_job, cancel_job
+from .product_import import import_products
+from .idempotency import purge_idempotency_keys
+from .outbox import purge_outbox
+
 from .notification_manager import (
     create_bill_notification,
     create_stock_alert_notification,
@@ -32,6 +50,26 @@ __all__ = [
     "check_and_create_stock_alert",
     "check_product_availability",
     "update_product_stock",
+    "reserve_stock",
+    "release_stock",
+    "StockError",
+    "ProductNotFoundError",
+    "ProductUnavailableError",
+    "InsufficientStockError",
+
+    # Statistics rollups / cached summaries
+    "rebuild_bill_daily_stats",
+    "rebuild_product_sales_daily",
+    "invalidate_order_summary",
+    "invalidate_tags",
+    "rebuild_product_read_model",
+
+    # Background jobs
+    "submit_job",
+    "cancel_job",
+    "import_products",
+    "purge_idempotency_keys",
+    "purge_outbox",
 
     # Notification manager utilities
     "create_bill_notification",
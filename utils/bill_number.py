@@ -0,0 +1,52 @@
+# utils/bill_number.py
+#
+# Bill number allocator backed by a per-day counter row (bill_number_counters).
+#
+# One atomic upsert per bill:
+#   INSERT ... ON CONFLICT (series, day) DO UPDATE SET last_value = last_value + 1
+#   RETURNING last_value
+# - O(1): no COUNT(*) over bills
+# - safe under concurrency: the counter row is locked until the bill's
+#   transaction commits, so two bills can never get the same number, and a
+#   rolled back bill gives its number back (no gaps)
+#
+from datetime import date, datetime
+from typing import Optional
+
+from sqlalchemy.orm import Session
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from models.bill_number_counter import BillNumberCounter
+
+BILL_SERIES = "BILL"
+OUTSIDE_PURCHASE_SERIES = "HS"
+
+# series → format of the number (kept identical to the historical formats)
+_FORMATS = {
+    BILL_SERIES: "BILL-{day:%Y%m%d}-{value:04d}",
+    OUTSIDE_PURCHASE_SERIES: "Achats Hors Système - {day:%Y%m%d} - {value:04d}",
+}
+
+
+def _next_value(db: Session, series: str, day: date) -> int:
+    """Increment and return the counter of (series, day), creating it on first use"""
+    dialect = db.get_bind().dialect.name
+    insert = pg_insert if dialect == "postgresql" else sqlite_insert
+
+    stmt = insert(BillNumberCounter).values(series=series, day=day, last_value=1)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[BillNumberCounter.series, BillNumberCounter.day],
+        set_={"last_value": BillNumberCounter.last_value + 1},
+    ).returning(BillNumberCounter.last_value)
+    return db.execute(stmt).scalar_one()
+
+
+def next_bill_number(db: Session, series: str = BILL_SERIES, day: Optional[date] = None) -> str:
+    """
+    Allocate the next bill number of the day, e.g. BILL-20261017-0042
+
+    Must be called inside the transaction that inserts the bill (no commit here).
+    """
+    day = day or datetime.now().date()
+    return _FORMATS[series].format(day=day, value=_next_value(db, series, day))
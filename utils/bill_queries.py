@@ -0,0 +1,79 @@
+# utils/bill_queries.py
+#
+# Shared bill loading + serialization for routers/bill.py.
+#
+# - Items are loaded with selectinload (one extra query per page, whatever
+#   the number of bills) and the client with joinedload (same query), instead
+#   of two lazy loads per bill.
+# - The serializer builds the response dicts in one pass; FastAPI validates
+#   them against BillWithItems / BillWithClient / BillResponse.
+#
+from fastapi import HTTPException, status
+from sqlalchemy.orm import Session, Query, joinedload, selectinload
+
+from models.bill import Bill
+
+
+def bill_query(db: Session, with_items: bool = True, with_client: bool = False) -> Query:
+    """db.query(Bill) with the relationships the response needs loaded eagerly"""
+    options = []
+    if with_items:
+        options.append(selectinload(Bill.bill_items))
+    if with_client:
+        options.append(joinedload(Bill.client))
+    return db.query(Bill).options(*options)
+
+
+def get_bill_or_404(
+    db: Session,
+    bill_id: int,
+    with_items: bool = True,
+    with_client: bool = False,
+    detail: str = "Facture non trouvée",
+) -> Bill:
+    bill = bill_query(db, with_items, with_client).filter(Bill.id == bill_id).first()
+    if not bill:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=detail)
+    return bill
+
+
+def serialize_bill_item(item) -> dict:
+    return {
+        "id": item.id,
+        "product_id": item.product_id,
+        "product_name": item.product_name,
+        "unit_price": item.unit_price,
+        "quantity": item.quantity,
+        "subtotal": item.subtotal,
+        "selected_variants": item.selected_variants or None,
+        "created_at": item.created_at,
+    }
+
+
+def serialize_bill(bill: Bill, with_items: bool = True, with_client: bool = False) -> dict:
+    """Bill → dict matching BillResponse (+ items → BillWithItems, + client → BillWithClient)"""
+    data = {
+        "id": bill.id,
+        "bill_number": bill.bill_number,
+        "client_id": bill.client_id,
+        "total_amount": bill.total_amount,
+        "total_paid": bill.total_paid,
+        "total_remaining": bill.total_remaining,
+        "status": bill.status,
+        "delivery_status": bill.delivery_status,
+        "created_at": bill.created_at,
+        "updated_at": bill.updated_at,
+        "notification_sent": bill.notification_sent,
+    }
+    if with_items:
+        data["items"] = [serialize_bill_item(item) for item in bill.bill_items]
+    if with_client:
+        client = bill.client
+        data["client_name"] = client.username
+        data["client_email"] = client.email
+        data["client_phone"] = client.phone_number
+    return data
+
+
+def serialize_bills(bills, with_items: bool = True, with_client: bool = False) -> list:
+    return [serialize_bill(bill, with_items, with_client) for bill in bills]
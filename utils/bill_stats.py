@@ -0,0 +1,265 @@
+# utils/bill_stats.py
+#
+# Incremental bill statistics rollup (table bill_daily_stats, one row per
+# day + hour of Bill.created_at).
+#
+# Every flush of a SessionLocal session that inserts, updates or deletes a
+# Bill applies the difference to the matching rollup rows in the same
+# transaction: bill creation, payments (total_paid / total_remaining /
+# status), corrections and deletions are all covered without touching the
+# endpoints that perform them. Bulk `db.query(Bill).delete()` bypasses the
+# ORM: callers must use reset_bill_daily_stats() (see DELETE /bill/delete-all).
+#
+# /bill/statistics/* then read at most 24 rows per day of the requested
+# period instead of scanning the bills table.
+#
+# Backfill / repair:
+#     python -m utils.bill_stats rebuild
+#
+import sys
+from collections import defaultdict
+from datetime import date
+from decimal import Decimal
+from typing import Optional
+
+from sqlalchemy import Date, Integer, case, cast, delete, event, extract, func, insert, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from models.bill import Bill
+from models.bill_daily_stats import BillDailyStats
+from utils.db import SessionLocal
+
+_FIELDS = (
+    "total_bills",
+    "total_revenue",
+    "total_paid",
+    "total_pending",
+    "paid_bills",
+    "unpaid_bills",
+)
+_DELTAS_KEY = "bill_stats_deltas"
+_NEW_BILLS_KEY = "bill_stats_new_bills"
+
+
+# ── Incremental maintenance ───────────────────────────────────────────────────
+
+
+def _contribution(created_at, total_amount, total_paid, total_remaining, status):
+    """(bucket, values) a single bill adds to the rollup"""
+    if created_at is None:
+        return None, None
+    return (created_at.date(), created_at.hour), {
+        "total_bills": 1,
+        "total_revenue": total_amount or Decimal("0.00"),
+        "total_paid": total_paid or Decimal("0.00"),
+        "total_pending": total_remaining or Decimal("0.00"),
+        "paid_bills": 1 if status == "paid" else 0,
+        "unpaid_bills": 1 if status == "not paid" else 0,
+    }
+
+
+def _new_deltas() -> dict:
+    return defaultdict(lambda: dict.fromkeys(_FIELDS, 0))
+
+
+def _add(deltas: dict, bucket, values: dict, sign: int) -> None:
+    if bucket is None:
+        return
+    row = deltas[bucket]
+    for field in _FIELDS:
+        row[field] += sign * values[field]
+
+
+def _bill_contribution(bill: Bill):
+    return _contribution(
+        bill.created_at, bill.total_amount, bill.total_paid, bill.total_remaining, bill.status
+    )
+
+
+@event.listens_for(SessionLocal, "before_flush")
+def _collect_bill_changes(session: Session, flush_context, instances) -> None:
+    changed = [
+        obj for obj in session.dirty
+        if isinstance(obj, Bill) and session.is_modified(obj, include_collections=False)
+    ]
+    deleted = [obj for obj in session.deleted if isinstance(obj, Bill)]
+    new = [obj for obj in session.new if isinstance(obj, Bill)]
+    if not (changed or deleted or new):
+        return
+
+    deltas = session.info.setdefault(_DELTAS_KEY, _new_deltas())
+
+    ids = [obj.id for obj in changed + deleted]
+    if ids:
+        with session.no_autoflush:
+            # The rows still hold the values before this flush
+            old_rows = session.execute(
+                select(
+                    Bill.created_at,
+                    Bill.total_amount,
+                    Bill.total_paid,
+                    Bill.total_remaining,
+                    Bill.status,
+                ).where(Bill.id.in_(ids))
+            ).all()
+            for row in old_rows:
+                _add(deltas, *_contribution(*row), sign=-1)
+            for obj in changed:
+                _add(deltas, *_bill_contribution(obj), sign=1)
+
+    # created_at of new bills is only known after the INSERT (eager_defaults)
+    session.info.setdefault(_NEW_BILLS_KEY, []).extend(new)
+
+
+@event.listens_for(SessionLocal, "after_flush")
+def _apply_bill_changes(session: Session, flush_context) -> None:
+    deltas = session.info.pop(_DELTAS_KEY, None)
+    new = session.info.pop(_NEW_BILLS_KEY, None)
+    if new:
+        if deltas is None:
+            deltas = _new_deltas()
+        for obj in new:
+            _add(deltas, *_bill_contribution(obj), sign=1)
+    if not deltas:
+        return
+
+    # always lock the rollup rows in (day, hour) order: two bill
+    # transactions touching the same buckets can never deadlock
+    rows = [
+        {"day": day, "hour": hour, **values}
+        for (day, hour), values in sorted(deltas.items())
+        if any(values[field] for field in _FIELDS)
+    ]
+    if not rows:
+        return
+
+    connection = session.connection()
+    dialect_insert = pg_insert if connection.dialect.name == "postgresql" else sqlite_insert
+    stmt = dialect_insert(BillDailyStats).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[BillDailyStats.day, BillDailyStats.hour],
+        set_={field: getattr(BillDailyStats, field) + stmt.excluded[field] for field in _FIELDS},
+    )
+    connection.execute(stmt)
+
+
+@event.listens_for(SessionLocal, "after_rollback")
+def _drop_bill_changes(session: Session) -> None:
+    session.info.pop(_DELTAS_KEY, None)
+    session.info.pop(_NEW_BILLS_KEY, None)
+
+
+def reset_bill_daily_stats(db: Session) -> None:
+    """Empty the rollup (after a bulk delete of all bills). No commit."""
+    db.execute(delete(BillDailyStats))
+
+
+def rebuild_bill_daily_stats(db: Session) -> int:
+    """Recompute the whole rollup from the bills table. Returns the number of rows."""
+    day = cast(Bill.created_at, Date)
+    hour = cast(extract("hour", Bill.created_at), Integer)
+    source = (
+        select(
+            day,
+            hour,
+            func.count(Bill.id),
+            func.coalesce(func.sum(Bill.total_amount), 0),
+            func.coalesce(func.sum(Bill.total_paid), 0),
+            func.coalesce(func.sum(Bill.total_remaining), 0),
+            func.sum(case((Bill.status == "paid", 1), else_=0)),
+            func.sum(case((Bill.status == "not paid", 1), else_=0)),
+        )
+        .where(Bill.created_at.isnot(None))
+        .group_by(day, hour)
+    )
+
+    db.execute(delete(BillDailyStats))
+    db.execute(
+        insert(BillDailyStats).from_select(["day", "hour", *_FIELDS], source)
+    )
+    db.commit()
+    return db.query(BillDailyStats).count()
+
+
+# ── Reads ─────────────────────────────────────────────────────────────────────
+
+
+def _period_label(granularity: str, row) -> str:
+    if granularity == "hour":
+        return int(row.hour)
+    if granularity == "day":
+        return row.day.isoformat() if isinstance(row.day, date) else str(row.day)
+    if granularity == "month":
+        return f"{int(row.year):04d}-{int(row.month):02d}"
+    return f"{int(row.year):04d}"
+
+
+def bill_stats_series(
+    db: Session,
+    granularity: str,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+) -> list:
+    """
+    Bill statistics grouped by hour / day / month / year from the rollup
+
+    Args:
+        granularity: "hour", "day", "month" or "year"
+        start, end: inclusive day range (optional)
+
+    Returns:
+        [{"period", "total_bills", "total_revenue", "total_paid",
+          "total_pending", "paid_bills", "unpaid_bills"}, ...] sorted by period;
+        amounts are the exact Decimal sums
+    """
+
+    group_columns = {
+        "hour": [BillDailyStats.hour.label("hour")],
+        "day": [BillDailyStats.day.label("day")],
+        "month": [
+            extract("year", BillDailyStats.day).label("year"),
+            extract("month", BillDailyStats.day).label("month"),
+        ],
+        "year": [extract("year", BillDailyStats.day).label("year")],
+    }[granularity]
+
+    query = db.query(
+        *group_columns,
+        func.sum(BillDailyStats.total_bills).label("total_bills"),
+        func.sum(BillDailyStats.total_revenue).label("total_revenue"),
+        func.sum(BillDailyStats.total_paid).label("total_paid"),
+        func.sum(BillDailyStats.total_pending).label("total_pending"),
+        func.sum(BillDailyStats.paid_bills).label("paid_bills"),
+        func.sum(BillDailyStats.unpaid_bills).label("unpaid_bills"),
+    )
+    if start is not None:
+        query = query.filter(BillDailyStats.day >= start)
+    if end is not None:
+        query = query.filter(BillDailyStats.day <= end)
+
+    rows = query.group_by(*group_columns).order_by(*group_columns).all()
+
+    return [
+        {
+            "period": _period_label(granularity, row),
+            "total_bills": int(row.total_bills or 0),
+            "total_revenue": row.total_revenue or Decimal("0.00"),
+            "total_paid": row.total_paid or Decimal("0.00"),
+            "total_pending": row.total_pending or Decimal("0.00"),
+            "paid_bills": int(row.paid_bills or 0),
+            "unpaid_bills": int(row.unpaid_bills or 0),
+        }
+        # buckets whose bills were all deleted stay in the table with zeros
+        for row in rows
+        if row.total_bills
+    ]
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] != ["rebuild"]:
+        print("usage: python -m utils.bill_stats rebuild")
+        sys.exit(1)
+    with SessionLocal() as db:
+        print(f"bill_daily_stats rebuilt: {rebuild_bill_daily_stats(db)} rows")
@@ -4,11 +4,22 @@ Dynamic configuration for local development and Railway deployment
 """
 import os
 import sys
-from sqlalchemy import create_engine, text
+import time
+import itertools
+import threading
+from contextlib import asynccontextmanager, contextmanager
+from fastapi import Request
+from sqlalchemy import JSON, create_engine, text, event, exc as sa_exc
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import NullPool, QueuePool, AsyncAdaptedQueuePool
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, Session
 from dotenv import load_dotenv
 
+from utils import metrics
+
 # Load environment variables
 load_dotenv()
 
@@ -41,12 +52,125 @@ engine_kwargs = {
     "echo": os.getenv("SQL_ECHO", "False").lower() == "true",
 }
 
+
+# ============================================================
+# Pool telemetry — exposed by GET /metrics
+# ============================================================
+
+POOL_CHECKOUT_WAIT = metrics.histogram(
+    "db_pool_checkout_wait_seconds",
+    "Time spent waiting for a connection from the pool")
+POOL_CONNECTION_HOLD = metrics.histogram(
+    "db_pool_connection_hold_seconds",
+    "Time between checkout and checkin of a pooled connection")
+POOL_CONNECTIONS_CREATED = metrics.counter(
+    "db_pool_connections_created_total",
+    "New DBAPI connections opened by the pool")
+POOL_OVERFLOW_CREATED = metrics.counter(
+    "db_pool_overflow_connections_created_total",
+    "Connections opened beyond pool_size (max_overflow in use)")
+POOL_CHECKOUTS = metrics.counter(
+    "db_pool_checkouts_total",
+    "Connections checked out of the pool")
+POOL_TIMEOUTS = metrics.counter(
+    "db_pool_timeouts_total",
+    "Checkouts that gave up after pool_timeout (pool exhausted)")
+SESSION_HOLD = metrics.histogram(
+    "db_session_hold_seconds",
+    "Lifetime of the request-scoped session, per route")
+
+
+class _InstrumentedPoolMixin:
+    """Times Pool.connect() (= checkout wait, pre-ping included) and counts timeouts"""
+
+    metrics_label = "default"
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            return super().connect()
+        except sa_exc.TimeoutError:
+            POOL_TIMEOUTS.inc(pool=self.metrics_label)
+            raise
+        finally:
+            POOL_CHECKOUT_WAIT.observe(
+                time.perf_counter() - started, pool=self.metrics_label)
+
+    def recreate(self):
+        # engine.dispose() swaps the pool: keep the label on the new one
+        new_pool = super().recreate()
+        new_pool.metrics_label = self.metrics_label
+        return new_pool
+
+
+class InstrumentedQueuePool(_InstrumentedPoolMixin, QueuePool):
+    pass
+
+
+class InstrumentedAsyncQueuePool(_InstrumentedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+_instrumented_engines = {}
+
+
+def instrument_engine(sync_engine, label: str) -> None:
+    """Attach the pool event listeners of `sync_engine` (use .sync_engine for async engines)"""
+    sync_engine.pool.metrics_label = label
+    _instrumented_engines[label] = sync_engine
+
+    @event.listens_for(sync_engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        POOL_CONNECTIONS_CREATED.inc(pool=label)
+        overflow = getattr(sync_engine.pool, "overflow", None)
+        if overflow and overflow() > 0:
+            POOL_OVERFLOW_CREATED.inc(pool=label)
+
+    @event.listens_for(sync_engine, "checkout")
+    def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+        POOL_CHECKOUTS.inc(pool=label)
+        connection_record.info["checked_out_at"] = time.perf_counter()
+
+    @event.listens_for(sync_engine, "checkin")
+    def _on_checkin(dbapi_connection, connection_record):
+        checked_out_at = connection_record.info.pop("checked_out_at", None)
+        if checked_out_at is not None:
+            POOL_CONNECTION_HOLD.observe(
+                time.perf_counter() - checked_out_at, pool=label)
+
+
+def pool_status() -> dict:
+    """Live gauges of every instrumented pool: size, in use, overflow in use"""
+    status = {}
+    for label, sync_engine in _instrumented_engines.items():
+        pool = sync_engine.pool
+        if not isinstance(pool, QueuePool):
+            status[label] = {"status": pool.status()}
+            continue
+        status[label] = {
+            "pool_size": pool.size(),
+            "max_overflow": pool._max_overflow,
+            "checked_out": pool.checkedout(),
+            "idle": pool.checkedin(),
+            "overflow_in_use": max(0, pool.overflow()),
+            "timeout": pool.timeout(),
+        }
+    return status
+
+
+def _route_label(request: Request) -> str:
+    route = request.scope.get("route")
+    path = getattr(route, "path", None) or request.url.path
+    return f"{request.method} {path}"
+
+
 # SQLite configuration (if you ever need it for testing)
 if DATABASE_URL.startswith("sqlite"):
     engine_kwargs["connect_args"] = {"check_same_thread": False}
 else:
     # PostgreSQL specific configuration
     engine_kwargs.update({
+        "poolclass": InstrumentedQueuePool,
         "pool_size": int(os.getenv("DB_POOL_SIZE", "10")),
         "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", "20")),
         "pool_timeout": 30,
@@ -54,24 +178,285 @@ else:
 
 # Create engine
 engine = create_engine(DATABASE_URL, **engine_kwargs)
+instrument_engine(engine, "primary")
 
 # Session factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+
+# ============================================================
+# Async engine (asyncpg) — same database, same pool settings
+# ============================================================
+
+def _to_async_url(url: str) -> str:
+    """
+    Convertir l'URL synchrone en URL pour un driver async.
+    postgresql:// ou postgresql+psycopg2://  →  postgresql+asyncpg://
+    sqlite://                                →  sqlite+aiosqlite://
+    """
+    sa_url = make_url(url)
+    if sa_url.get_backend_name() == "sqlite":
+        return sa_url.set(drivername="sqlite+aiosqlite").render_as_string(hide_password=False)
+    return sa_url.set(drivername="postgresql+asyncpg").render_as_string(hide_password=False)
+
+
+ASYNC_DATABASE_URL = _to_async_url(DATABASE_URL)
+
+# check_same_thread is a sqlite3 (sync) option, aiosqlite does not accept it
+async_engine_kwargs = {
+    key: value for key, value in engine_kwargs.items() if key != "connect_args"
+}
+if "poolclass" in async_engine_kwargs:
+    async_engine_kwargs["poolclass"] = InstrumentedAsyncQueuePool
+
+# Create async engine
+async_engine = create_async_engine(ASYNC_DATABASE_URL, **async_engine_kwargs)
+instrument_engine(async_engine.sync_engine, "primary_async")
+
+# Async session factory
+# expire_on_commit=False: attributes stay loaded after commit, no lazy IO
+# outside of an await (which would raise MissingGreenlet)
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False,
+)
+
+
+# ============================================================
+# Read replicas (optional)
+# DATABASE_REPLICA_URLS=postgresql://...@replica1/db,postgresql://...@replica2/db
+# ============================================================
+
+DATABASE_REPLICA_URLS = [
+    url.strip().replace("postgres://", "postgresql://", 1)
+    if url.strip().startswith("postgres://") else url.strip()
+    for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",")
+    if url.strip()
+]
+
+# A replica lagging more than this is skipped (reads go to the primary instead)
+REPLICA_MAX_LAG_SECONDS = float(os.getenv("DB_REPLICA_MAX_LAG_SECONDS", "5"))
+# How often the replication lag of each replica is re-measured
+REPLICA_LAG_CHECK_INTERVAL = float(
+    os.getenv("DB_REPLICA_LAG_CHECK_INTERVAL", "10"))
+# Connect / statement timeout of the lag probe: an unreachable replica is
+# marked down after this many seconds instead of the TCP connect timeout
+REPLICA_PROBE_TIMEOUT = int(os.getenv("DB_REPLICA_PROBE_TIMEOUT", "2"))
+
+# 0 when the replica has replayed everything it received (idle primary),
+# otherwise the age of the last replayed transaction
+_REPLICA_LAG_SQL = text("""
+    SELECT CASE
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+""")
+
+
+class _Replica:
+    """One read replica: its sync + async engines and last measured lag"""
+
+    def __init__(self, url: str):
+        self.url = url
+        self.engine = create_engine(url, **{
+            **engine_kwargs,
+            "connect_args": {"options": "-c default_transaction_read_only=on"},
+        })
+        self.async_engine = create_async_engine(_to_async_url(url), **{
+            **async_engine_kwargs,
+            "connect_args": {"server_settings": {"default_transaction_read_only": "on"}},
+        })
+        self.session_factory = sessionmaker(
+            autocommit=False, autoflush=False, bind=self.engine)
+        self.async_session_factory = async_sessionmaker(
+            bind=self.async_engine,
+            class_=AsyncSession,
+            autoflush=False,
+            expire_on_commit=False,
+        )
+        # lag probe: no pool, short timeouts (see _measure_replica_lag)
+        self.probe_engine = create_engine(url, poolclass=NullPool, connect_args={
+            "connect_timeout": REPLICA_PROBE_TIMEOUT,
+            "options": f"-c statement_timeout={REPLICA_PROBE_TIMEOUT * 1000}"
+                       " -c default_transaction_read_only=on",
+        })
+        self.lag = None          # None = unknown / unreachable
+        self.checked_at = float("-inf")
+        instrument_engine(self.engine, f"replica:{self.host}")
+        instrument_engine(self.async_engine.sync_engine,
+                          f"replica_async:{self.host}")
+
+    @property
+    def host(self) -> str:
+        return self.url.split('@')[1] if '@' in self.url else 'replica'
+
+
+replicas = [_Replica(url) for url in DATABASE_REPLICA_URLS]
+if replicas:
+    print(f"📚 Read replicas: {', '.join(r.host for r in replicas)}")
+
+_replica_lock = threading.Lock()
+_replica_cursor = itertools.count()
+
+
+def _claim_stale_replicas() -> list:
+    """Return the replicas whose lag must be re-measured (only one caller gets each)"""
+    now = time.monotonic()
+    with _replica_lock:
+        stale = [r for r in replicas
+                 if now - r.checked_at >= REPLICA_LAG_CHECK_INTERVAL]
+        for replica in stale:
+            replica.checked_at = now
+    return stale
+
+
+def _measure_replica_lag(stale: list) -> None:
+    for replica in stale:
+        try:
+            with replica.probe_engine.connect() as conn:
+                replica.lag = float(conn.execute(_REPLICA_LAG_SQL).scalar() or 0)
+        except Exception as e:
+            replica.lag = None
+            print(f"⚠️ Replica {replica.host} unreachable: {str(e)}")
+
+
+def _refresh_replica_lag() -> None:
+    """
+    Re-measure the stale replicas in a background thread: requests never
+    wait for the probe, they use the last known lag (unknown → primary)
+    """
+    stale = _claim_stale_replicas()
+    if stale:
+        threading.Thread(target=_measure_replica_lag, args=(stale,),
+                         name="replica-lag-probe", daemon=True).start()
+
+
+def _pick_replica():
+    """
+    Round-robin over the replicas that are reachable and not lagging.
+    Returns None when the read must fall back to the primary.
+    """
+    healthy = [r for r in replicas
+               if r.lag is not None and r.lag <= REPLICA_MAX_LAG_SECONDS]
+    if not healthy:
+        return None
+    return healthy[next(_replica_cursor) % len(healthy)]
+
+
 # Base class for models
 Base = declarative_base()
 
+# JSON document column: JSONB (indexable with GIN) on PostgreSQL, plain JSON
+# on SQLite. Values are native dicts / lists on the Python side; None is
+# stored as SQL NULL (not JSON 'null'), like the former text columns.
+JSONDocument = JSON(none_as_null=True).with_variant(JSONB(none_as_null=True), "postgresql")
+
 
-def get_db():
+def get_db(request: Request):
     """
     Database session dependency for FastAPI
     Usage in routes: db: Session = Depends(get_db)
     """
     db = SessionLocal()
+    started = time.perf_counter()
+    try:
+        yield db
+    finally:
+        db.close()
+        SESSION_HOLD.observe(time.perf_counter() - started,
+                             route=_route_label(request), session="primary")
+
+
+async def get_async_db(request: Request):
+    """
+    Async database session dependency for FastAPI
+    Usage in routes: db: AsyncSession = Depends(get_async_db)
+
+    Use it only from `async def` routes. Relationships are NOT lazy-loaded
+    in async mode: load them explicitly (selectinload / joinedload).
+    """
+    started = time.perf_counter()
+    try:
+        async with AsyncSessionLocal() as db:
+            yield db
+    finally:
+        SESSION_HOLD.observe(time.perf_counter() - started,
+                             route=_route_label(request), session="primary_async")
+
+
+def get_read_db(request: Request):
+    """
+    Read-only session dependency for FastAPI
+    Usage in routes: db: Session = Depends(get_read_db)
+
+    Served by a read replica (DATABASE_REPLICA_URLS) when one is healthy,
+    by the primary otherwise. Never write with this session: replica
+    connections are opened with default_transaction_read_only=on.
+    """
+    _refresh_replica_lag()
+    replica = _pick_replica()
+    db = replica.session_factory() if replica else SessionLocal()
+    started = time.perf_counter()
     try:
         yield db
     finally:
         db.close()
+        SESSION_HOLD.observe(time.perf_counter() - started,
+                             route=_route_label(request),
+                             session=f"replica:{replica.host}" if replica else "primary")
+
+
+async def get_async_read_db(request: Request):
+    """
+    Async read-only session dependency for FastAPI (see get_read_db)
+    Usage in routes: db: AsyncSession = Depends(get_async_read_db)
+    """
+    _refresh_replica_lag()
+    replica = _pick_replica()
+    factory = replica.async_session_factory if replica else AsyncSessionLocal
+    started = time.perf_counter()
+    try:
+        async with factory() as db:
+            yield db
+    finally:
+        SESSION_HOLD.observe(time.perf_counter() - started,
+                             route=_route_label(request),
+                             session=f"replica_async:{replica.host}" if replica else "primary_async")
+
+
+@contextmanager
+def primary_session(db: Session):
+    """
+    `db` itself when it is bound to the primary, else a new primary session
+    (e.g. to fill a shared cache: a lagging replica must never feed it)
+    """
+    if db.get_bind() is engine:
+        yield db
+        return
+    with SessionLocal() as primary:
+        yield primary
+
+
+@asynccontextmanager
+async def primary_async_session(db: AsyncSession):
+    """primary_session() for async sessions"""
+    if db.bind is async_engine:
+        yield db
+        return
+    async with AsyncSessionLocal() as primary:
+        yield primary
+
+
+async def dispose_engines():
+    """Close every pool (primary + replicas, sync + async) on shutdown"""
+    engine.dispose()
+    await async_engine.dispose()
+    for replica in replicas:
+        replica.engine.dispose()
+        replica.probe_engine.dispose()
+        await replica.async_engine.dispose()
 
 
 def test_connection():
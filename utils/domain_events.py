@@ -0,0 +1,104 @@
+# utils/domain_events.py
+#
+# Post-commit domain events.
+#
+# Write paths record what happened with emit(db, "event_name", **payload)
+# instead of running side effects (stock alerts, admin notifications...)
+# inside their own transaction. The events are written to the outbox
+# (utils/outbox.py, topic "domain_event") in the SAME transaction as the
+# write, so they exist if and only if the write committed:
+#   - a rollback simply drops them
+#   - the outbox dispatcher runs the handlers after the request has
+#     released its session, in ONE batched pass per delivery: handlers
+#     receive all payloads of their event at once (dedup is theirs) and
+#     share a single new session and a single commit
+#   - a failing pass is rolled back and retried with the outbox backoff
+#     (given up after OUTBOX_MAX_ATTEMPTS, the rows keep last_error): handlers
+#     must stay safe to run twice (database writes only, no external call)
+#
+# A failing handler never affects the already-committed write.
+#
+import asyncio
+import logging
+from typing import Callable, Dict, List
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from utils import outbox
+from utils.db import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+_PENDING_KEY = "pending_domain_events"
+_TOPIC = "domain_event"
+
+# event name → handlers, called as handler(db, payloads)
+_handlers: Dict[str, List[Callable[[Session, List[dict]], None]]] = {}
+
+
+def on(event_name: str):
+    """Decorator: register a handler for `event_name`"""
+
+    def decorator(func):
+        _handlers.setdefault(event_name, []).append(func)
+        return func
+
+    return decorator
+
+
+def emit(db: Session, event_name: str, **payload) -> None:
+    """Record an event; handlers run after the session's next commit (payload: JSON values)"""
+    db.info.setdefault(_PENDING_KEY, []).append((event_name, payload))
+
+
+def dispatch(events: list) -> None:
+    """
+    Run the handlers of `events` ((name, payload) pairs) in one batched
+    pass: one session, one commit; raises after rolling back on failure
+    """
+    grouped: Dict[str, List[dict]] = {}
+    for event_name, payload in events:
+        grouped.setdefault(event_name, []).append(payload)
+
+    with SessionLocal() as db:
+        try:
+            for event_name, payloads in grouped.items():
+                for handler in _handlers.get(event_name, []):
+                    handler(db, payloads)
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Domain event handlers failed ({', '.join(grouped)}): {e}")
+            raise
+
+
+# ── Outbox ────────────────────────────────────────────────────────────────────
+
+
+def _enqueue_pending(session: Session) -> None:
+    for event_name, payload in session.info.pop(_PENDING_KEY, ()):
+        outbox.enqueue(session, _TOPIC, {"event": event_name, "payload": payload})
+
+
+@event.listens_for(SessionLocal, "before_commit")
+def _enqueue_before_commit(session: Session) -> None:
+    _enqueue_pending(session)
+
+
+# events emitted by after_flush hooks (e.g. the commit's own flush): the
+# rows added here are written by the next iteration of the flush loop
+@event.listens_for(SessionLocal, "after_flush_postexec")
+def _enqueue_after_flush(session: Session, flush_context) -> None:
+    _enqueue_pending(session)
+
+
+@event.listens_for(SessionLocal, "after_rollback")
+def _drop_after_rollback(session: Session) -> None:
+    session.info.pop(_PENDING_KEY, None)
+
+
+@outbox.outbox_handler(_TOPIC)
+async def _deliver(client, messages: list) -> None:
+    events = [(message.payload["event"], message.payload["payload"]) for message in messages]
+    await asyncio.to_thread(dispatch, events)
@@ -0,0 +1,103 @@
+# utils/etag.py
+#
+# Conditional GET (ETag / If-None-Match → 304) for product and landing-block
+# endpoints.
+#
+# The ETag is computed BEFORE the response body, from a few values:
+#   - single product / landing blocks: id + updated_at (created_at when the
+#     product was never updated)
+#   - product lists: one aggregate query, no product row is loaded:
+#         count(*), max(coalesce(updated_at, created_at)) of the filtered
+#         products + the catalog version counter
+#     plus the query string (skip / limit / filters).
+# When the client's If-None-Match matches, the endpoint answers 304 with no
+# body: nothing is built, serialized or sent.
+#
+# Stock decrements (bulk UPDATE) refresh updated_at through the column's
+# onupdate. The catalog version counter (table catalog_version, bumped by
+# utils/product_changes.py) changes in the same transaction as any ORM write
+# to a Product or a Category: it covers what max(updated_at) cannot see, e.g. a
+# renamed category (lists embed category_name) or a deleted product.
+#
+import hashlib
+from datetime import datetime
+from typing import Optional
+
+from fastapi import Request, Response, status
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from models.catalog_version import CatalogVersion
+from models.product import Product
+
+# Clients must revalidate before reusing a stored response
+_CACHE_CONTROL = "no-cache"
+
+
+# ── ETags ─────────────────────────────────────────────────────────────────────
+
+
+def _etag(*parts) -> str:
+    digest = hashlib.sha1("|".join(str(part) for part in parts).encode()).hexdigest()[:20]
+    return f'W/"{digest}"'
+
+
+def product_etag(product: Product, scope: str = "product") -> str:
+    """ETag of one product's representation (`scope` keeps payload types apart)"""
+    stamp = product.updated_at or product.created_at
+    return _etag(scope, product.id, stamp.isoformat() if isinstance(stamp, datetime) else stamp)
+
+
+def catalog_etag_query(*filters):
+    """SELECT count, max stamp of the filtered products, catalog version (one row)"""
+    version = (
+        select(CatalogVersion.version).where(CatalogVersion.id == 1).scalar_subquery()
+    )
+    return select(
+        func.count(Product.id),
+        func.max(func.coalesce(Product.updated_at, Product.created_at)),
+        func.coalesce(version, 0),
+    ).where(*filters)
+
+
+def catalog_etag_from_row(request: Request, row) -> str:
+    count, last_change, version = row
+    query = sorted(request.query_params.multi_items())
+    return _etag("catalog", request.url.path, query, count, last_change, version)
+
+
+def catalog_etag(db: Session, request: Request, *filters) -> str:
+    """ETag of a product list (filters = WHERE conditions of the list)"""
+    return catalog_etag_from_row(request, db.execute(catalog_etag_query(*filters)).one())
+
+
+# ── Conditional responses ─────────────────────────────────────────────────────
+
+
+def _matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # weak comparison: W/"x" and "x" designate the same representation
+    wanted = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == wanted for tag in header.split(","))
+
+
+def not_modified(
+    request: Request, etag: str, cache_control: str = _CACHE_CONTROL
+) -> Optional[Response]:
+    """304 response if the client already holds `etag`, else None"""
+    if _matches(request, etag):
+        return Response(
+            status_code=status.HTTP_304_NOT_MODIFIED,
+            headers={"ETag": etag, "Cache-Control": cache_control},
+        )
+    return None
+
+
+def set_etag(response: Response, etag: str, cache_control: str = _CACHE_CONTROL) -> Response:
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = cache_control
+    return response
@@ -0,0 +1,172 @@
+# utils/idempotency.py
+#
+# Idempotency-Key header for the endpoints that create orders
+# (POST /public/orders, POST /bill/).
+#
+# A client that may retry (bad mobile network, Flutter retry policy) sends
+# a unique key per logical request:
+#
+#     Idempotency-Key: 6f1c2e9a-...
+#
+# The first request with a key stores its response in idempotency_keys IN
+# THE SAME TRANSACTION as the order it creates. A retry with the same key
+# within IDEMPOTENCY_TTL seconds gets that response back (header
+# Idempotent-Replayed: true) without running anything again: no
+# validation, stock reservation, tracking code or Telegram alert.
+#
+#   - concurrent duplicates: the key row is inserted before any other
+#     write; the second INSERT waits for the first transaction, then fails
+#     on the primary key and the stored response is replayed
+#   - a request that fails (HTTPException → rollback) stores nothing: the
+#     retry runs normally
+#   - same key, different body → 422
+#
+#     idempotent = begin_idempotent(db, "public_orders", key, order_data)
+#     if idempotent.replay is not None:
+#         return idempotent.replay
+#     ...
+#     idempotent.store(201, response)   # before the commit
+#
+# Expired rows are replaced on reuse and deleted by the startable job
+# "idempotency_keys_purge".
+#
+import hashlib
+import json
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Any, Optional
+
+from fastapi import Header, HTTPException, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+from sqlalchemy import delete, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from models.idempotency_key import IdempotencyKey
+from utils.db import SessionLocal
+from utils.jobs import JobContext, job_handler
+
+IDEMPOTENCY_TTL = int(os.getenv("IDEMPOTENCY_TTL", "86400"))
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+
+_MAX_KEY_LENGTH = 255
+
+
+def idempotency_key_header(
+    idempotency_key: Optional[str] = Header(None, alias=IDEMPOTENCY_HEADER)
+) -> Optional[str]:
+    """Dependency: the Idempotency-Key header (None when not sent)"""
+    if idempotency_key is None:
+        return None
+    idempotency_key = idempotency_key.strip()
+    if not idempotency_key or len(idempotency_key) > _MAX_KEY_LENGTH:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"{IDEMPOTENCY_HEADER} must be 1 to {_MAX_KEY_LENGTH} characters",
+        )
+    return idempotency_key
+
+
+def _encode(body: Any):
+    if isinstance(body, BaseModel):
+        return body.model_dump(mode="json")
+    return jsonable_encoder(body)
+
+
+def _request_hash(payload: Any) -> str:
+    document = json.dumps(_encode(payload), sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(document.encode()).hexdigest()
+
+
+def _aware(moment: datetime) -> datetime:
+    """SQLite returns naive datetimes (stored as UTC)"""
+    return moment if moment.tzinfo else moment.replace(tzinfo=timezone.utc)
+
+
+def _replay(record: IdempotencyKey, request_hash: str) -> JSONResponse:
+    if record.request_hash != request_hash:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"{IDEMPOTENCY_HEADER} already used with a different request body",
+        )
+    return JSONResponse(
+        status_code=record.status_code,
+        content=record.response_body,
+        headers={"Idempotent-Replayed": "true"},
+    )
+
+
+class IdempotentRequest:
+    """Outcome of begin_idempotent(): a replay, or a reserved key to store() into"""
+
+    def __init__(self, record: Optional[IdempotencyKey] = None, replay: Optional[JSONResponse] = None):
+        self.record = record
+        self.replay = replay
+
+    def store(self, status_code: int, body: Any) -> None:
+        """Save the response with the key (committed by the caller's commit)"""
+        if self.record is None:
+            return
+        self.record.status_code = status_code
+        self.record.response_body = _encode(body)
+
+
+def begin_idempotent(db: Session, scope: str, key: Optional[str], payload: Any) -> IdempotentRequest:
+    """
+    Replay the stored response of (scope, key), or reserve the key in the
+    current transaction. Call it before any other write of the request.
+    """
+    if key is None:
+        return IdempotentRequest()
+
+    request_hash = _request_hash(payload)
+    now = datetime.now(timezone.utc)
+    stmt = select(IdempotencyKey).where(IdempotencyKey.scope == scope, IdempotencyKey.key == key)
+
+    existing = db.scalar(stmt)
+    if existing is not None:
+        if _aware(existing.expires_at) > now:
+            return IdempotentRequest(replay=_replay(existing, request_hash))
+        db.delete(existing)
+        db.flush()
+
+    record = IdempotencyKey(
+        scope=scope,
+        key=key,
+        request_hash=request_hash,
+        # placeholders, replaced by store() before the commit
+        status_code=0,
+        response_body={},
+        expires_at=now + timedelta(seconds=IDEMPOTENCY_TTL),
+    )
+    db.add(record)
+    try:
+        db.flush()
+    except IntegrityError:
+        # a concurrent request with the same key committed first; nothing
+        # else was written yet, the whole transaction can go
+        db.rollback()
+        return IdempotentRequest(replay=_replay(db.scalar(stmt), request_hash))
+    return IdempotentRequest(record=record)
+
+
+# ── Cleanup ───────────────────────────────────────────────────────────────────
+
+
+def purge_idempotency_keys(db: Session) -> int:
+    """Delete the expired keys (no commit); returns how many were deleted"""
+    result = db.execute(
+        delete(IdempotencyKey).where(IdempotencyKey.expires_at <= datetime.now(timezone.utc))
+    )
+    return result.rowcount
+
+
+@job_handler("idempotency_keys_purge", startable=True)
+def _purge_job(job: JobContext) -> dict:
+    """Background job (POST /jobs/ {"kind": "idempotency_keys_purge"})"""
+    with SessionLocal() as db:
+        deleted = purge_idempotency_keys(db)
+        db.commit()
+    return {"deleted": deleted}
@@ -0,0 +1,234 @@
+# utils/jobs.py
+#
+# Background jobs for long admin actions (bulk imports, recalculations...).
+#
+# A job is a row of the `jobs` table: the endpoint inserts it and returns its
+# id right away; a worker thread of this process runs it and records its
+# progress, result or error; the client polls GET /jobs/{id}.
+#
+#     @job_handler("product_import")
+#     def run_import(job: JobContext) -> dict:
+#         ...
+#         job.progress(done, total, result=partial_report)  # cancellation point
+#         return report
+#
+#     job = submit_job(db, "product_import", payload={...}, input_data=raw)
+#
+#   - handlers open their own sessions and commit as they go
+#   - cancellation is cooperative: POST /jobs/{id}/cancel sets
+#     cancel_requested, the next job.progress() raises JobCancelled and the
+#     job ends "cancelled" with its partial result (work already committed
+#     stays)
+#   - a job is claimed with a conditional UPDATE (queued → running), so a
+#     job never runs twice, whichever process picks it up
+#   - jobs run in the threads of the API process (single worker): at
+#     startup, running jobs were interrupted by the previous process and
+#     are marked failed, queued jobs are (re)submitted
+#
+# JOB_WORKERS (default 2) threads per process.
+#
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Callable, Dict, Optional
+
+from sqlalchemy.orm import Session
+
+from models.job import Job, JobStatus
+from utils import metrics
+from utils.db import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+
+JOBS_FINISHED = metrics.counter("jobs_finished_total", "Background jobs finished, by kind and status")
+
+
+class JobCancelled(Exception):
+    """Raised by JobContext.progress() once a cancellation was requested"""
+
+
+class JobContext:
+    """What a handler sees of its job"""
+
+    def __init__(self, job: Job):
+        self.id = job.id
+        self.kind = job.kind
+        self.payload = job.payload or {}
+        self.input_data = job.input_data
+        self.result = None
+
+    def progress(self, processed: int, total: Optional[int] = None, result: Optional[dict] = None) -> None:
+        """Record progress (and a partial result); raises JobCancelled if cancelled"""
+        if result is not None:
+            self.result = result
+        with SessionLocal() as db:
+            job = db.get(Job, self.id)
+            job.processed = processed
+            if total is not None:
+                job.total = total
+            if result is not None:
+                job.result = result
+            job.heartbeat_at = datetime.now(timezone.utc)
+            cancel_requested = job.cancel_requested
+            db.commit()
+        if cancel_requested:
+            raise JobCancelled()
+
+
+# kind → (handler, startable from POST /jobs/)
+_handlers: Dict[str, tuple] = {}
+
+
+def job_handler(kind: str, startable: bool = False):
+    """
+    Decorator: register the handler of `kind`, called as handler(JobContext)
+    and returning the job's result (JSON-serializable). startable=True lets
+    admins start it without parameters through POST /jobs/.
+    """
+
+    def decorator(func: Callable[[JobContext], Optional[dict]]):
+        _handlers[kind] = (func, startable)
+        return func
+
+    return decorator
+
+
+def startable_kinds() -> list:
+    return sorted(kind for kind, (_, startable) in _handlers.items() if startable)
+
+
+# ── Execution ─────────────────────────────────────────────────────────────────
+
+_executor: Optional[ThreadPoolExecutor] = None
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=JOB_WORKERS, thread_name_prefix="job")
+    return _executor
+
+
+def _claim(job_id: int) -> Optional[JobContext]:
+    """queued → running; None if the job is gone, already claimed or cancelled"""
+    with SessionLocal() as db:
+        now = datetime.now(timezone.utc)
+        claimed = (
+            db.query(Job)
+            .filter(Job.id == job_id, Job.status == JobStatus.queued)
+            .update(
+                {Job.status: JobStatus.running, Job.started_at: now, Job.heartbeat_at: now},
+                synchronize_session=False,
+            )
+        )
+        db.commit()
+        if not claimed:
+            return None
+        return JobContext(db.get(Job, job_id))
+
+
+def _finish(context: JobContext, status: JobStatus, result=None, error: Optional[str] = None) -> None:
+    with SessionLocal() as db:
+        job = db.get(Job, context.id)
+        job.status = status
+        job.result = result
+        job.error = error
+        job.finished_at = datetime.now(timezone.utc)
+        job.input_data = None  # the upload is not needed anymore
+        db.commit()
+    JOBS_FINISHED.inc(kind=context.kind, status=status.value)
+
+
+def _run(job_id: int) -> None:
+    context = _claim(job_id)
+    if context is None:
+        return
+    handler = _handlers.get(context.kind)
+    if handler is None:
+        _finish(context, JobStatus.failed, error=f"Unknown job kind: {context.kind}")
+        return
+    try:
+        result = handler[0](context)
+    except JobCancelled:
+        _finish(context, JobStatus.cancelled, result=context.result)
+    except Exception as e:
+        logger.exception(f"Job {job_id} ({context.kind}) failed")
+        _finish(context, JobStatus.failed, result=context.result, error=str(e))
+    else:
+        _finish(context, JobStatus.succeeded, result=result)
+
+
+def submit_job(
+    db: Session,
+    kind: str,
+    payload: Optional[dict] = None,
+    input_data: Optional[bytes] = None,
+    admin_id: Optional[int] = None,
+) -> Job:
+    """Insert a queued job (commits) and hand it to a worker thread"""
+    if kind not in _handlers:
+        raise ValueError(f"Unknown job kind: {kind}")
+    job = Job(kind=kind, payload=payload, input_data=input_data, admin_id=admin_id)
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+    _get_executor().submit(_run, job.id)
+    return job
+
+
+def cancel_job(db: Session, job: Job) -> Job:
+    """Cancel a queued job now, or ask a running one to stop (commits)"""
+    # conditional UPDATEs, like _claim(): a worker may claim the job meanwhile
+    cancelled = (
+        db.query(Job)
+        .filter(Job.id == job.id, Job.status == JobStatus.queued)
+        .update(
+            {
+                Job.status: JobStatus.cancelled,
+                Job.finished_at: datetime.now(timezone.utc),
+                Job.input_data: None,
+            },
+            synchronize_session=False,
+        )
+    )
+    if not cancelled:
+        db.query(Job).filter(Job.id == job.id, Job.status == JobStatus.running).update(
+            {Job.cancel_requested: True}, synchronize_session=False
+        )
+    db.commit()
+    db.refresh(job)
+    return job
+
+
+# ── Process lifecycle ─────────────────────────────────────────────────────────
+
+
+def resume_jobs() -> None:
+    """Startup: fail the jobs left running by the previous process, (re)submit queued ones"""
+    try:
+        with SessionLocal() as db:
+            # no worker of this process has started yet: nobody owns them
+            db.query(Job).filter(Job.status == JobStatus.running).update(
+                {
+                    Job.status: JobStatus.failed,
+                    Job.error: "Interrupted (the server stopped while the job was running)",
+                    Job.finished_at: datetime.now(timezone.utc),
+                },
+                synchronize_session=False,
+            )
+            db.commit()
+            queued = [job_id for (job_id,) in db.query(Job.id).filter(Job.status == JobStatus.queued)]
+    except Exception as e:
+        logger.error(f"Could not resume background jobs: {e}")
+        return
+    for job_id in queued:
+        _get_executor().submit(_run, job_id)
+
+
+def shutdown_jobs() -> None:
+    """Shutdown: stop taking jobs (running ones are failed by the next resume_jobs())"""
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,149 @@
+# utils/metrics.py
+#
+# Minimal in-process metrics registry: counters and histograms with labels.
+# No external dependency (no prometheus_client) — values are read back as
+# JSON through GET /metrics.
+#
+# Values live in the memory of the worker process: when running several
+# uvicorn/gunicorn workers, each worker reports its own numbers.
+#
+import threading
+from bisect import bisect_left
+from typing import Dict, Tuple
+
+# Upper bounds (seconds) used by latency histograms
+DEFAULT_BUCKETS = (
+    0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0,
+)
+
+_registry: Dict[str, "_Metric"] = {}
+_registry_lock = threading.Lock()
+
+
+def _labels_key(labels: dict) -> Tuple:
+    return tuple(sorted(labels.items()))
+
+
+class _Metric:
+    type = "metric"
+
+    def __init__(self, name: str, description: str):
+        self.name = name
+        self.description = description
+        self._lock = threading.Lock()
+        self._values: Dict[Tuple, object] = {}
+
+    def reset(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+
+class Counter(_Metric):
+    """Monotonic counter, e.g. number of pool timeouts"""
+
+    type = "counter"
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = _labels_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(_labels_key(labels), 0)
+
+    def snapshot(self) -> list:
+        with self._lock:
+            return [
+                {"labels": dict(key), "value": value}
+                for key, value in self._values.items()
+            ]
+
+
+class Histogram(_Metric):
+    """Distribution of observed values (count, sum, max and cumulative buckets)"""
+
+    type = "histogram"
+
+    def __init__(self, name: str, description: str, buckets=DEFAULT_BUCKETS):
+        super().__init__(name, description)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels) -> None:
+        key = _labels_key(labels)
+        with self._lock:
+            data = self._values.get(key)
+            if data is None:
+                data = {
+                    "count": 0,
+                    "sum": 0.0,
+                    "max": 0.0,
+                    # last slot = values above the largest bucket (+Inf)
+                    "bucket_counts": [0] * (len(self.buckets) + 1),
+                }
+                self._values[key] = data
+            data["count"] += 1
+            data["sum"] += value
+            data["max"] = max(data["max"], value)
+            data["bucket_counts"][bisect_left(self.buckets, value)] += 1
+
+    def snapshot(self) -> list:
+        with self._lock:
+            result = []
+            for key, data in self._values.items():
+                cumulative = 0
+                buckets = {}
+                for bound, count in zip(self.buckets + ("+Inf",), data["bucket_counts"]):
+                    cumulative += count
+                    buckets[str(bound)] = cumulative
+                result.append({
+                    "labels": dict(key),
+                    "count": data["count"],
+                    "sum": round(data["sum"], 6),
+                    "avg": round(data["sum"] / data["count"], 6) if data["count"] else 0.0,
+                    "max": round(data["max"], 6),
+                    "buckets": buckets,
+                })
+            return result
+
+
+def _get_or_create(cls, name: str, description: str, **kwargs):
+    with _registry_lock:
+        metric = _registry.get(name)
+        if metric is None:
+            metric = cls(name, description, **kwargs)
+            _registry[name] = metric
+        elif not isinstance(metric, cls):
+            raise ValueError(f"Metric '{name}' already registered as {metric.type}")
+        return metric
+
+
+def counter(name: str, description: str) -> Counter:
+    """Get (or register) the counter called `name`"""
+    return _get_or_create(Counter, name, description)
+
+
+def histogram(name: str, description: str, buckets=DEFAULT_BUCKETS) -> Histogram:
+    """Get (or register) the histogram called `name`"""
+    return _get_or_create(Histogram, name, description, buckets=buckets)
+
+
+def snapshot() -> dict:
+    """All registered metrics, JSON-serializable"""
+    with _registry_lock:
+        metrics = list(_registry.values())
+    return {
+        metric.name: {
+            "type": metric.type,
+            "description": metric.description,
+            "values": metric.snapshot(),
+        }
+        for metric in metrics
+    }
+
+
+def reset_all() -> None:
+    """Zero every metric (e.g. before a load test)"""
+    with _registry_lock:
+        metrics = list(_registry.values())
+    for metric in metrics:
+        metric.reset()
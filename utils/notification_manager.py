@@ -1,7 +1,7 @@
 # utils\notification_manager.py
 import os
 import resend
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, joinedload, selectinload
 from models.notification import Notification
 from models.bill import Bill
 from models.client import Client
@@ -9,7 +9,8 @@ from models.admin import Admin
 from models.stock_alert import StockAlert
 from models.product import Product
 import requests
-from typing import Optional
+from utils import domain_events
+from typing import List, Optional
 
 
 # Configuration Email via Resend
@@ -28,7 +29,20 @@ if EMAIL_PROVIDER == "resend":
 #     "TWILIO_WHATSAPP_NUMBER", "whatsapp:+14155238886")
 
 
-def create_bill_notification(db: Session, bill: Bill, client: Client) -> list:
+def get_notified_admins(db: Session) -> List[Admin]:
+    """
+    Liste des admins à notifier, chargée une seule fois par session
+
+    Une même passe de notifications (plusieurs factures / alertes) réutilise
+    la liste au lieu de refaire db.query(Admin).all() à chaque appel.
+    """
+
+    if "notified_admins" not in db.info:
+        db.info["notified_admins"] = db.query(Admin).all()
+    return db.info["notified_admins"]
+
+
+def create_bill_notification(db: Session, bill: Bill, client: Client, commit: bool = True) -> list:
     """
     Créer des notifications pour une nouvelle facture
 
@@ -36,6 +50,7 @@ def create_bill_notification(db: Session, bill: Bill, client: Client) -> list:
         db: Session de base de données
         bill: Facture créée
         client: Client qui a créé la facture
+        commit: Valider immédiatement (False quand l'appelant regroupe les écritures)
 
     Returns:
         Liste des notifications créées
@@ -44,7 +59,7 @@ def create_bill_notification(db: Session, bill: Bill, client: Client) -> list:
     notifications = []
 
     # Obtenir tous les admins
-    admins = db.query(Admin).all()
+    admins = get_notified_admins(db)
 
     # Message pour l'admin
     admin_message = f"""
@@ -122,12 +137,13 @@ Détails de la facture:
 #         db.add(client_email_notification)
 #         notifications.append(client_email_notification)
 
-    db.commit()
+    if commit:
+        db.commit()
 
     return notifications
 
 
-def create_stock_alert_notification(db: Session, alert: StockAlert, product: Product) -> list:
+def create_stock_alert_notification(db: Session, alert: StockAlert, product: Product, commit: bool = True) -> list:
     """
     Créer des notifications pour une alerte de stock
 
@@ -135,6 +151,7 @@ def create_stock_alert_notification(db: Session, alert: StockAlert, product: Pro
         db: Session de base de données
         alert: Alerte de stock créée
         product: Produit concerné
+        commit: Valider immédiatement (False quand l'appelant regroupe les écritures)
 
     Returns:
         Liste des notifications créées
@@ -143,7 +160,7 @@ def create_stock_alert_notification(db: Session, alert: StockAlert, product: Pro
     notifications = []
 
     # Obtenir tous les admins
-    admins = db.query(Admin).all()
+    admins = get_notified_admins(db)
 
     # Déterminer la priorité
     priority = "🔴 URGENT" if alert.alert_type == "out_of_stock" else "⚠️ ATTENTION"
@@ -189,11 +206,28 @@ Action requise: Réapprovisionner le stock dès que possible.
             db.add(whatsapp_notification)
             notifications.append(whatsapp_notification)
 
-    db.commit()
+    if commit:
+        db.commit()
 
     return notifications
 
 
+@domain_events.on("bill_created")
+def _notify_created_bills(db: Session, payloads: List[dict]) -> None:
+    """Post-commit: notifications des nouvelles factures (dédupliquées, un seul commit)"""
+
+    bill_ids = {payload["bill_id"] for payload in payloads}
+    bills = (
+        db.query(Bill)
+        .options(joinedload(Bill.client), selectinload(Bill.bill_items))
+        .filter(Bill.id.in_(bill_ids))
+        .order_by(Bill.id)
+        .all()
+    )
+    for bill in bills:
+        create_bill_notification(db, bill, bill.client, commit=False)
+
+
 def create_payment_notification(db: Session, payment, bill: Bill, client: Client, admin: Admin) -> list:
     """
     Créer des notifications pour un nouveau paiement
@@ -0,0 +1,193 @@
+# utils/order_summary.py
+#
+# Order counters of the store dashboard (/store/orders/summary*).
+#
+# One GROUP BY delivery_status, calling_status query returns at most
+# 5 x 4 rows; every counter of EcommerceOrderSummary is folded from them in
+# Python (a count per delivery status is the sum over calling statuses and
+# vice versa). The per-livreur variant adds assigned_livreur_id to the
+# GROUP BY: all livreurs in the same single scan.
+#
+# Results are kept in a short in-process cache (ORDER_SUMMARY_CACHE_TTL
+# seconds, default 10, 0 disables it) keyed by the filters. Any commit of a
+# SessionLocal session that created, updated or deleted an EcommerceOrder
+# clears it, so the widget never shows counts older than the last write
+# made through this process.
+#
+import os
+import threading
+import time
+from collections import defaultdict
+from datetime import date, datetime, time as dt_time, timedelta
+from typing import Optional
+
+from sqlalchemy import event, func
+from sqlalchemy.orm import Session
+
+from models.ecommerce_order import CallingStatus, DeliveryStatus, EcommerceOrder
+from utils.db import SessionLocal
+
+ORDER_SUMMARY_CACHE_TTL = float(os.getenv("ORDER_SUMMARY_CACHE_TTL", "10"))
+
+_DELIVERY_FIELDS = {
+    DeliveryStatus.not_shipped: "not_shipped_orders",
+    DeliveryStatus.shipped: "in_delivery_orders",
+    DeliveryStatus.delivered: "delivered_orders",
+    DeliveryStatus.returned: "returned_orders",
+    DeliveryStatus.cancelled: "cancelled_orders",
+}
+_CALLING_FIELDS = {
+    CallingStatus.not_called: "not_called_orders",
+    CallingStatus.confirmed_by_phone: "confirmed_by_phone_orders",
+    CallingStatus.cancelled_by_phone: "cancelled_by_phone_orders",
+    CallingStatus.unreachable: "unreachable_orders",
+}
+_CHANGED_KEY = "order_summary_changed"
+
+
+# ── Cache ─────────────────────────────────────────────────────────────────────
+
+
+_cache: dict = {}
+_cache_lock = threading.Lock()
+
+
+def _cached(key, compute):
+    if ORDER_SUMMARY_CACHE_TTL <= 0:
+        return compute()
+    now = time.monotonic()
+    with _cache_lock:
+        hit = _cache.get(key)
+        if hit is not None and hit[0] > now:
+            return hit[1]
+    value = compute()
+    with _cache_lock:
+        _cache[key] = (now + ORDER_SUMMARY_CACHE_TTL, value)
+    return value
+
+
+def invalidate_order_summary() -> None:
+    with _cache_lock:
+        _cache.clear()
+
+
+@event.listens_for(SessionLocal, "after_flush")
+def _mark_order_changes(session: Session, flush_context) -> None:
+    if any(
+        isinstance(obj, EcommerceOrder)
+        for obj in (*session.new, *session.dirty, *session.deleted)
+    ):
+        session.info[_CHANGED_KEY] = True
+
+
+@event.listens_for(SessionLocal, "after_commit")
+def _invalidate_on_commit(session: Session) -> None:
+    if session.info.pop(_CHANGED_KEY, False):
+        invalidate_order_summary()
+
+
+@event.listens_for(SessionLocal, "after_rollback")
+def _drop_order_changes(session: Session) -> None:
+    session.info.pop(_CHANGED_KEY, None)
+
+
+# ── Queries ───────────────────────────────────────────────────────────────────
+
+
+def _empty_summary() -> dict:
+    return dict.fromkeys(
+        ["total_orders", *_DELIVERY_FIELDS.values(), *_CALLING_FIELDS.values()], 0
+    )
+
+
+def _fold(summary: dict, delivery_status, calling_status, count: int) -> None:
+    summary["total_orders"] += count
+    if delivery_status in _DELIVERY_FIELDS:
+        summary[_DELIVERY_FIELDS[delivery_status]] += count
+    if calling_status in _CALLING_FIELDS:
+        summary[_CALLING_FIELDS[calling_status]] += count
+
+
+def _filtered(query, date_from, date_to, livreur_id, visible_only):
+    if date_from is not None:
+        query = query.filter(EcommerceOrder.created_at >= datetime.combine(date_from, dt_time.min))
+    if date_to is not None:
+        # inclusive: whole last day
+        query = query.filter(
+            EcommerceOrder.created_at < datetime.combine(date_to + timedelta(days=1), dt_time.min)
+        )
+    if livreur_id is not None:
+        query = query.filter(EcommerceOrder.assigned_livreur_id == livreur_id)
+    if visible_only:
+        query = query.filter(EcommerceOrder.is_hidden_from_livreurs == False)
+    return query
+
+
+def order_summary(
+    db: Session,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    livreur_id: Optional[int] = None,
+    visible_only: bool = False,
+) -> dict:
+    """
+    Order counters (fields of EcommerceOrderSummary) in one grouped query
+
+    Args:
+        date_from, date_to: inclusive range on created_at (optional)
+        livreur_id: only orders assigned to this livreur
+        visible_only: skip orders hidden from livreurs
+    """
+
+    def compute() -> dict:
+        query = db.query(
+            EcommerceOrder.delivery_status,
+            EcommerceOrder.calling_status,
+            func.count(EcommerceOrder.id),
+        )
+        query = _filtered(query, date_from, date_to, livreur_id, visible_only)
+        summary = _empty_summary()
+        for delivery_status, calling_status, count in query.group_by(
+            EcommerceOrder.delivery_status, EcommerceOrder.calling_status
+        ):
+            _fold(summary, delivery_status, calling_status, count)
+        return summary
+
+    return dict(_cached(("summary", date_from, date_to, livreur_id, visible_only), compute))
+
+
+def order_summary_by_livreur(
+    db: Session,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+) -> list:
+    """
+    Counters per assigned livreur, one grouped query for all of them
+
+    Returns:
+        [{"livreur_id": id or None (unassigned), **counters}, ...] sorted by livreur_id
+    """
+
+    def compute() -> list:
+        query = db.query(
+            EcommerceOrder.assigned_livreur_id,
+            EcommerceOrder.delivery_status,
+            EcommerceOrder.calling_status,
+            func.count(EcommerceOrder.id),
+        )
+        query = _filtered(query, date_from, date_to, None, False)
+        summaries = defaultdict(_empty_summary)
+        for livreur_id, delivery_status, calling_status, count in query.group_by(
+            EcommerceOrder.assigned_livreur_id,
+            EcommerceOrder.delivery_status,
+            EcommerceOrder.calling_status,
+        ):
+            _fold(summaries[livreur_id], delivery_status, calling_status, count)
+        return [
+            {"livreur_id": livreur_id, **summary}
+            for livreur_id, summary in sorted(
+                summaries.items(), key=lambda item: (item[0] is None, item[0] or 0)
+            )
+        ]
+
+    return [dict(row) for row in _cached(("by_livreur", date_from, date_to), compute)]
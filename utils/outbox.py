@@ -0,0 +1,272 @@
+# utils/outbox.py
+#
+# Transactional outbox + async dispatcher.
+#
+# A request that must trigger an external call (Telegram alert...) only
+# writes an outbox row with enqueue(db, topic, payload), in the same
+# transaction as its data: the row exists if and only if the data was
+# committed, and the request never waits for the external service.
+#
+# The dispatcher (one asyncio task per process, started by main.py's
+# lifespan) delivers the rows:
+#   - it wakes up right after the commit of a session that enqueued
+#     something (and every OUTBOX_POLL_INTERVAL seconds), then waits
+#     OUTBOX_BATCH_WINDOW seconds so that a burst is handled as one batch
+#   - due rows are claimed with a lease (locked_until, FOR UPDATE SKIP
+#     LOCKED on PostgreSQL): several processes never send the same row
+#   - each topic's handler receives all its claimed rows at once
+#     (handler(client, messages)) and a pooled httpx.AsyncClient
+#   - failure: retry with exponential backoff (OUTBOX_RETRY_BASE ×
+#     2^(attempts-1), at most OUTBOX_RETRY_MAX seconds; RetryLater can set
+#     the delay), given up after OUTBOX_MAX_ATTEMPTS attempts (failed_at)
+#
+#     @outbox_handler("telegram_new_order")
+#     async def send(client: httpx.AsyncClient, messages: list) -> None: ...
+#
+# utils/domain_events.py rides on it too (topic "domain_event"): its
+# post-commit handlers get the same durability and retries.
+#
+# Sent rows are kept OUTBOX_RETENTION seconds (default 7 days), then deleted
+# by the startable job "outbox_purge". Given-up rows (failed_at) are kept
+# for investigation.
+#
+import asyncio
+import logging
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Dict, List, Optional
+
+import httpx
+from sqlalchemy import delete, event, select, update
+from sqlalchemy.orm import Session
+
+from models.outbox_message import OutboxMessage
+from utils import metrics
+from utils.db import AsyncSessionLocal, SessionLocal
+from utils.jobs import JobContext, job_handler
+
+logger = logging.getLogger(__name__)
+
+OUTBOX_POLL_INTERVAL = float(os.getenv("OUTBOX_POLL_INTERVAL", "5"))
+OUTBOX_BATCH_WINDOW = float(os.getenv("OUTBOX_BATCH_WINDOW", "1"))
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", "50"))
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "8"))
+OUTBOX_RETRY_BASE = float(os.getenv("OUTBOX_RETRY_BASE", "5"))
+OUTBOX_RETRY_MAX = float(os.getenv("OUTBOX_RETRY_MAX", "900"))
+OUTBOX_LEASE = int(os.getenv("OUTBOX_LEASE", "60"))
+OUTBOX_RETENTION = int(os.getenv("OUTBOX_RETENTION", "604800"))
+
+OUTBOX_MESSAGES = metrics.counter(
+    "outbox_messages_total", "Outbox messages processed, by topic and result (sent / retry / failed)"
+)
+
+_ENQUEUED_KEY = "outbox_enqueued"
+
+
+class RetryLater(Exception):
+    """Raised by a handler to retry its messages after `delay` seconds"""
+
+    def __init__(self, message: str, delay: Optional[float] = None):
+        super().__init__(message)
+        self.delay = delay
+
+
+# topic → async handler(client, messages)
+_handlers: Dict[str, Callable[[httpx.AsyncClient, List[OutboxMessage]], Awaitable[None]]] = {}
+
+
+def outbox_handler(topic: str):
+    """Decorator: register the async handler of `topic`"""
+
+    def decorator(func):
+        _handlers[topic] = func
+        return func
+
+    return decorator
+
+
+def enqueue(db: Session, topic: str, payload: dict) -> OutboxMessage:
+    """Add an outbox row to the session's transaction (no commit)"""
+    message = OutboxMessage(
+        topic=topic, payload=payload, next_attempt_at=datetime.now(timezone.utc)
+    )
+    db.add(message)
+    db.info[_ENQUEUED_KEY] = True
+    return message
+
+
+# ── Dispatcher ────────────────────────────────────────────────────────────────
+
+
+class _Dispatcher:
+    def __init__(self):
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.wakeup: Optional[asyncio.Event] = None
+        self.task: Optional[asyncio.Task] = None
+        self.client: Optional[httpx.AsyncClient] = None
+
+    def wake(self) -> None:
+        """Thread-safe: deliver as soon as possible"""
+        if self.loop is not None and self.wakeup is not None:
+            self.loop.call_soon_threadsafe(self.wakeup.set)
+
+
+dispatcher = _Dispatcher()
+
+
+@event.listens_for(SessionLocal, "after_commit")
+def _wake_dispatcher(session: Session) -> None:
+    if session.info.pop(_ENQUEUED_KEY, False):
+        dispatcher.wake()
+
+
+@event.listens_for(SessionLocal, "after_rollback")
+def _forget_enqueued(session: Session) -> None:
+    session.info.pop(_ENQUEUED_KEY, None)
+
+
+def _backoff(attempts: int) -> float:
+    return min(OUTBOX_RETRY_BASE * 2 ** (attempts - 1), OUTBOX_RETRY_MAX)
+
+
+async def _claim(db) -> List[OutboxMessage]:
+    """Lease up to OUTBOX_BATCH_SIZE due messages (attempts + 1)"""
+    now = datetime.now(timezone.utc)
+    due = (
+        select(OutboxMessage.id)
+        .where(
+            OutboxMessage.sent_at.is_(None),
+            OutboxMessage.failed_at.is_(None),
+            OutboxMessage.next_attempt_at <= now,
+            (OutboxMessage.locked_until.is_(None)) | (OutboxMessage.locked_until < now),
+        )
+        .order_by(OutboxMessage.id)
+        .limit(OUTBOX_BATCH_SIZE)
+        .with_for_update(skip_locked=True)
+    )
+    claimed_ids = (
+        await db.execute(
+            update(OutboxMessage)
+            .where(OutboxMessage.id.in_(due.scalar_subquery()))
+            .values(
+                locked_until=now + timedelta(seconds=OUTBOX_LEASE),
+                attempts=OutboxMessage.attempts + 1,
+            )
+            .returning(OutboxMessage.id)
+        )
+    ).scalars().all()
+    await db.commit()
+    if not claimed_ids:
+        return []
+    return (
+        await db.execute(
+            select(OutboxMessage).where(OutboxMessage.id.in_(claimed_ids)).order_by(OutboxMessage.id)
+        )
+    ).scalars().all()
+
+
+async def _deliver(db, topic: str, messages: List[OutboxMessage]) -> None:
+    handler = _handlers.get(topic)
+    now = datetime.now(timezone.utc)
+    try:
+        if handler is None:
+            raise RuntimeError(f"No outbox handler for topic {topic!r}")
+        await handler(dispatcher.client, messages)
+    except Exception as e:
+        delay = e.delay if isinstance(e, RetryLater) else None
+        logger.warning(f"Outbox delivery failed ({topic}, {len(messages)} messages): {e}")
+        for message in messages:
+            message.last_error = str(e)[:2000]
+            message.locked_until = None
+            if message.attempts >= OUTBOX_MAX_ATTEMPTS:
+                message.failed_at = now
+                OUTBOX_MESSAGES.inc(topic=topic, result="failed")
+            else:
+                wait = delay if delay is not None else _backoff(message.attempts)
+                message.next_attempt_at = now + timedelta(seconds=wait)
+                OUTBOX_MESSAGES.inc(topic=topic, result="retry")
+    else:
+        for message in messages:
+            message.sent_at = now
+            message.locked_until = None
+            message.last_error = None
+        OUTBOX_MESSAGES.inc(len(messages), topic=topic, result="sent")
+    await db.commit()
+
+
+async def dispatch_pending() -> int:
+    """Claim and deliver one batch of due messages; returns how many were claimed"""
+    async with AsyncSessionLocal() as db:
+        messages = await _claim(db)
+        by_topic: Dict[str, List[OutboxMessage]] = {}
+        for message in messages:
+            by_topic.setdefault(message.topic, []).append(message)
+        for topic, topic_messages in by_topic.items():
+            await _deliver(db, topic, topic_messages)
+        return len(messages)
+
+
+async def _run() -> None:
+    while True:
+        try:
+            await asyncio.wait_for(dispatcher.wakeup.wait(), timeout=OUTBOX_POLL_INTERVAL)
+            # group the rest of the burst into the same batch
+            await asyncio.sleep(OUTBOX_BATCH_WINDOW)
+        except asyncio.TimeoutError:
+            pass
+        dispatcher.wakeup.clear()
+        try:
+            # a full batch: more may be due right away
+            while await dispatch_pending() >= OUTBOX_BATCH_SIZE:
+                pass
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Outbox dispatcher error: {e}")
+
+
+def start_outbox_dispatcher() -> None:
+    """Start the dispatcher task on the running event loop (lifespan startup)"""
+    if dispatcher.task is not None:
+        return
+    dispatcher.loop = asyncio.get_running_loop()
+    dispatcher.wakeup = asyncio.Event()
+    dispatcher.client = httpx.AsyncClient(
+        timeout=httpx.Timeout(10.0, connect=5.0),
+        limits=httpx.Limits(max_connections=10, max_keepalive_connections=5),
+    )
+    dispatcher.task = asyncio.create_task(_run())
+
+
+async def stop_outbox_dispatcher() -> None:
+    """Lifespan shutdown: stop the task, close the HTTP client"""
+    if dispatcher.task is not None:
+        dispatcher.task.cancel()
+        try:
+            await dispatcher.task
+        except asyncio.CancelledError:
+            pass
+        dispatcher.task = None
+    if dispatcher.client is not None:
+        await dispatcher.client.aclose()
+        dispatcher.client = None
+    dispatcher.loop = None
+
+
+# ── Cleanup ───────────────────────────────────────────────────────────────────
+
+
+def purge_outbox(db: Session) -> int:
+    """Delete the rows sent more than OUTBOX_RETENTION seconds ago (no commit); returns how many"""
+    sent_before = datetime.now(timezone.utc) - timedelta(seconds=OUTBOX_RETENTION)
+    result = db.execute(delete(OutboxMessage).where(OutboxMessage.sent_at < sent_before))
+    return result.rowcount
+
+
+@job_handler("outbox_purge", startable=True)
+def _purge_job(job: JobContext) -> dict:
+    """Background job (POST /jobs/ {"kind": "outbox_purge"})"""
+    with SessionLocal() as db:
+        deleted = purge_outbox(db)
+        db.commit()
+    return {"deleted": deleted}
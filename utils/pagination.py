@@ -0,0 +1,78 @@
+# utils/pagination.py
+#
+# Keyset (cursor) pagination on (created_at, id), newest first.
+#
+# Offset pagination (skip/limit) reads and throws away `skip` rows, so deep
+# pages get slower as tables grow. A keyset page starts right after the
+# last row of the previous one:
+#     WHERE (created_at, id) < (:last_created_at, :last_id)
+#     ORDER BY created_at DESC, id DESC LIMIT :limit
+# which is an index range scan on (created_at, id): page 500 costs the same
+# as page 1.
+#
+# Cursor mode is opt-in per request: the list endpoints keep returning a
+# plain list for skip/limit (existing Flutter clients), and return
+# {"items": [...], "next_cursor": "..."} as soon as `cursor` is sent
+# (empty value = first page). next_cursor is null on the last page.
+#
+import base64
+import json
+from datetime import datetime
+from typing import Generic, List, Optional, Tuple, TypeVar
+
+from fastapi import HTTPException, Query, status
+from pydantic import BaseModel
+from sqlalchemy import tuple_
+
+T = TypeVar("T")
+
+CURSOR_QUERY = Query(
+    None,
+    description=(
+        "Keyset pagination: send an empty value for the first page, then the "
+        "previous response's next_cursor. When set, skip is ignored."
+    ),
+)
+
+
+class CursorPage(BaseModel, Generic[T]):
+    items: List[T]
+    next_cursor: Optional[str] = None
+
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    raw = json.dumps([created_at.isoformat(), row_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, row_id = json.loads(base64.urlsafe_b64decode(padded))
+        return datetime.fromisoformat(created_at), int(row_id)
+    except (ValueError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor",
+        )
+
+
+def apply_keyset(query, model, cursor: str, limit: int):
+    """
+    Restrict a Query / select() to one keyset page (newest first).
+
+    Fetches limit + 1 rows: the extra row only tells whether a next page exists.
+    """
+    if cursor:
+        created_at, row_id = decode_cursor(cursor)
+        query = query.where(tuple_(model.created_at, model.id) < (created_at, row_id))
+    return query.order_by(model.created_at.desc(), model.id.desc()).limit(limit + 1)
+
+
+def keyset_page(rows: list, limit: int) -> Tuple[list, Optional[str]]:
+    """Split the limit + 1 rows fetched by apply_keyset into (items, next_cursor)"""
+    if len(rows) <= limit:
+        return rows, None
+    items = rows[:limit]
+    last = items[-1]
+    return items, encode_cursor(last.created_at, last.id)
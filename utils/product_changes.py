@@ -0,0 +1,206 @@
+# utils/product_changes.py
+#
+# Product change feed (GET /product/changes) + catalog version counter.
+#
+# Every transaction that writes a Product or a Category (ORM), imports
+# products (utils/product_import.py) or changes stock
+# (utils/stock_manager.py) stamps its transaction version on what it
+# touched:
+#   - created / updated products: products.row_version
+#   - renamed category: row_version of all its products (they embed
+#     category_name); this also retires their product_read_model blobs,
+#     which are keyed on row_version, so the feed never serves the old name
+#     at the rename's version
+#   - deleted products: a row in product_tombstones
+#
+# PostgreSQL: the transaction version is the transaction ID
+# (pg_current_xact_id(), 64 bits, never wraps). Taking it locks nothing, so
+# concurrent checkouts and catalog edits do not wait for each other. IDs
+# are handed out in start order, not commit order: the feed therefore only
+# returns versions below the xmin of its snapshot, i.e. transactions that
+# have all finished. A write still running (or committed after the read)
+# has a version >= xmin and comes with a later call, so a client that has
+# seen everything up to version N never misses a write by asking for
+# row_version > N.
+# SQLite (tests, local runs) has one writer at a time: the catalog version
+# counter is the transaction version and the feed bound.
+#
+# The catalog_version row (part of the list ETags, utils/etag.py) is only
+# bumped by ORM writes to a Product or a Category, in after_flush: its lock
+# is always taken after the product rows, and stock changes never take it.
+#
+# Feed: product_changes(db, since, limit) returns the products with
+# since < row_version <= visible version, oldest first, the tombstones of
+# the same range and the token to send next time. Pages never split a
+# version.
+#
+from sqlalchemy import event, select, text, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from models.catalog_version import CatalogVersion
+from models.category import Category
+from models.product import Product
+from models.product_tombstone import ProductTombstone
+from utils.db import SessionLocal
+from utils.product_read_model import ADMIN, blob_select, product_list_body
+
+CHANGES_PAGE_SIZE = 500
+
+_CATALOG_WRITTEN_KEY = "catalog_written"
+
+
+def _dialect_insert(connection):
+    return pg_insert if connection.dialect.name == "postgresql" else sqlite_insert
+
+
+# ── Versions ──────────────────────────────────────────────────────────────────
+
+
+def bump_catalog_version(connection) -> int:
+    """Increment the catalog version in the current transaction; returns the new value"""
+    stmt = _dialect_insert(connection)(CatalogVersion).values(id=1, version=1)
+    return connection.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[CatalogVersion.id],
+            set_={"version": CatalogVersion.version + 1},
+        ).returning(CatalogVersion.version)
+    ).scalar_one()
+
+
+def transaction_version(connection) -> int:
+    """row_version to stamp on the writes of the current transaction"""
+    if connection.dialect.name == "postgresql":
+        return connection.execute(text("SELECT pg_current_xact_id()::text::bigint")).scalar_one()
+    return bump_catalog_version(connection)
+
+
+def _visible_version(db: Session) -> int:
+    """Highest version whose transaction, and every earlier one, has finished"""
+    if db.get_bind().dialect.name == "postgresql":
+        return db.execute(
+            text("SELECT pg_snapshot_xmin(pg_current_snapshot())::text::bigint - 1")
+        ).scalar_one()
+    return db.execute(
+        select(CatalogVersion.version).where(CatalogVersion.id == 1)
+    ).scalar() or 0
+
+
+@event.listens_for(SessionLocal, "before_flush")
+def _stamp_catalog_writes(session: Session, flush_context, instances) -> None:
+    products = [obj for obj in session.new if isinstance(obj, Product)]
+    products += [
+        obj
+        for obj in session.dirty
+        if isinstance(obj, Product) and session.is_modified(obj, include_collections=False)
+    ]
+    deleted = [obj.id for obj in session.deleted if isinstance(obj, Product)]
+    categories = [
+        obj.id
+        for obj in session.new | session.dirty | session.deleted
+        if isinstance(obj, Category) and session.is_modified(obj, include_collections=False)
+    ]
+    if not (products or deleted or categories):
+        return
+
+    session.info[_CATALOG_WRITTEN_KEY] = True
+    connection = session.connection()
+    version = transaction_version(connection)
+    for product in products:
+        product.row_version = version
+    existing_categories = [category_id for category_id in categories if category_id is not None]
+    if existing_categories:
+        # lock in id order, like the stock reservations (utils/stock_manager.py)
+        locked = (
+            select(Product.id)
+            .where(Product.category_id.in_(existing_categories))
+            .order_by(Product.id)
+            .with_for_update()
+        )
+        connection.execute(
+            update(Product)
+            .where(Product.id.in_(locked))
+            # keep updated_at: a renamed category is not a product write.
+            # The new row_version also marks their read model blobs stale.
+            .values(row_version=version, updated_at=Product.updated_at)
+        )
+    if deleted:
+        stmt = _dialect_insert(connection)(ProductTombstone).values(
+            [{"product_id": product_id, "row_version": version} for product_id in deleted]
+        )
+        connection.execute(
+            stmt.on_conflict_do_update(
+                index_elements=[ProductTombstone.product_id],
+                set_={"row_version": stmt.excluded.row_version},
+            )
+        )
+
+
+@event.listens_for(SessionLocal, "after_flush")
+def _bump_after_catalog_writes(session: Session, flush_context) -> None:
+    # after the flush: the product rows are locked before catalog_version
+    if session.info.pop(_CATALOG_WRITTEN_KEY, False):
+        bump_catalog_version(session.connection())
+
+
+# ── Change feed ───────────────────────────────────────────────────────────────
+
+
+def _json_ints(values) -> bytes:
+    return ("[" + ",".join(str(value) for value in values) + "]").encode()
+
+
+def _page_token(versions, limit: int) -> int:
+    """Last version fully contained in the first `limit` rows of `versions`"""
+    last = versions[limit - 1].row_version
+    if versions[limit].row_version != last:
+        return last
+    # the last version of the page continues on the next rows: stop before it
+    earlier = [row.row_version for row in versions[:limit] if row.row_version < last]
+    # a single version larger than a page is sent whole
+    return earlier[-1] if earlier else last
+
+
+def product_changes(db: Session, since: int, limit: int = CHANGES_PAGE_SIZE) -> bytes:
+    """
+    JSON body of the changes after version `since`:
+        {"token": N, "has_more": bool, "deleted": [ids], "products": [ProductWithCategory]}
+
+    `token` is the `since` of the next call. since=0 is a full sync
+    (no tombstones).
+    """
+    # read first: anything that finishes afterwards has a higher version
+    current = _visible_version(db)
+
+    versions = db.execute(
+        select(Product.row_version)
+        .where(Product.row_version > since, Product.row_version <= current)
+        .order_by(Product.row_version)
+        .limit(limit + 1)
+    ).all()
+    has_more = len(versions) > limit
+    token = _page_token(versions, limit) if has_more else current
+
+    products = b"[]"
+    if versions:
+        stmt = (
+            blob_select(ADMIN, Product.row_version > since, Product.row_version <= token)
+            .order_by(Product.row_version, Product.id)
+        )
+        products = product_list_body(db, ADMIN, stmt)
+
+    deleted = []
+    if since > 0:
+        deleted = db.execute(
+            select(ProductTombstone.product_id)
+            .where(ProductTombstone.row_version > since, ProductTombstone.row_version <= token)
+            .order_by(ProductTombstone.row_version, ProductTombstone.product_id)
+        ).scalars().all()
+
+    return b'{"token":%d,"has_more":%s,"deleted":%s,"products":%s}' % (
+        token,
+        b"true" if has_more else b"false",
+        _json_ints(deleted),
+        products,
+    )
@@ -0,0 +1,54 @@
+# utils/product_filters.py
+#
+# WHERE conditions shared by the product list endpoints (/product/,
+# /product/all/unfiltered, /public/products).
+#
+# ?variant=taille:M keeps the products offering option "M" of variant type
+# "taille". On PostgreSQL this is a JSONB containment test served by the GIN
+# index ix_products_variants_gin (jsonb_path_ops):
+#
+#     variants @> '{"variants": [{"type": "taille", "options": ["M"]}]}'
+#
+# Other dialects (SQLite in local development) get a LIKE approximation on
+# the stored JSON text.
+#
+import json
+from typing import Optional
+
+from fastapi import HTTPException, status
+from sqlalchemy import String, and_, cast, type_coerce
+from sqlalchemy.dialects.postgresql import JSONB
+
+from models.product import Product
+from utils.db import engine
+
+
+def parse_variant(variant: str) -> tuple:
+    """'taille:M' → ('taille', 'M'); types are stored lowercase (schemas/product.py)"""
+    variant_type, sep, option = variant.partition(":")
+    variant_type, option = variant_type.strip().lower(), option.strip()
+    if not sep or not variant_type or not option:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="variant must be formatted as type:option (e.g. taille:M)",
+        )
+    return variant_type, option
+
+
+def variant_filter(variant: Optional[str]) -> list:
+    """Conditions of the `variant` query parameter ([] when not given)"""
+    if not variant:
+        return []
+    variant_type, option = parse_variant(variant)
+
+    if engine.dialect.name == "postgresql":
+        document = {"variants": [{"type": variant_type, "options": [option]}]}
+        return [type_coerce(Product.variants, JSONB).contains(document)]
+
+    text = cast(Product.variants, String)
+    return [
+        and_(
+            text.like(f"%{json.dumps({'type': variant_type})[1:-1]}%"),
+            text.like(f"%{json.dumps(option)}%"),
+        )
+    ]
@@ -0,0 +1,339 @@
+# utils/product_import.py
+#
+# Excel product import (POST /product/bulk-upload), set-based.
+#
+# The sheet used to be walked row by row: two uniqueness queries, a barcode
+# generation loop querying each candidate, a flush and a committing stock
+# alert check per row. Now:
+#   - columns are converted and validated with pandas in one pass each
+#   - existing names and barcodes: one IN query each (chunked)
+#   - generated barcodes are deduplicated in memory, then checked with one IN
+#     query per round (collisions are practically never retried)
+#   - valid rows: a single multi-row INSERT ... RETURNING
+#   - stock alerts of the new products: one batched check_stock_alerts() pass
+# The per-row error report is unchanged: {"row": <Excel row>, "error": ...},
+# first failing check of each row.
+#
+# import_products() commits nothing: the caller commits, then invalidates
+# the response cache (the INSERT does not go through the ORM flush events).
+#
+# POST /product/bulk-upload runs it as a background job (utils/jobs.py,
+# kind "product_import"): the sheet is imported by chunks of
+# IMPORT_CHUNK_ROWS rows, each committed on its own, with progress and
+# cancellation between chunks. The endpoint checks the header row first
+# (sheet_missing_columns) so a sheet without the required columns is
+# rejected with a 400 instead of becoming a failed job.
+#
+import os
+import random
+from io import BytesIO
+from typing import Dict, Iterable, List, Optional, Set
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session
+
+from models.product import Product
+from utils import domain_events
+from utils.db import SessionLocal
+from utils.jobs import JobContext, job_handler
+from utils.product_changes import transaction_version
+from utils.response_cache import invalidate_tags
+from utils.stock_manager import check_stock_alerts
+
+REQUIRED_COLUMNS = ["name", "price", "quantity_in_stock"]
+IMPORT_CHUNK_ROWS = int(os.getenv("IMPORT_CHUNK_ROWS", "1000"))
+
+# bound parameters per IN query (SQLite builds may cap a statement at 999)
+_IN_CHUNK = 900
+
+
+# ── Cell parsing ──────────────────────────────────────────────────────────────
+
+
+def parse_simple_variants(variants_str: str) -> Optional[dict]:
+    """
+    Parse the simple variant format
+    Input: "size: S, M, L, XL | color: Red, Blue, Black"
+    Output: {"variants": [{"type": "size", "options": [...]}, ...]} (or None)
+    """
+    try:
+        if not variants_str or variants_str.strip() == "":
+            return None
+
+        variants_list = []
+        # Split by pipe (|) to get each variant type
+        for group in variants_str.split("|"):
+            group = group.strip()
+            if not group:
+                continue
+
+            # Split by colon to get type and options
+            if ":" not in group:
+                raise ValueError(
+                    f"Invalid format: '{group}'. Expected format: 'type: option1, option2'"
+                )
+            variant_type, options_str = group.split(":", 1)
+            variant_type = variant_type.strip().lower()
+            if not variant_type:
+                raise ValueError("Variant type cannot be empty")
+
+            options = [opt.strip() for opt in options_str.split(",") if opt.strip()]
+            if not options:
+                raise ValueError(f"No options provided for variant type: {variant_type}")
+
+            variants_list.append({"type": variant_type, "options": options})
+
+        return {"variants": variants_list} if variants_list else None
+
+    except Exception as e:
+        raise ValueError(f"Invalid variants format: {str(e)}")
+
+
+def ean13_check_digit(base: str) -> str:
+    odd_sum = sum(int(base[i]) for i in range(0, 12, 2))
+    even_sum = sum(int(base[i]) for i in range(1, 12, 2))
+    return str((10 - ((odd_sum + even_sum * 3) % 10)) % 10)
+
+
+def random_ean13() -> str:
+    base = "".join(str(random.randint(0, 9)) for _ in range(12))
+    return base + ean13_check_digit(base)
+
+
+def _text_column(df: pd.DataFrame, column: str) -> pd.Series:
+    """Stripped strings, None for missing / blank cells"""
+    if column not in df.columns:
+        return pd.Series([None] * len(df), index=df.index, dtype=object)
+    values = df[column].astype(object).where(df[column].notna(), None)
+    stripped = values.map(lambda value: str(value).strip() if value is not None else None)
+    return stripped.where(stripped != "", None)
+
+
+def _barcode_column(df: pd.DataFrame) -> pd.Series:
+    """Excel turns numeric barcodes into floats: 1234.0 → "1234" """
+    if "barcode" not in df.columns:
+        return pd.Series([None] * len(df), index=df.index, dtype=object)
+    column = df["barcode"].astype(object)
+    as_text = column.map(
+        lambda value: str(int(value)) if isinstance(value, float) and value.is_integer() else str(value).strip()
+    )
+    barcodes = as_text.where(column.notna(), None)
+    return barcodes.where(barcodes != "", None)
+
+
+def _number_column(df: pd.DataFrame, column: str) -> pd.Series:
+    return pd.to_numeric(df[column], errors="coerce")
+
+
+def _flag_column(df: pd.DataFrame, column: str, default: bool) -> pd.Series:
+    if column not in df.columns:
+        return pd.Series(default, index=df.index)
+    return df[column].astype(object).where(df[column].notna(), default).map(bool)
+
+
+# ── Lookups ───────────────────────────────────────────────────────────────────
+
+
+def _chunks(values: List, size: int = _IN_CHUNK):
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def _existing(db: Session, column, values: Iterable[str], *extra) -> Dict[str, tuple]:
+    """{value: (column value, *extra)} of the products whose `column` is in `values`"""
+    values = list(set(values))
+    found = {}
+    for chunk in _chunks(values):
+        for row in db.execute(select(column, *extra).where(column.in_(chunk))):
+            found[row[0]] = tuple(row[1:])
+    return found
+
+
+def _generate_barcodes(db: Session, count: int, taken: Set[str]) -> List[str]:
+    """`count` new EAN-13 barcodes, unique in the file and in the database"""
+    generated: List[str] = []
+    while len(generated) < count:
+        candidates = set()
+        while len(candidates) < count - len(generated):
+            barcode = random_ean13()
+            if barcode not in taken:
+                candidates.add(barcode)
+        collisions = _existing(db, Product.barcode, candidates)
+        taken |= candidates
+        generated += [barcode for barcode in candidates if barcode not in collisions]
+    return generated
+
+
+# ── Import ────────────────────────────────────────────────────────────────────
+
+
+def import_products(
+    db: Session, df: pd.DataFrame, category_id: int, admin_id: int, first_row: int = 2
+) -> dict:
+    """
+    Validate the sheet and insert its valid rows (no commit)
+
+    first_row: Excel row of the first DataFrame row (rows start at 1, the
+    header is row 1).
+
+    Returns the report {"total_rows", "added", "skipped", "errors"}.
+    """
+    df = df.reset_index(drop=True)
+    excel_rows = df.index + first_row
+    errors = pd.Series([None] * len(df), index=df.index, dtype=object)
+
+    def reject(mask: pd.Series, message) -> None:
+        """
+        Record `message` (a string, or a function of the row index) for the
+        rows of `mask` that have no error yet
+        """
+        mask = mask & errors.isna()
+        if callable(message):
+            for i in np.flatnonzero(mask.to_numpy()):
+                errors[i] = message(i)
+        else:
+            errors[mask] = message
+
+    names = _text_column(df, "name")
+    reject(names.isna(), "Empty product name")
+
+    existing_names = _existing(db, Product.name, names.dropna(), Product.id)
+    reject(
+        names.isin(list(existing_names)),
+        lambda i: f'Product with name "{names[i]}" already exists (ID: {existing_names[names[i]][0]})',
+    )
+
+    barcodes = _barcode_column(df)
+    existing_barcodes = _existing(db, Product.barcode, barcodes.dropna(), Product.name)
+    reject(
+        barcodes.isin(list(existing_barcodes)),
+        lambda i: f'Barcode "{barcodes[i]}" already exists for product: {existing_barcodes[barcodes[i]][0]}',
+    )
+
+    variants = pd.Series([None] * len(df), index=df.index, dtype=object)
+    for index, cell in _text_column(df, "variants").dropna().items():
+        try:
+            variants[index] = parse_simple_variants(cell)
+        except ValueError as e:
+            reject(pd.Series(df.index == index, index=df.index), str(e))
+
+    prices = _number_column(df, "price")
+    quantities = _number_column(df, "quantity_in_stock")
+    reject(prices.isna(), lambda i: f"Invalid price: {df['price'][i]!r}")
+    reject(
+        quantities.isna() | (quantities % 1 != 0),
+        lambda i: f"Invalid quantity: {df['quantity_in_stock'][i]!r}",
+    )
+    reject(prices <= 0, "Price must be greater than 0")
+    reject(quantities < 0, "Quantity cannot be negative")
+
+    if "minimum_stock_level" in df.columns:
+        minimum_levels = _number_column(df, "minimum_stock_level")
+        reject(
+            df["minimum_stock_level"].notna() & (minimum_levels.isna() | (minimum_levels % 1 != 0)),
+            lambda i: f"Invalid minimum_stock_level: {df['minimum_stock_level'][i]!r}",
+        )
+        minimum_levels = minimum_levels.fillna(10)
+    else:
+        minimum_levels = pd.Series(10, index=df.index)
+
+    # duplicates inside the sheet: the first otherwise valid row wins
+    for values, label in ((names, "Product with name"), (barcodes, "Barcode")):
+        candidates = errors.isna() & values.notna()
+        first_rows = pd.Series(excel_rows, index=df.index)[candidates].groupby(values[candidates]).transform("min")
+        reject(
+            values[candidates].duplicated().reindex(df.index, fill_value=False),
+            lambda i: f'{label} "{values[i]}" already appears on row {int(first_rows[i])}',
+        )
+
+    valid = errors.isna()
+    missing_barcode = valid & barcodes.isna()
+    if missing_barcode.any():
+        barcodes = barcodes.copy()
+        barcodes[missing_barcode] = _generate_barcodes(
+            db, int(missing_barcode.sum()), set(barcodes.dropna()) | set(existing_barcodes)
+        )
+
+    descriptions = _text_column(df, "description")
+    is_active = _flag_column(df, "is_active", True)
+    is_sold = _flag_column(df, "is_sold", False)
+
+    added = 0
+    rows = np.flatnonzero(valid.to_numpy())
+    if len(rows):
+        # change feed stamp (utils/product_changes.py), as an ORM flush would
+        version = transaction_version(db.connection())
+        values = [
+            {
+                "name": names[i],
+                "description": descriptions[i],
+                "price": float(prices[i]),
+                "quantity_in_stock": int(quantities[i]),
+                "minimum_stock_level": int(minimum_levels[i]),
+                "category_id": category_id,
+                "barcode": barcodes[i],
+                "is_active": bool(is_active[i]),
+                "is_sold": bool(is_sold[i]),
+                "image_urls": [],
+                "variants": variants[i],
+                "admin_id": admin_id,
+                "row_version": version,
+            }
+            for i in rows
+        ]
+        products = db.scalars(insert(Product).returning(Product), values).all()
+        added = len(products)
+
+        # one batched pass for the stock alerts of the new products
+        check_stock_alerts(db, products, commit=False)
+        # product read model rows, built after the commit
+        domain_events.emit(db, "product_changed", product_ids=[product.id for product in products])
+
+    report_errors = [
+        {"row": int(excel_rows[i]), "error": errors[i]} for i in np.flatnonzero(errors.notna().to_numpy())
+    ]
+    return {
+        "total_rows": len(df),
+        "added": added,
+        "skipped": len(report_errors),
+        "errors": report_errors,
+    }
+
+
+def missing_columns(df: pd.DataFrame) -> List[str]:
+    return [column for column in REQUIRED_COLUMNS if column not in df.columns]
+
+
+def sheet_missing_columns(content: bytes) -> List[str]:
+    """Required columns absent from the header row of an Excel file (rows are not read)"""
+    return missing_columns(pd.read_excel(BytesIO(content), nrows=0))
+
+
+@job_handler("product_import")
+def _run_import(job: JobContext) -> dict:
+    """Background job of POST /product/bulk-upload (payload: category_id, admin_id)"""
+    df = pd.read_excel(BytesIO(job.input_data))
+    missing = missing_columns(df)
+    if missing:
+        raise ValueError(f"Missing required columns: {', '.join(missing)}")
+
+    category_id = job.payload["category_id"]
+    report = {"total_rows": len(df), "added": 0, "skipped": 0, "errors": []}
+    job.progress(0, len(df), result=report)
+    for start in range(0, len(df), IMPORT_CHUNK_ROWS):
+        chunk = df.iloc[start:start + IMPORT_CHUNK_ROWS]
+        with SessionLocal() as db:
+            part = import_products(
+                db, chunk, category_id=category_id, admin_id=job.payload["admin_id"], first_row=start + 2
+            )
+            db.commit()
+        if part["added"]:
+            invalidate_tags({"products", "categories", f"category:{category_id}"})
+
+        report["added"] += part["added"]
+        report["skipped"] += part["skipped"]
+        report["errors"] += part["errors"]
+        job.progress(start + len(chunk), result=report)
+    return report
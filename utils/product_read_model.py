@@ -0,0 +1,259 @@
+# utils/product_read_model.py
+#
+# Denormalized product read model (table product_read_model): the final JSON
+# of each product, category name inlined, ready to be written to the socket.
+#
+# Product reads used to decode image_urls / variants, validate
+# ProductVariant, lazy-load category.name and build a Pydantic object per
+# row. The list endpoints now select the stored blobs in the list's order
+# and join them into the response body:
+#     admin_json   ProductWithCategory  (/product/, /product/all/unfiltered)
+#     public_json  storefront product   (/public/products, /public/products/{id})
+#
+# Freshness:
+#   - each row stores the product's row_version at build time; a blob is
+#     only used while it matches the product row, so a stale blob is never
+#     served: those products are serialized the old way until their row is
+#     rebuilt. row_version changes in the write transaction itself, for
+#     product writes, stock changes AND renames of the product's category
+#     (utils/product_changes.py), so a body built right after the commit is
+#     already fresh
+#   - rows are rebuilt right after the commit of any product / category
+#     write or stock change (domain events "product_changed",
+#     "category_changed", "stock_changed")
+#
+# Backfill / repair:
+#     python -m utils.product_read_model rebuild
+#
+import json
+import logging
+import sys
+from typing import Iterable, List, Optional
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import ValidationError
+from sqlalchemy import and_, event, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session, selectinload
+
+from models.category import Category
+from models.product import Product
+from models.product_read_model import ProductReadModel
+from schemas.product import ProductVariant, ProductWithCategory
+from utils import domain_events
+from utils.db import SessionLocal
+from utils.jobs import JobContext, job_handler
+
+logger = logging.getLogger(__name__)
+
+ADMIN = "admin_json"
+PUBLIC = "public_json"
+
+
+# ── Serialization ─────────────────────────────────────────────────────────────
+
+
+def to_product_with_category(p: Product) -> ProductWithCategory:
+    variants_data = None
+    if p.variants:
+        try:
+            variants_data = ProductVariant(**p.variants)
+        except (TypeError, ValueError):
+            pass
+    return ProductWithCategory(
+        id=p.id,
+        name=p.name,
+        description=p.description,
+        price=p.price,
+        quantity_in_stock=p.quantity_in_stock,
+        minimum_stock_level=p.minimum_stock_level,
+        image_urls=p.image_urls or [],
+        category_id=p.category_id,
+        admin_id=p.admin_id,
+        barcode=p.barcode,
+        variants=variants_data,
+        is_sold=p.is_sold,
+        is_active=p.is_active,
+        created_at=p.created_at,
+        updated_at=p.updated_at,
+        category_name=p.category.name,
+    )
+
+
+def admin_payload(p: Product) -> str:
+    return to_product_with_category(p).model_dump_json()
+
+
+# JSON columns the storefront has always received as JSON strings
+_STOREFRONT_JSON_STRINGS = ("image_urls", "variants", "landing_blocks")
+
+
+def public_payload(p: Product) -> str:
+    """Storefront representation: the product's columns + category_name"""
+    data = {column.key: getattr(p, column.key) for column in Product.__table__.columns}
+    for key in _STOREFRONT_JSON_STRINGS:
+        if data[key] is not None:
+            data[key] = json.dumps(data[key], ensure_ascii=False)
+    data["category_name"] = p.category.name
+    return json.dumps(jsonable_encoder(data), ensure_ascii=False)
+
+
+_PAYLOADS = {ADMIN: admin_payload, PUBLIC: public_payload}
+
+
+# ── Maintenance ───────────────────────────────────────────────────────────────
+
+
+def rebuild_product_read_model(db: Session, product_ids: Optional[Iterable[int]] = None) -> int:
+    """
+    (Re)build the rows of these products (all products when None). No commit.
+
+    Returns the number of rows written. Products that fail validation are
+    skipped: their reads keep using the regular serialization.
+    """
+    query = db.query(Product).options(selectinload(Product.category))
+    if product_ids is not None:
+        product_ids = list(product_ids)
+        if not product_ids:
+            return 0
+        query = query.filter(Product.id.in_(product_ids))
+
+    rows = []
+    for product in query.populate_existing():
+        try:
+            rows.append({
+                "product_id": product.id,
+                "product_row_version": product.row_version,
+                ADMIN: admin_payload(product),
+                PUBLIC: public_payload(product),
+            })
+        except (ValidationError, ValueError) as e:
+            logger.warning(f"product_read_model: product {product.id} skipped: {e}")
+    if not rows:
+        return 0
+
+    dialect_insert = pg_insert if db.get_bind().dialect.name == "postgresql" else sqlite_insert
+    stmt = dialect_insert(ProductReadModel).values(rows)
+    db.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[ProductReadModel.product_id],
+            set_={
+                "product_row_version": stmt.excluded.product_row_version,
+                ADMIN: stmt.excluded[ADMIN],
+                PUBLIC: stmt.excluded[PUBLIC],
+            },
+        )
+    )
+    return len(rows)
+
+
+@event.listens_for(SessionLocal, "after_flush")
+def _collect_catalog_writes(session: Session, flush_context) -> None:
+    product_ids, category_ids = set(), set()
+    for obj in session.new | session.dirty:
+        if obj in session.dirty and not session.is_modified(obj, include_collections=False):
+            continue
+        if isinstance(obj, Product):
+            product_ids.add(obj.id)
+        elif isinstance(obj, Category):
+            category_ids.add(obj.id)
+    if product_ids:
+        domain_events.emit(session, "product_changed", product_ids=list(product_ids))
+    if category_ids:
+        domain_events.emit(session, "category_changed", category_ids=list(category_ids))
+
+
+@domain_events.on("product_changed")
+@domain_events.on("stock_changed")
+def _rebuild_changed_products(db: Session, payloads: List[dict]) -> None:
+    """Post-commit: rebuild the rows of the written products"""
+    product_ids = {product_id for payload in payloads for product_id in payload["product_ids"]}
+    rebuild_product_read_model(db, product_ids)
+
+
+@domain_events.on("category_changed")
+def _rebuild_category_products(db: Session, payloads: List[dict]) -> None:
+    """Post-commit: a renamed category changes the category_name of its products"""
+    category_ids = {category_id for payload in payloads for category_id in payload["category_ids"]}
+    product_ids = [
+        product_id
+        for (product_id,) in db.query(Product.id).filter(Product.category_id.in_(category_ids))
+    ]
+    rebuild_product_read_model(db, product_ids)
+
+
+@job_handler("product_read_model_rebuild", startable=True)
+def _rebuild_job(job: JobContext) -> dict:
+    """Background job (POST /jobs/ {"kind": "product_read_model_rebuild"})"""
+    with SessionLocal() as db:
+        count = rebuild_product_read_model(db)
+        db.commit()
+    return {"rows": count}
+
+
+# ── Reads ─────────────────────────────────────────────────────────────────────
+
+
+def blob_select(kind: str, *filters):
+    """
+    SELECT product id + stored JSON (NULL when missing or stale) of the
+    products matching `filters`; add order_by / offset / limit as needed
+    """
+    blob = getattr(ProductReadModel, kind)
+    fresh = and_(
+        ProductReadModel.product_id == Product.id,
+        ProductReadModel.product_row_version == Product.row_version,
+    )
+    return select(Product.id, blob).outerjoin(ProductReadModel, fresh).where(*filters)
+
+
+def fallback_select(product_ids: Iterable[int]):
+    """Products whose blob is missing / stale, to serialize the regular way"""
+    return (
+        select(Product)
+        .options(selectinload(Product.category))
+        .where(Product.id.in_(list(product_ids)))
+    )
+
+
+def _missing(rows) -> list:
+    return [product_id for product_id, blob in rows if blob is None]
+
+
+def _join(rows, kind: str, fallback_products) -> bytes:
+    serialize = _PAYLOADS[kind]
+    built = {product.id: serialize(product) for product in fallback_products}
+    return ("[" + ",".join(blob or built[product_id] for product_id, blob in rows) + "]").encode()
+
+
+def product_list_body(db: Session, kind: str, stmt) -> bytes:
+    """JSON array body of the products selected by `stmt` (from blob_select)"""
+    rows = db.execute(stmt).all()
+    missing = _missing(rows)
+    fallback = db.execute(fallback_select(missing)).scalars().all() if missing else []
+    return _join(rows, kind, fallback)
+
+
+async def product_list_body_async(db, kind: str, stmt) -> bytes:
+    """product_list_body() for an AsyncSession"""
+    rows = (await db.execute(stmt)).all()
+    missing = _missing(rows)
+    fallback = (await db.execute(fallback_select(missing))).scalars().all() if missing else []
+    return _join(rows, kind, fallback)
+
+
+async def product_body_async(db, kind: str, stmt) -> Optional[bytes]:
+    """JSON object body of the single product selected by `stmt`, None if not found"""
+    body = await product_list_body_async(db, kind, stmt)
+    return None if body == b"[]" else body[1:-1]
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] != ["rebuild"]:
+        print("usage: python -m utils.product_read_model rebuild")
+        sys.exit(1)
+    with SessionLocal() as db:
+        count = rebuild_product_read_model(db)
+        db.commit()
+        print(f"product_read_model rebuilt: {count} rows")
@@ -0,0 +1,256 @@
+# utils/product_sales.py
+#
+# Per-product sales rollup (table product_sales_daily, one row per product
+# and day of Bill.created_at): units sold, revenue and number of bill lines.
+#
+# /product/{id}/statistics, /statistics/detailed and /purchases/timeline used
+# to run up to six SUM(...) over bill_items JOIN bills per call; they now read
+# at most 366 rows of this table with one indexed query. Only the hourly view
+# of today still reads bill_items (today's bills, served by
+# ix_bills_created_at_id).
+#
+# The rollup is maintained explicitly where bill items are written:
+#   - record_bill_sales()  after the items of a new bill are flushed
+#   - remove_bill_sales()  before bill items are deleted (the deletes in
+#                          routers/bill.py are bulk query deletes, which
+#                          bypass ORM events)
+#   - reset_product_sales_daily() when every bill is deleted
+#
+# Days are those of the database session's time zone everywhere: the
+# bucketing (created_at of the rows) and "today" of the reads
+# (database_today(), CURRENT_DATE), like bill_daily_stats.
+#
+# Backfill / repair:
+#     python -m utils.product_sales rebuild
+#
+import sys
+from collections import defaultdict
+from datetime import date, timedelta
+from decimal import Decimal
+from typing import Iterable, Optional
+
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from models.bill import Bill
+from models.bill_item import BillItem
+from models.product_sales_daily import ProductSalesDaily
+from utils.db import SessionLocal
+from utils.jobs import JobContext, job_handler
+
+_FIELDS = ("quantity", "revenue", "purchases")
+
+
+# ── Incremental maintenance ───────────────────────────────────────────────────
+
+
+def _upsert(db: Session, deltas: dict) -> None:
+    # fixed (product_id, day) lock order: concurrent bills cannot deadlock
+    rows = [
+        {"product_id": product_id, "day": day, **values}
+        for (product_id, day), values in sorted(deltas.items())
+        if any(values[field] for field in _FIELDS)
+    ]
+    if not rows:
+        return
+
+    dialect_insert = pg_insert if db.get_bind().dialect.name == "postgresql" else sqlite_insert
+    stmt = dialect_insert(ProductSalesDaily).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[ProductSalesDaily.product_id, ProductSalesDaily.day],
+        set_={field: getattr(ProductSalesDaily, field) + stmt.excluded[field] for field in _FIELDS},
+    )
+    db.execute(stmt)
+
+
+def record_bill_sales(db: Session, bill: Bill, items: Iterable[BillItem]) -> None:
+    """
+    Add the items of a new bill to the rollup. No commit.
+
+    The bill must be flushed (created_at is a server default).
+    """
+    if bill.created_at is None:
+        db.flush()
+    day = bill.created_at.date()
+
+    deltas = defaultdict(lambda: dict.fromkeys(_FIELDS, 0))
+    for item in items:
+        if item.product_id is None:
+            continue
+        row = deltas[(item.product_id, day)]
+        row["quantity"] += item.quantity
+        row["revenue"] += item.subtotal
+        row["purchases"] += 1
+    _upsert(db, deltas)
+
+
+def remove_bill_sales(db: Session, bill_ids: Iterable[int]) -> None:
+    """
+    Subtract the items of these bills from the rollup, before they are
+    deleted. One aggregate query whatever the number of bills. No commit.
+    """
+    bill_ids = list(bill_ids)
+    if not bill_ids:
+        return
+
+    day = func.date(Bill.created_at)
+    rows = db.execute(
+        select(
+            BillItem.product_id,
+            day,
+            func.sum(BillItem.quantity),
+            func.sum(BillItem.subtotal),
+            func.count(BillItem.id),
+        )
+        .join(Bill, Bill.id == BillItem.bill_id)
+        .where(
+            BillItem.bill_id.in_(bill_ids),
+            BillItem.product_id.isnot(None),
+            Bill.created_at.isnot(None),
+        )
+        .group_by(BillItem.product_id, day)
+    ).all()
+
+    deltas = {}
+    for product_id, sold_on, quantity, revenue, purchases in rows:
+        if isinstance(sold_on, str):  # sqlite returns date() as text
+            sold_on = date.fromisoformat(sold_on)
+        deltas[(product_id, sold_on)] = {
+            "quantity": -int(quantity or 0),
+            "revenue": -(revenue or Decimal("0.00")),
+            "purchases": -int(purchases or 0),
+        }
+    _upsert(db, deltas)
+
+
+def reset_product_sales_daily(db: Session) -> None:
+    """Empty the rollup (after a bulk delete of all bills). No commit."""
+    db.execute(delete(ProductSalesDaily))
+
+
+def rebuild_product_sales_daily(db: Session) -> int:
+    """Recompute the whole rollup from bill_items. Returns the number of rows."""
+    day = func.date(Bill.created_at)
+    source = (
+        select(
+            BillItem.product_id,
+            day,
+            func.sum(BillItem.quantity),
+            func.sum(BillItem.subtotal),
+            func.count(BillItem.id),
+        )
+        .join(Bill, Bill.id == BillItem.bill_id)
+        .where(BillItem.product_id.isnot(None), Bill.created_at.isnot(None))
+        .group_by(BillItem.product_id, day)
+    )
+
+    db.execute(delete(ProductSalesDaily))
+    db.execute(
+        insert(ProductSalesDaily).from_select(["product_id", "day", *_FIELDS], source)
+    )
+    db.commit()
+    return db.query(ProductSalesDaily).count()
+
+
+@job_handler("product_sales_rebuild", startable=True)
+def _rebuild_job(job: JobContext) -> dict:
+    """Background job (POST /jobs/ {"kind": "product_sales_rebuild"})"""
+    with SessionLocal() as db:
+        return {"rows": rebuild_product_sales_daily(db)}
+
+
+# ── Reads ─────────────────────────────────────────────────────────────────────
+
+
+def product_sales_since(db: Session, product_id: int, start: date) -> list:
+    """Rollup rows of a product from `start` (inclusive), oldest first"""
+    return (
+        db.query(ProductSalesDaily)
+        .filter(ProductSalesDaily.product_id == product_id, ProductSalesDaily.day >= start)
+        .order_by(ProductSalesDaily.day)
+        .all()
+    )
+
+
+def _totals(rows) -> dict:
+    return {
+        "quantity": sum(row.quantity for row in rows),
+        "revenue": float(sum((row.revenue for row in rows), Decimal("0.00"))),
+        "purchases": sum(row.purchases for row in rows),
+    }
+
+
+def database_today(db: Session) -> date:
+    """CURRENT_DATE of the database session: the clock that buckets the rollups"""
+    today = db.scalar(select(func.current_date()))
+    return date.fromisoformat(today) if isinstance(today, str) else today  # SQLite: text
+
+
+def product_sales_periods(db: Session, product_id: int, today: Optional[date] = None) -> dict:
+    """
+    Sales of a product today / this month / this year, from one read of the rollup
+
+    Returns:
+        {"today": totals, "month": totals, "year": totals,
+         "month_by_day": {day: totals}, "year_by_month": {month: totals}}
+        where totals = {"quantity", "revenue", "purchases"}
+    """
+    today = today or database_today(db)
+    month_start = today.replace(day=1)
+    rows = [
+        row for row in product_sales_since(db, product_id, today.replace(month=1, day=1))
+        if row.purchases
+    ]
+
+    month_rows = [row for row in rows if row.day >= month_start]
+    by_day = defaultdict(list)
+    for row in month_rows:
+        by_day[row.day.day].append(row)
+    by_month = defaultdict(list)
+    for row in rows:
+        by_month[row.day.month].append(row)
+
+    return {
+        "today": _totals([row for row in rows if row.day == today]),
+        "month": _totals(month_rows),
+        "year": _totals(rows),
+        "month_by_day": {day: _totals(day_rows) for day, day_rows in sorted(by_day.items())},
+        "year_by_month": {month: _totals(m_rows) for month, m_rows in sorted(by_month.items())},
+    }
+
+
+def product_purchases_timeline(
+    db: Session, product_id: int, period: str, today: Optional[date] = None
+) -> list:
+    """
+    Number of bill lines of a product per day ("week": last 7 days, "month":
+    current month) or per month ("year": current year)
+    """
+    today = today or database_today(db)
+    start = {
+        "week": today - timedelta(days=6),
+        "month": today.replace(day=1),
+        "year": today.replace(month=1, day=1),
+    }[period]
+    rows = [row for row in product_sales_since(db, product_id, start) if row.purchases]
+
+    if period != "year":
+        return [{"date": str(row.day), "purchases": int(row.purchases)} for row in rows]
+
+    by_month = defaultdict(int)
+    for row in rows:
+        by_month[row.day.month] += row.purchases
+    return [
+        {"month": month, "purchases": purchases}
+        for month, purchases in sorted(by_month.items())
+    ]
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] != ["rebuild"]:
+        print("usage: python -m utils.product_sales rebuild")
+        sys.exit(1)
+    with SessionLocal() as db:
+        print(f"product_sales_daily rebuilt: {rebuild_product_sales_daily(db)} rows")
@@ -0,0 +1,111 @@
+# utils/product_search.py
+#
+# Ranked product search for GET /product/search and /public/products/search.
+#
+# PostgreSQL (indexes of migration 2f8a6c1e9d47, extension pg_trgm):
+#   - name:        word similarity  name %> q       GIN gin_trgm_ops
+#                  → typo tolerant ("chemsie" finds "Chemise bleue")
+#   - barcode:     substring        barcode ILIKE %q%  GIN gin_trgm_ops
+#   - name + description: full text
+#                  to_tsvector('simple', name || ' ' || description) @@ q
+#                  GIN on that exact expression
+# Results are ordered by the best of the three scores (exact barcode first).
+# PRODUCT_SEARCH_THRESHOLD (default 0.3) is the word similarity a name must
+# reach; it is applied per transaction (pg_trgm.word_similarity_threshold).
+#
+# Other dialects (SQLite in local development): case-insensitive LIKE on
+# name / barcode / description, name prefix matches first.
+#
+import os
+import re
+
+from fastapi import HTTPException, status
+from sqlalchemy import case, func, literal_column, or_, text
+
+from models.product import Product
+from utils.db import engine
+from utils.product_read_model import blob_select
+
+PRODUCT_SEARCH_THRESHOLD = float(os.getenv("PRODUCT_SEARCH_THRESHOLD", "0.3"))
+SEARCH_MIN_LENGTH = 2
+
+# must stay identical to the expression of index ix_products_search_tsv
+_DOCUMENT = literal_column(
+    "to_tsvector('simple'::regconfig, "
+    "coalesce(products.name, '') || ' ' || coalesce(products.description, ''))"
+)
+_CONFIG = literal_column("'simple'::regconfig")
+
+
+def normalize_query(q: str) -> str:
+    """
+    Collapse whitespace; 400 when fewer than SEARCH_MIN_LENGTH characters
+    remain (a blank query would match every barcode through ILIKE '%%')
+    """
+    q = " ".join(q.split())
+    if len(q) < SEARCH_MIN_LENGTH:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"q must contain at least {SEARCH_MIN_LENGTH} non-blank characters",
+        )
+    return q
+
+
+def _like_pattern(q: str, prefix_only: bool = False) -> str:
+    escaped = re.sub(r"([\\%_])", r"\\\1", q)
+    return f"{escaped}%" if prefix_only else f"%{escaped}%"
+
+
+def _postgresql_search(q: str):
+    tsquery = func.plainto_tsquery(_CONFIG, q)
+    match = or_(
+        Product.name.op("%>")(q),
+        Product.barcode.ilike(_like_pattern(q), escape="\\"),
+        _DOCUMENT.op("@@")(tsquery),
+    )
+    rank = func.greatest(
+        func.word_similarity(q, Product.name),
+        func.ts_rank(_DOCUMENT, tsquery),
+        case((Product.barcode == q, 2.0), else_=0.0),
+    )
+    return match, [rank.desc()]
+
+
+def _fallback_search(q: str):
+    pattern = _like_pattern(q)
+    match = or_(
+        Product.name.ilike(pattern, escape="\\"),
+        Product.barcode.ilike(pattern, escape="\\"),
+        Product.description.ilike(pattern, escape="\\"),
+    )
+    rank = case(
+        (Product.barcode == q, 0),
+        (Product.name.ilike(_like_pattern(q, prefix_only=True), escape="\\"), 1),
+        (Product.name.ilike(pattern, escape="\\"), 2),
+        else_=3,
+    )
+    return match, [rank]
+
+
+def search_select(kind: str, q: str, *filters):
+    """
+    blob_select() of the products matching `q`, best match first; add
+    offset / limit as needed
+    """
+    if engine.dialect.name == "postgresql":
+        match, order_by = _postgresql_search(q)
+    else:
+        match, order_by = _fallback_search(q)
+    return blob_select(kind, match, *filters).order_by(*order_by, Product.id)
+
+
+def similarity_threshold_statement():
+    """
+    Statement to execute in the search's transaction before search_select()
+    (None when not needed)
+    """
+    if engine.dialect.name != "postgresql":
+        return None
+    return text("SELECT set_config('pg_trgm.word_similarity_threshold', :threshold, true)").bindparams(
+        threshold=str(PRODUCT_SEARCH_THRESHOLD)
+    )
@@ -0,0 +1,291 @@
+# utils/rate_limit.py
+#
+# Token-bucket rate limiting of the unauthenticated endpoints that write or
+# cost money: POST /public/orders, GET /public/track..., POST /otp/send
+# (each OTP is a Resend e-mail).
+#
+# Every policy is a bucket per key: `capacity` requests at once, refilled
+# continuously at capacity / period per second. A request takes one token
+# from each policy matching its method + path; when a bucket is empty the
+# middleware answers 429 with Retry-After (seconds until the next token),
+# before the route runs: no threadpool slot, no DB connection.
+#
+# Keys:
+#   ip                  client address (see RATE_LIMIT_TRUSTED_PROXIES)
+#   body:<field>        field of the JSON body (phone_number, email),
+#                       normalized; requests without it skip the policy
+#
+# Limits can be changed per policy with RATE_LIMIT_<NAME>=<capacity>/<period
+# seconds>, e.g. RATE_LIMIT_OTP_SEND_EMAIL=3/3600. RATE_LIMIT_ENABLED=0
+# turns the middleware off.
+#
+# Backends:
+#   - in-process (default): RATE_LIMIT_MAX_KEYS buckets per worker, least
+#     recently used evicted
+#   - Redis, shared by every worker: RATE_LIMIT_URL=redis://host:6379/1
+#     (requires the `redis` package; one Lua script call per bucket)
+# A backend error lets the request through (logged).
+#
+# Allowed / limited requests are exported through GET /metrics
+# (rate_limit_requests_total, by policy and result).
+#
+import json
+import logging
+import math
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+from utils import metrics
+
+logger = logging.getLogger(__name__)
+
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "1") == "1"
+RATE_LIMIT_URL = os.getenv("RATE_LIMIT_URL")
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", "100000"))
+# Reverse proxies in front of the app (Railway, nginx...): the client
+# address is then the N-th X-Forwarded-For entry from the right
+RATE_LIMIT_TRUSTED_PROXIES = int(os.getenv("RATE_LIMIT_TRUSTED_PROXIES", "0"))
+
+# bodies above this size are not parsed (body:<field> policies are skipped)
+_MAX_BODY_BYTES = 64 * 1024
+
+RATE_LIMIT_REQUESTS = metrics.counter(
+    "rate_limit_requests_total", "Rate limited requests checked, by policy and result (allowed / limited)"
+)
+
+
+# ── Policies ──────────────────────────────────────────────────────────────────
+
+
+class RatePolicy:
+    def __init__(self, name: str, method: str, path: str, key: str, limit: str, prefix: bool = False):
+        self.name = name
+        self.method = method
+        self.path = path
+        self.prefix = prefix
+        self.key = key
+        capacity, period = os.getenv(f"RATE_LIMIT_{name.upper()}", limit).split("/")
+        self.capacity = int(capacity)
+        self.rate = self.capacity / float(period)  # tokens per second
+
+    def matches(self, method: str, path: str) -> bool:
+        if method != self.method:
+            return False
+        path = path.rstrip("/") or "/"
+        return path.startswith(self.path) if self.prefix else path == self.path
+
+
+POLICIES: List[RatePolicy] = [
+    RatePolicy("public_orders_ip", "POST", "/public/orders", "ip", "10/60"),
+    RatePolicy("public_orders_phone", "POST", "/public/orders", "body:phone_number", "5/3600"),
+    RatePolicy("public_track_ip", "GET", "/public/track", "ip", "60/60", prefix=True),
+    RatePolicy("otp_send_ip", "POST", "/otp/send", "ip", "10/3600"),
+    RatePolicy("otp_send_email", "POST", "/otp/send", "body:email", "5/3600"),
+]
+
+
+def _normalize(field: str, value) -> Optional[str]:
+    if value is None:
+        return None
+    value = str(value).strip()
+    if field == "phone_number":
+        value = re.sub(r"\D", "", value)
+    elif field == "email":
+        value = value.lower()
+    return value or None
+
+
+# ── Backends ──────────────────────────────────────────────────────────────────
+
+
+class MemoryBackend:
+    """Buckets of this process: key → (tokens, monotonic time of the last refill)"""
+
+    def __init__(self, max_keys: int):
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    async def take(self, key: str, capacity: int, rate: float) -> Tuple[bool, float]:
+        """(allowed, seconds until the next token when refused)"""
+        now = time.monotonic()
+        with self._lock:
+            tokens, stamp = self._buckets.get(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - stamp) * rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return allowed, 0.0 if allowed else (1 - tokens) / rate
+
+    def clear(self) -> None:
+        with self._lock:
+            self._buckets.clear()
+
+
+class RedisBackend:
+    """Shared buckets: one hash per key, updated atomically by a Lua script"""
+
+    prefix = "ratelimit:"
+
+    # clock of the Redis server: every worker sees the same time
+    _SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'stamp')
+local tokens = tonumber(bucket[1]) or capacity
+local stamp = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + (now - stamp) * rate)
+local allowed = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+    allowed = 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'stamp', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity / rate * 1000))
+return {allowed, tostring((1 - tokens) / rate)}
+"""
+
+    def __init__(self, url: str):
+        import redis.asyncio  # optional dependency, only needed for this backend
+
+        self._redis = redis.asyncio.Redis.from_url(url)
+        self._script = self._redis.register_script(self._SCRIPT)
+
+    async def take(self, key: str, capacity: int, rate: float) -> Tuple[bool, float]:
+        allowed, retry_after = await self._script(keys=[self.prefix + key], args=[capacity, rate])
+        return bool(allowed), 0.0 if allowed else float(retry_after)
+
+    def clear(self) -> None:
+        pass
+
+
+def _make_backend():
+    if RATE_LIMIT_URL:
+        try:
+            return RedisBackend(RATE_LIMIT_URL)
+        except ImportError:
+            logger.warning("RATE_LIMIT_URL is set but `redis` is not installed: using in-process rate limits")
+    return MemoryBackend(RATE_LIMIT_MAX_KEYS)
+
+
+backend = _make_backend()
+
+
+# ── Middleware ────────────────────────────────────────────────────────────────
+
+
+def _client_ip(scope) -> str:
+    if RATE_LIMIT_TRUSTED_PROXIES > 0:
+        for name, value in scope["headers"]:
+            if name == b"x-forwarded-for":
+                hops = [hop.strip() for hop in value.decode("latin-1").split(",") if hop.strip()]
+                if hops:
+                    return hops[-min(RATE_LIMIT_TRUSTED_PROXIES, len(hops))]
+    client = scope.get("client")
+    return client[0] if client else "unknown"
+
+
+async def _read_body(receive) -> Tuple[bytes, list]:
+    """Whole request body + the messages to replay to the application"""
+    messages, chunks, size = [], [], 0
+    while True:
+        message = await receive()
+        messages.append(message)
+        if message["type"] != "http.request":
+            break
+        chunks.append(message.get("body", b""))
+        size += len(chunks[-1])
+        if not message.get("more_body", False) or size > _MAX_BODY_BYTES:
+            break
+    return b"".join(chunks), messages
+
+
+def _body_field(body: bytes, field: str) -> Optional[str]:
+    if not body or len(body) > _MAX_BODY_BYTES:
+        return None
+    try:
+        document = json.loads(body)
+    except ValueError:
+        return None
+    if not isinstance(document, dict):
+        return None
+    return _normalize(field, document.get(field))
+
+
+class RateLimitMiddleware:
+    """ASGI middleware applying POLICIES (add it inside CORSMiddleware so 429s carry CORS headers)"""
+
+    def __init__(self, app, policies: Optional[List[RatePolicy]] = None):
+        self.app = app
+        self.policies = POLICIES if policies is None else policies
+
+    async def __call__(self, scope, receive, send):
+        if not RATE_LIMIT_ENABLED or scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        policies = [policy for policy in self.policies if policy.matches(scope["method"], scope["path"])]
+        if not policies:
+            return await self.app(scope, receive, send)
+
+        body = None
+        if any(policy.key.startswith("body:") for policy in policies):
+            body, messages = await _read_body(receive)
+            upstream = receive
+
+            async def receive():
+                if messages:
+                    return messages.pop(0)
+                return await upstream()
+
+        for policy in policies:
+            if policy.key == "ip":
+                value = _client_ip(scope)
+            else:
+                value = _body_field(body, policy.key[len("body:"):])
+                if value is None:
+                    continue
+            try:
+                allowed, retry_after = await backend.take(
+                    f"{policy.name}:{value}", policy.capacity, policy.rate
+                )
+            except Exception as e:
+                logger.warning(f"Rate limit backend error ({policy.name}): {e}")
+                continue
+            RATE_LIMIT_REQUESTS.inc(policy=policy.name, result="allowed" if allowed else "limited")
+            if not allowed:
+                return await _too_many_requests(send, retry_after)
+
+        return await self.app(scope, receive, send)
+
+
+async def _too_many_requests(send, retry_after: float) -> None:
+    """429 in the shape of main.py's HTTPException handler"""
+    body = json.dumps(
+        {
+            "error": True,
+            "message": "Trop de requêtes, veuillez réessayer plus tard.",
+            "status_code": 429,
+        },
+        ensure_ascii=False,
+    ).encode()
+    await send(
+        {
+            "type": "http.response.start",
+            "status": 429,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(max(1, math.ceil(retry_after))).encode()),
+            ],
+        }
+    )
+    await send({"type": "http.response.body", "body": body})
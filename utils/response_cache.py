@@ -0,0 +1,370 @@
+# utils/response_cache.py
+#
+# Server-side cache of serialized catalog responses (/product/,
+# /product/all/unfiltered, /category/, /public/products...).
+#
+# Those endpoints rebuild up to 3000 product objects per call while the
+# catalog changes a few times a day. A cached entry holds the final JSON
+# body, so a hit costs one lookup: no query, no Pydantic object.
+#
+# Keys: route path + sorted query string. Every entry carries tags:
+#     products        any product list
+#     product:{id}    a single product
+#     category:{id}   a list filtered on that category
+#     categories      the category list (with product counts)
+# and writes invalidate the tags they touch, right after their commit:
+#   - any commit of a SessionLocal session that created / updated / deleted
+#     a Product or a Category (create_product, update_product,
+#     update_product_stock, delete_product, landing blocks, categories...)
+#   - stock changes of bills and public orders: bulk UPDATEs that the ORM
+#     does not see as changes, registered by utils/stock_manager.py with
+#     invalidate_after_commit()
+#
+# Every tag has a generation, bumped by each invalidation. A miss reads the
+# generations of its tags BEFORE building the body and only stores it if
+# they did not move meanwhile: a body built from rows read before a write
+# committed cannot be stored after that write's invalidation.
+#
+# Backends:
+#   - in-process LRU (default): RESPONSE_CACHE_MAX_ENTRIES entries per worker
+#   - Redis, shared by every worker: RESPONSE_CACHE_URL=redis://host:6379/0
+#     (requires the `redis` package)
+# Search results (any q / skip / limit, unauthenticated for the storefront)
+# go to a separate cache of RESPONSE_CACHE_SEARCH_MAX_ENTRIES entries
+# (search_backend) so they never evict the catalog lists.
+# RESPONSE_CACHE_TTL (seconds, default 300) bounds staleness in case of a
+# write made outside this application; 0 disables the cache.
+#
+# Endpoints served from a read replica must build cache entries from the
+# primary (utils.db.primary_session / primary_async_session): right after
+# an invalidation a lagging replica would otherwise put the old body back
+# for RESPONSE_CACHE_TTL. Their 304 answers (ETag query on the replica) are
+# at most DB_REPLICA_MAX_LAG_SECONDS behind.
+#
+# Hits / misses / invalidations are exported through GET /metrics.
+#
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Iterable, Optional, Tuple
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from models.category import Category
+from models.product import Product
+from utils import metrics
+from utils.db import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+RESPONSE_CACHE_TTL = int(os.getenv("RESPONSE_CACHE_TTL", "300"))
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "512"))
+RESPONSE_CACHE_SEARCH_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_SEARCH_MAX_ENTRIES", "128"))
+RESPONSE_CACHE_URL = os.getenv("RESPONSE_CACHE_URL")
+
+CACHE_REQUESTS = metrics.counter(
+    "response_cache_requests_total", "Cached route lookups, by route and result (hit / miss)"
+)
+CACHE_INVALIDATIONS = metrics.counter(
+    "response_cache_invalidations_total", "Tags invalidated in the response cache"
+)
+
+_TAGS_KEY = "response_cache_tags"
+
+
+# ── Backends ──────────────────────────────────────────────────────────────────
+
+
+class MemoryBackend:
+    """LRU dict of this process: key → (expires_at, body, tags)"""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._tags: dict = {}
+        self._generations: dict = {}
+        self._lock = threading.Lock()
+
+    def generations(self, tags: Tuple[str, ...]) -> tuple:
+        with self._lock:
+            return tuple(self._generations.get(tag, 0) for tag in tags)
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key: str, body: bytes, tags: Tuple[str, ...], ttl: int, generations: tuple) -> None:
+        with self._lock:
+            if tuple(self._generations.get(tag, 0) for tag in tags) != generations:
+                return  # invalidated while the body was built
+            self._remove(key)
+            self._entries[key] = (time.monotonic() + ttl, body, tags)
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def invalidate_tags(self, tags: Iterable[str]) -> None:
+        with self._lock:
+            for tag in tags:
+                self._generations[tag] = self._generations.get(tag, 0) + 1
+                for key in self._tags.pop(tag, ()):
+                    self._remove(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._tags.clear()
+            self._generations.clear()
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for tag in entry[2]:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+
+class RedisBackend:
+    """Shared cache: one string per entry, one set of keys and one generation counter per tag"""
+
+    # KEYS: entry, generation counters, tag sets; ARGV: body, ttl, expected
+    # generations. Checks and writes atomically.
+    _SET_SCRIPT = """
+local n = (#KEYS - 1) / 2
+for i = 1, n do
+    if (redis.call('GET', KEYS[1 + i]) or '0') ~= ARGV[2 + i] then
+        return 0
+    end
+end
+redis.call('SET', KEYS[1], ARGV[1], 'EX', ARGV[2])
+for i = 1, n do
+    redis.call('SADD', KEYS[1 + n + i], KEYS[1])
+    redis.call('EXPIRE', KEYS[1 + n + i], ARGV[2])
+end
+return 1
+"""
+
+    def __init__(self, url: str, prefix: str = "respcache:"):
+        import redis  # optional dependency, only needed for this backend
+
+        self.prefix = prefix
+        self._redis = redis.Redis.from_url(url)
+        self._set_script = self._redis.register_script(self._SET_SCRIPT)
+
+    def _generation_keys(self, tags: Iterable[str]) -> list:
+        return [self.prefix + "gen:" + tag for tag in tags]
+
+    def generations(self, tags: Tuple[str, ...]) -> tuple:
+        if not tags:
+            return ()
+        values = self._redis.mget(self._generation_keys(tags))
+        return tuple((value or b"0").decode() for value in values)
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self._redis.get(self.prefix + key)
+
+    def set(self, key: str, body: bytes, tags: Tuple[str, ...], ttl: int, generations: tuple) -> None:
+        self._set_script(
+            keys=[
+                self.prefix + key,
+                *self._generation_keys(tags),
+                *(self.prefix + "tag:" + tag for tag in tags),
+            ],
+            args=[body, ttl, *generations],
+        )
+
+    def invalidate_tags(self, tags: Iterable[str]) -> None:
+        tags = list(tags)
+        if not tags:
+            return
+        # generations first: a store racing with this call is refused
+        pipe = self._redis.pipeline()
+        for generation_key in self._generation_keys(tags):
+            pipe.incr(generation_key)
+        pipe.execute()
+        tag_keys = [self.prefix + "tag:" + tag for tag in tags]
+        keys = self._redis.sunion(tag_keys)
+        self._redis.delete(*keys, *tag_keys)
+
+    def clear(self) -> None:
+        keys = list(self._redis.scan_iter(self.prefix + "*"))
+        if keys:
+            self._redis.delete(*keys)
+
+
+def _make_backend(max_entries: int, prefix: str):
+    if RESPONSE_CACHE_URL:
+        try:
+            return RedisBackend(RESPONSE_CACHE_URL, prefix)
+        except ImportError:
+            logger.warning("RESPONSE_CACHE_URL is set but `redis` is not installed: using the in-process cache")
+    return MemoryBackend(max_entries)
+
+
+backend = _make_backend(RESPONSE_CACHE_MAX_ENTRIES, "respcache:")
+search_backend = _make_backend(RESPONSE_CACHE_SEARCH_MAX_ENTRIES, "respcache:search:")
+_backends = (backend, search_backend)
+
+
+# ── Cached responses ──────────────────────────────────────────────────────────
+
+
+def _cache_key(request: Request) -> str:
+    query = sorted(request.query_params.multi_items())
+    return request.url.path + "?" + "&".join(f"{name}={value}" for name, value in query)
+
+
+def _lookup(cache, request: Request, tags: Tuple[str, ...]):
+    """
+    (key, cached body or None, generations of `tags` on a miss);
+    cache errors count as misses that are not stored
+    """
+    key = _cache_key(request)
+    generations = None
+    try:
+        body = cache.get(key)
+        if body is None:
+            generations = cache.generations(tags)
+    except Exception as e:
+        logger.warning(f"Response cache read failed: {e}")
+        body = None
+    route = request.scope.get("route")
+    CACHE_REQUESTS.inc(
+        route=getattr(route, "path", request.url.path),
+        result="hit" if body is not None else "miss",
+    )
+    return key, body, generations
+
+
+def _encode(data: Any) -> bytes:
+    if isinstance(data, bytes):  # already a JSON body (utils/product_read_model.py)
+        return data
+    return json.dumps(jsonable_encoder(data), ensure_ascii=False).encode()
+
+
+def _store(cache, key: str, data: Any, tags: Tuple[str, ...], generations: Optional[tuple]) -> bytes:
+    body = _encode(data)
+    if generations is None:
+        return body
+    try:
+        cache.set(key, body, tags, RESPONSE_CACHE_TTL, generations)
+    except Exception as e:
+        logger.warning(f"Response cache write failed: {e}")
+    return body
+
+
+def _json_response(body: bytes) -> Response:
+    return Response(content=body, media_type="application/json")
+
+
+def cached_json(request: Request, build: Callable[[], Any], tags: Iterable[str], cache=None) -> Response:
+    """
+    JSON response of `build()`, served from the cache when possible
+
+    `build` returns what the endpoint used to return (Pydantic models, ORM
+    objects, dicts) or a ready JSON body (bytes); it is only called on a miss. Exceptions (404...) are
+    not cached. `cache`: backend (default) or search_backend.
+    """
+    if RESPONSE_CACHE_TTL <= 0:
+        return _json_response(_encode(build()))
+    cache = cache or backend
+    tags = tuple(tags)
+    key, body, generations = _lookup(cache, request, tags)
+    if body is None:
+        body = _store(cache, key, build(), tags, generations)
+    return _json_response(body)
+
+
+async def cached_json_async(
+    request: Request, build: Callable[[], Awaitable[Any]], tags: Iterable[str], cache=None
+) -> Response:
+    """cached_json() for async endpoints (`build` is a coroutine function)"""
+    if RESPONSE_CACHE_TTL <= 0:
+        return _json_response(_encode(await build()))
+    cache = cache or backend
+    tags = tuple(tags)
+    key, body, generations = _lookup(cache, request, tags)
+    if body is None:
+        body = _store(cache, key, await build(), tags, generations)
+    return _json_response(body)
+
+
+# ── Invalidation ──────────────────────────────────────────────────────────────
+
+
+def invalidate_tags(tags: Iterable[str]) -> None:
+    tags = set(tags)
+    if not tags:
+        return
+    try:
+        for cache in _backends:
+            cache.invalidate_tags(tags)
+    except Exception as e:
+        logger.error(f"Response cache invalidation failed ({', '.join(sorted(tags))}): {e}")
+        return
+    CACHE_INVALIDATIONS.inc(len(tags))
+
+
+def invalidate_after_commit(session: Session, tags: Iterable[str]) -> None:
+    """Invalidate `tags` right after the session's commit (writes the ORM does not track)"""
+    session.info.setdefault(_TAGS_KEY, set()).update(tags)
+
+
+def _product_tags(product: Product, created_or_deleted: bool) -> set:
+    tags = {"products", f"product:{product.id}", f"category:{product.category_id}"}
+    history = inspect(product).attrs.category_id.history
+    if created_or_deleted or history.has_changes():
+        # product counts of /category/ change as well
+        tags.add("categories")
+        tags.update(f"category:{category_id}" for category_id in history.deleted if category_id)
+    return tags
+
+
+@event.listens_for(SessionLocal, "after_flush")
+def _collect_catalog_changes(session: Session, flush_context) -> None:
+    tags = set()
+    for obj in session.new | session.deleted:
+        if isinstance(obj, Product):
+            tags |= _product_tags(obj, created_or_deleted=True)
+        elif isinstance(obj, Category):
+            tags |= {"categories", "products", f"category:{obj.id}"}
+    for obj in session.dirty:
+        if not session.is_modified(obj, include_collections=False):
+            continue
+        if isinstance(obj, Product):
+            tags |= _product_tags(obj, created_or_deleted=False)
+        elif isinstance(obj, Category):
+            # product lists embed category_name
+            tags |= {"categories", "products", f"category:{obj.id}"}
+    if tags:
+        invalidate_after_commit(session, tags)
+
+
+@event.listens_for(SessionLocal, "after_commit")
+def _invalidate_after_commit(session: Session) -> None:
+    tags = session.info.pop(_TAGS_KEY, None)
+    if tags:
+        invalidate_tags(tags)
+
+
+@event.listens_for(SessionLocal, "after_rollback")
+def _drop_catalog_changes(session: Session) -> None:
+    session.info.pop(_TAGS_KEY, None)
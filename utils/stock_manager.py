@@ -1,26 +1,24 @@
-from sqlalchemy.orm import Session
+from datetime import datetime
+from typing import Dict, Iterable, List, Tuple, Union
+
+from sqlalchemy import case, update
+from sqlalchemy.orm import Session, joinedload
+from sqlalchemy.orm.attributes import set_committed_value
 from models.product import Product
+from models.ecommerce_order import EcommerceOrder, DeliveryStatus
 from models.stock_alert import StockAlert
 from utils.notification_manager import create_stock_alert_notification
+from utils import domain_events
+from utils.product_changes import transaction_version
+from utils.response_cache import invalidate_after_commit
 
-def check_and_create_stock_alert(db: Session, product: Product) -> StockAlert:
+def _new_stock_alert(product: Product, existing_alert: StockAlert):
     """
-    Vérifier le niveau de stock d'un produit et créer une alerte si nécessaire
-    
-    Args:
-        db: Session de base de données
-        product: Produit à vérifier
-        
-    Returns:
-        StockAlert si une alerte a été créée, sinon None
+    Alerte à créer pour le niveau de stock actuel du produit (ou None)
+
+    Résout l'alerte existante si elle est remplacée ou si le stock est redevenu suffisant.
     """
-    
-    # Vérifier s'il existe déjà une alerte non résolue pour ce produit
-    existing_alert = db.query(StockAlert).filter(
-        StockAlert.product_id == product.id,
-        StockAlert.is_resolved == False
-    ).first()
-    
+
     # Si le stock est critique (0 ou inférieur)
     if product.quantity_in_stock <= 0:
         if not existing_alert or existing_alert.alert_type != "out_of_stock":
@@ -29,19 +27,11 @@ def check_and_create_stock_alert(db: Session, product: Product) -> StockAlert:
                 existing_alert.is_resolved = True
             
             # Créer une nouvelle alerte critique
-            alert = StockAlert(
+            return StockAlert(
                 product_id=product.id,
                 alert_type="out_of_stock",
                 message=f"CRITIQUE: Le produit '{product.name}' est en rupture de stock (0 unités restantes)"
             )
-            db.add(alert)
-            db.commit()
-            db.refresh(alert)
-            
-            # Créer une notification pour l'admin
-            create_stock_alert_notification(db, alert, product)
-            
-            return alert
     
     # Si le stock est faible (inférieur ou égal au minimum)
     elif product.quantity_in_stock <= product.minimum_stock_level:
@@ -51,29 +41,100 @@ def check_and_create_stock_alert(db: Session, product: Product) -> StockAlert:
                 existing_alert.is_resolved = True
             
             # Créer une nouvelle alerte de stock faible
-            alert = StockAlert(
+            return StockAlert(
                 product_id=product.id,
                 alert_type="low_stock",
                 message=f"ATTENTION: Le produit '{product.name}' a un stock faible ({product.quantity_in_stock} unités restantes, minimum recommandé: {product.minimum_stock_level})"
             )
-            db.add(alert)
-            db.commit()
-            db.refresh(alert)
-            
-            # Créer une notification pour l'admin
-            create_stock_alert_notification(db, alert, product)
-            
-            return alert
     
     # Si le stock est suffisant, résoudre les alertes existantes
     elif existing_alert:
-        from datetime import datetime
         existing_alert.is_resolved = True
         existing_alert.resolved_at = datetime.now()
-        db.commit()
     
     return None
 
+
+def check_stock_alerts(db: Session, products: List[Product], commit: bool = True) -> List[StockAlert]:
+    """
+    Vérifier le niveau de stock de plusieurs produits en une passe
+
+    Une seule requête pour les alertes non résolues, une seule liste d'admins
+    pour les notifications et un seul commit, quel que soit le nombre de produits.
+    
+    Args:
+        db: Session de base de données
+        products: Produits à vérifier (doublons ignorés)
+        commit: Valider immédiatement (False quand l'appelant regroupe les écritures)
+        
+    Returns:
+        Liste des alertes créées
+    """
+    
+    products = list({product.id: product for product in products}.values())
+    if not products:
+        return []
+    
+    # Alertes non résolues des produits, en une requête
+    existing_alerts = {}
+    for alert in (
+        db.query(StockAlert)
+        .filter(
+            StockAlert.product_id.in_([product.id for product in products]),
+            StockAlert.is_resolved == False
+        )
+        .order_by(StockAlert.id)
+    ):
+        existing_alerts.setdefault(alert.product_id, alert)
+    
+    created = []
+    for product in products:
+        alert = _new_stock_alert(product, existing_alerts.get(product.id))
+        if alert:
+            db.add(alert)
+            created.append((alert, product))
+    
+    if created:
+        db.flush()
+        # Créer une notification pour l'admin
+        for alert, product in created:
+            create_stock_alert_notification(db, alert, product, commit=False)
+    
+    if commit:
+        db.commit()
+    
+    return [alert for alert, _ in created]
+
+
+def check_and_create_stock_alert(db: Session, product: Product) -> StockAlert:
+    """
+    Vérifier le niveau de stock d'un produit et créer une alerte si nécessaire
+    
+    Args:
+        db: Session de base de données
+        product: Produit à vérifier
+        
+    Returns:
+        StockAlert si une alerte a été créée, sinon None
+    """
+    
+    alerts = check_stock_alerts(db, [product])
+    return alerts[0] if alerts else None
+
+
+@domain_events.on("stock_changed")
+def _check_changed_stock(db: Session, payloads: List[dict]) -> None:
+    """Post-commit: alertes de stock des produits modifiés (dédupliqués)"""
+
+    product_ids = {product_id for payload in payloads for product_id in payload["product_ids"]}
+    products = (
+        db.query(Product)
+        .options(joinedload(Product.category))
+        .filter(Product.id.in_(product_ids))
+        .all()
+    )
+    check_stock_alerts(db, products, commit=False)
+
 def check_product_availability(db: Session, product_id: int, quantity: int) -> dict:
     """
     Vérifier si un produit est disponible en quantité suffisante
@@ -113,6 +174,234 @@ def check_product_availability(db: Session, product_id: int, quantity: int) -> d
         "product": product
     }
 
+class StockError(ValueError):
+    """Erreur de réservation de stock (sous-classe de ValueError pour compatibilité)"""
+
+    def __init__(self, message: str, product_id: int = None, product: Product = None):
+        super().__init__(message)
+        self.product_id = product_id
+        self.product = product
+
+
+class ProductNotFoundError(StockError):
+    pass
+
+
+class ProductUnavailableError(StockError):
+    pass
+
+
+class InsufficientStockError(StockError):
+    def __init__(self, product: Product, requested: int):
+        super().__init__(
+            f"Stock insuffisant pour '{product.name}'. Stock actuel: {product.quantity_in_stock}",
+            product.id,
+            product,
+        )
+        self.requested = requested
+        self.available = product.quantity_in_stock
+
+
+StockQuantities = Union[Dict[int, int], Iterable[Tuple[int, int]]]
+
+
+def _merge_quantities(quantities: StockQuantities) -> Dict[int, int]:
+    """Additionner les quantités d'un même produit (ex: deux lignes avec variantes différentes)"""
+    pairs = quantities.items() if isinstance(quantities, dict) else quantities
+    merged: Dict[int, int] = {}
+    for product_id, quantity in pairs:
+        merged[product_id] = merged.get(product_id, 0) + quantity
+    return merged
+
+
+def _lock_products(db: Session, product_ids) -> Dict[int, Product]:
+    """
+    Charger et verrouiller les produits en une seule requête.
+
+    Les lignes sont verrouillées dans l'ordre des IDs: deux transactions qui
+    réservent les mêmes produits prennent les verrous dans le même ordre et
+    ne peuvent donc pas s'interbloquer.
+    """
+    products = (
+        db.query(Product)
+        .filter(Product.id.in_(product_ids))
+        .order_by(Product.id)
+        .with_for_update()
+        .populate_existing()
+        .all()
+    )
+    return {product.id: product for product in products}
+
+
+def _apply_stock_delta(db: Session, products: Dict[int, Product], deltas: Dict[int, int]) -> None:
+    """
+    Appliquer toutes les variations de stock en un seul UPDATE.
+
+    La clause WHERE refuse toute ligne dont le stock deviendrait négatif: même
+    si une ligne avait échappé au verrou, l'UPDATE ne peut pas survendre.
+    """
+    delta = case(deltas, value=Product.id)
+    # change feed of GET /product/changes (utils/product_changes.py)
+    version = transaction_version(db.connection())
+    updated = (
+        db.query(Product)
+        .filter(
+            Product.id.in_(list(deltas)),
+            Product.quantity_in_stock + delta >= 0,
+        )
+        .update(
+            {
+                Product.quantity_in_stock: Product.quantity_in_stock + delta,
+                Product.row_version: version,
+            },
+            synchronize_session=False,
+        )
+    )
+    if updated != len(deltas):
+        raise StockError("Le stock a été modifié pendant la réservation, veuillez réessayer")
+
+    # Alertes de stock évaluées après le commit (utils/domain_events.py)
+    domain_events.emit(db, "stock_changed", product_ids=list(deltas))
+    # Réponses en cache invalidées dès le commit (l'UPDATE échappe à l'ORM)
+    invalidate_after_commit(db, {"products", *(f"product:{product_id}" for product_id in deltas)})
+
+    # Mettre les objets en mémoire à jour sans requête supplémentaire
+    # (les lignes sont verrouillées, la nouvelle valeur est connue)
+    for product_id, change in deltas.items():
+        product = products[product_id]
+        set_committed_value(
+            product, "quantity_in_stock", product.quantity_in_stock + change
+        )
+        set_committed_value(product, "row_version", version)
+
+
+def reserve_stock(db: Session, quantities: StockQuantities, check_active: bool = True) -> Dict[int, Product]:
+    """
+    Réserver (décrémenter) le stock de plusieurs produits de façon atomique
+
+    Une seule requête SELECT ... FOR UPDATE (triée par ID) puis un seul UPDATE.
+    Si un produit manque, est inactif ou n'a pas assez de stock, rien n'est
+    modifié et une StockError est levée. Ne fait PAS de commit: l'appelant
+    valide la transaction avec le reste de ses écritures (facture, commande...)
+    et les alertes de stock sont évaluées après ce commit.
+
+    Args:
+        db: Session de base de données
+        quantities: {product_id: quantité} ou liste de (product_id, quantité)
+        check_active: Refuser les produits désactivés
+
+    Returns:
+        dict {product_id: Product} des produits verrouillés et mis à jour
+    """
+
+    requested = _merge_quantities(quantities)
+    if not requested:
+        return {}
+
+    products = _lock_products(db, sorted(requested))
+
+    for product_id in sorted(requested):
+        product = products.get(product_id)
+        if not product:
+            raise ProductNotFoundError(f"Produit avec ID {product_id} non trouvé", product_id)
+        if check_active and not product.is_active:
+            raise ProductUnavailableError(
+                f"Le produit '{product.name}' n'est pas disponible", product_id, product
+            )
+        if product.quantity_in_stock < requested[product_id]:
+            raise InsufficientStockError(product, requested[product_id])
+
+    _apply_stock_delta(
+        db, products, {product_id: -quantity for product_id, quantity in requested.items()}
+    )
+    return products
+
+
+def release_stock(db: Session, quantities: StockQuantities) -> Dict[int, Product]:
+    """
+    Remettre en stock des quantités réservées (annulation, retour...)
+
+    Même verrouillage ordonné que reserve_stock. Les produits supprimés entre
+    temps sont ignorés. Ne fait PAS de commit.
+    """
+
+    requested = _merge_quantities(quantities)
+    if not requested:
+        return {}
+
+    products = _lock_products(db, sorted(requested))
+    deltas = {
+        product_id: quantity
+        for product_id, quantity in requested.items()
+        if product_id in products
+    }
+    if deltas:
+        _apply_stock_delta(db, products, deltas)
+    return products
+
+
+# Statuts pour lesquels une commande e-commerce ne retient plus de stock
+STOCK_RELEASING_STATUSES = {DeliveryStatus.cancelled, DeliveryStatus.returned}
+
+
+def _flip_stock_reserved(db: Session, order: EcommerceOrder, reserved: bool, *conditions) -> bool:
+    """
+    Passer stock_reserved à `reserved` par un UPDATE conditionnel (ligne encore
+    à l'autre valeur). True si cet appel a fait le changement: seul celui-ci
+    doit alors toucher au stock. Deux annulations / suppressions concurrentes
+    ne remettent donc pas deux fois la quantité en stock (la seconde attend
+    le verrou de la ligne puis ne trouve plus rien à changer).
+    """
+    flipped = db.execute(
+        update(EcommerceOrder)
+        .where(
+            EcommerceOrder.id == order.id,
+            EcommerceOrder.stock_reserved == (not reserved),
+            *conditions,
+        )
+        .values(stock_reserved=reserved)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    if flipped:
+        set_committed_value(order, "stock_reserved", reserved)
+    else:
+        db.expire(order, ["stock_reserved"])  # changed by another request
+    return bool(flipped)
+
+
+def set_order_delivery_status(db: Session, order: EcommerceOrder, new_status: DeliveryStatus) -> None:
+    """
+    Changer le statut de livraison d'une commande e-commerce en gardant le stock cohérent
+
+    - annulée / retournée: la quantité réservée est remise en stock
+    - ré-activée depuis annulée / retournée: la quantité est à nouveau réservée
+      (InsufficientStockError si le stock ne suffit plus)
+
+    Ne fait PAS de commit.
+    """
+
+    if new_status == order.delivery_status:
+        return
+
+    if new_status in STOCK_RELEASING_STATUSES:
+        if _flip_stock_reserved(db, order, False):
+            release_stock(db, {order.product_id: order.quantity})
+    elif order.delivery_status in STOCK_RELEASING_STATUSES:
+        if _flip_stock_reserved(db, order, True):
+            reserve_stock(db, {order.product_id: order.quantity}, check_active=False)
+
+    order.delivery_status = new_status
+
+
+def release_order_stock(db: Session, order: EcommerceOrder) -> None:
+    """Remettre en stock la quantité d'une commande qui n'a pas été expédiée (ex: suppression). Pas de commit."""
+
+    if _flip_stock_reserved(
+        db, order, False, EcommerceOrder.delivery_status == DeliveryStatus.not_shipped
+    ):
+        release_stock(db, {order.product_id: order.quantity})
+
+
 def update_product_stock(db: Session, product_id: int, quantity_change: int, operation: str = "decrease") -> Product:
     """
     Mettre à jour le stock d'un produit
@@ -127,26 +416,21 @@ def update_product_stock(db: Session, product_id: int, quantity_change: int, ope
         Product mis à jour
     """
     
-    product = db.query(Product).filter(Product.id == product_id).first()
-    
-    if not product:
-        raise ValueError(f"Produit avec ID {product_id} non trouvé")
-    
     if operation == "increase":
-        product.quantity_in_stock += quantity_change
+        products = release_stock(db, {product_id: quantity_change})
     elif operation == "decrease":
-        if product.quantity_in_stock < quantity_change:
-            raise ValueError(f"Stock insuffisant pour '{product.name}'. Stock actuel: {product.quantity_in_stock}")
-        product.quantity_in_stock -= quantity_change
+        products = reserve_stock(db, {product_id: quantity_change}, check_active=False)
     else:
         raise ValueError(f"Opération invalide: {operation}. Utilisez 'increase' ou 'decrease'")
     
+    product = products.get(product_id)
+    if not product:
+        raise ValueError(f"Produit avec ID {product_id} non trouvé")
+    
+    # Les alertes de stock sont vérifiées après le commit ("stock_changed")
     db.commit()
     db.refresh(product)
     
-    # Vérifier et créer une alerte si nécessaire
-    check_and_create_stock_alert(db, product)
-    
     return product
 
 def get_low_stock_products(db: Session, limit: int = None) -> list:
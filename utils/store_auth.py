@@ -13,10 +13,12 @@ from typing import Optional
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
+from sqlalchemy import select
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from models.store_user import StoreUser, StoreUserRole
-from utils.db import get_db
+from utils.db import get_db, get_async_db
 
 # ── Config ────────────────────────────────────────────────────────────────────
 STORE_SECRET_KEY = os.getenv("STORE_SECRET_KEY", "change-me-store-secret")
@@ -109,6 +111,32 @@ def get_current_store_user(
     return user
 
 
+async def get_current_store_user_async(
+    token: str = Depends(oauth2_scheme),
+    db: AsyncSession = Depends(get_async_db),
+) -> StoreUser:
+    """Same as get_current_store_user, for `async def` routes (AsyncSession)."""
+    payload = _decode_token(token)
+    user_id: Optional[str] = payload.get("sub")
+    if user_id is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED, detail="Token invalide"
+        )
+
+    user = await db.scalar(
+        select(StoreUser).where(
+            StoreUser.id == int(user_id),
+            StoreUser.is_active == True,
+        )
+    )
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Utilisateur introuvable ou désactivé",
+        )
+    return user
+
+
 def get_current_store_admin(
     current_user: StoreUser = Depends(get_current_store_user),
 ) -> StoreUser:
@@ -0,0 +1,57 @@
+# utils/summary.py
+#
+# Dashboard summaries as one SELECT with conditional aggregates.
+#
+# The admin summaries used to run one COUNT/SUM query per figure (six for
+# /bill/summary, four for /stock-alert/summary, five for each
+# /notification/summary). summarize() puts every figure in the same SELECT:
+#
+#     SELECT count(id) AS total,
+#            count(id) FILTER (WHERE status = 'paid') AS paid,
+#            coalesce(sum(total_amount), 0) AS revenue
+#     FROM bills WHERE <shared filters>
+#
+# so the table is scanned once per summary.
+#
+from sqlalchemy import and_, func, select
+from sqlalchemy.orm import Session
+
+
+def count_of(column, *conditions):
+    """COUNT(column) [FILTER (WHERE conditions)]"""
+    aggregate = func.count(column)
+    if conditions:
+        aggregate = aggregate.filter(and_(*conditions))
+    return aggregate
+
+
+def sum_of(column, *conditions):
+    """COALESCE(SUM(column) [FILTER (WHERE conditions)], 0)"""
+    aggregate = func.sum(column)
+    if conditions:
+        aggregate = aggregate.filter(and_(*conditions))
+    return func.coalesce(aggregate, 0)
+
+
+def count_in(column, *conditions):
+    """Scalar subquery counting rows of another table, to add to a summary"""
+    return select(func.count(column)).where(*conditions).scalar_subquery()
+
+
+def summarize(db: Session, filters=(), **aggregates) -> dict:
+    """
+    Evaluate named aggregates in a single query
+
+    Args:
+        filters: WHERE conditions shared by every aggregate
+        aggregates: name=count_of(...) / sum_of(...) / count_in(...)
+
+    Returns:
+        {name: value}
+    """
+    row = (
+        db.query(*(aggregate.label(name) for name, aggregate in aggregates.items()))
+        .filter(*filters)
+        .one()
+    )
+    return row._asdict()
@@ -15,11 +15,27 @@ Setup (one-time):
 
 If either env var is missing, notifications are silently skipped —
 this is intentionally optional and never blocks order creation.
+
+Delivery goes through the transactional outbox (utils/outbox.py): the
+order request only writes an outbox row (queue_new_order_telegram_alert),
+the dispatcher sends it in the background with a pooled HTTP client,
+retries with backoff, turns a burst of orders into one digest message and
+sets telegram_notified on the orders of each message as soon as it is
+sent: a retry only announces the orders that were not sent yet.
 """
 
+import html
 import os
 import logging
+from typing import List, Tuple
+
 import httpx
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+
+from models.ecommerce_order import EcommerceOrder
+from utils.db import AsyncSessionLocal
+from utils.outbox import RetryLater, enqueue, outbox_handler
 
 logger = logging.getLogger(__name__)
 
@@ -27,46 +43,122 @@ TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
 TELEGRAM_CHAT_ID = os.getenv("TELEGRAM_CHAT_ID")
 TELEGRAM_API_URL = "https://api.telegram.org/bot{token}/sendMessage"
 
+NEW_ORDER_TOPIC = "telegram_new_order"
+
+# Telegram rejects messages over 4096 characters
+_MAX_MESSAGE_LENGTH = 4000
+
 
 def is_telegram_configured() -> bool:
     return bool(TELEGRAM_BOT_TOKEN and TELEGRAM_CHAT_ID)
 
 
-def send_new_order_telegram_alert(order) -> bool:
+def queue_new_order_telegram_alert(db: Session, order) -> None:
     """
-    Sends a formatted new-order alert to Telegram.
-    `order` is an EcommerceOrder SQLAlchemy instance (already committed).
-    Returns True if sent successfully, False otherwise (never raises).
+    Queue the new-order alert in the order's transaction (no commit).
+    `order` is an EcommerceOrder already flushed (it has an id).
     """
     if not is_telegram_configured():
         logger.info(
             "Telegram not configured, skipping notification (TELEGRAM_BOT_TOKEN / TELEGRAM_CHAT_ID not set)"
         )
-        return False
+        return
+    enqueue(db, NEW_ORDER_TOPIC, {"order_id": order.id})
+
+
+# ── Messages ──────────────────────────────────────────────────────────────────
 
-    text = (
+
+def _e(value) -> str:
+    """Customer input is sent with parse_mode=HTML"""
+    return html.escape(str(value))
+
+
+def format_order_alert(order) -> str:
+    return (
         f"🛒 Nouvelle commande #{order.id}\n\n"
-        f"👤 Client: {order.full_name}\n"
-        f"📞 Téléphone: {order.phone_number}\n"
-        f"📍 Wilaya: {order.wilaya_name}\n"
-        f"🏘 Baladia: {order.baladia_name}\n"
-        f"🏠 Adresse: {order.address_details or '-'}\n\n"
-        f"📦 Produit: {order.product_name_snapshot}\n"
+        f"👤 Client: {_e(order.full_name)}\n"
+        f"📞 Téléphone: {_e(order.phone_number)}\n"
+        f"📍 Wilaya: {_e(order.wilaya_name)}\n"
+        f"🏘 Baladia: {_e(order.baladia_name)}\n"
+        f"🏠 Adresse: {_e(order.address_details or '-')}\n\n"
+        f"📦 Produit: {_e(order.product_name_snapshot)}\n"
         f"🔢 Quantité: {order.quantity}\n"
         f"💰 Total: {order.total_price} DA\n"
     )
 
-    url = TELEGRAM_API_URL.format(token=TELEGRAM_BOT_TOKEN)
-    payload = {
-        "chat_id": TELEGRAM_CHAT_ID,
-        "text": text,
-        "parse_mode": "HTML",
-    }
-
-    try:
-        response = httpx.post(url, json=payload, timeout=10.0)
-        response.raise_for_status()
-        return True
-    except Exception as e:
-        logger.error(f"Telegram notification failed for order #{order.id}: {str(e)}")
-        return False
+
+def _digest_line(order) -> str:
+    return (
+        f"#{order.id} — {_e(order.full_name)} ({_e(order.phone_number)}) — "
+        f"{_e(order.product_name_snapshot)} × {order.quantity} — "
+        f"{order.total_price} DA — {_e(order.wilaya_name)}"
+    )
+
+
+def format_order_digest(orders: List) -> List[Tuple[List, str]]:
+    """
+    One line per order, split into as few messages as Telegram allows:
+    (orders of the message, text) pairs
+    """
+    chunks, current, lines = [], [], []
+    for order in orders:
+        line = _digest_line(order)
+        if current and len("\n".join(lines + [line])) > _MAX_MESSAGE_LENGTH - 100:
+            chunks.append((current, lines))
+            current, lines = [], []
+        current.append(order)
+        lines.append(line)
+    chunks.append((current, lines))
+    return [
+        (chunk, f"🛒 {len(chunk)} nouvelles commandes\n\n" + "\n".join(chunk_lines))
+        for chunk, chunk_lines in chunks
+    ]
+
+
+# ── Delivery (outbox dispatcher) ──────────────────────────────────────────────
+
+
+async def _send(client: httpx.AsyncClient, text: str) -> None:
+    response = await client.post(
+        TELEGRAM_API_URL.format(token=TELEGRAM_BOT_TOKEN),
+        json={"chat_id": TELEGRAM_CHAT_ID, "text": text, "parse_mode": "HTML"},
+    )
+    if response.status_code == 429:
+        retry_after = response.json().get("parameters", {}).get("retry_after")
+        raise RetryLater("Telegram rate limit", delay=retry_after)
+    response.raise_for_status()
+
+
+@outbox_handler(NEW_ORDER_TOPIC)
+async def send_new_order_alerts(client: httpx.AsyncClient, messages: List) -> None:
+    """
+    Send the alerts of the claimed orders: one message for a single order,
+    a digest for a burst. Each message's orders are marked notified once it
+    is sent; raises on failure (the outbox retries, the orders already
+    announced are skipped).
+    """
+    order_ids = sorted({message.payload["order_id"] for message in messages})
+    async with AsyncSessionLocal() as db:
+        orders = (
+            await db.execute(
+                select(EcommerceOrder)
+                .where(EcommerceOrder.id.in_(order_ids), EcommerceOrder.telegram_notified == False)
+                .order_by(EcommerceOrder.id)
+            )
+        ).scalars().all()
+        if not orders:  # deleted or already announced
+            return
+
+        if len(orders) == 1:
+            chunks = [(orders, format_order_alert(orders[0]))]
+        else:
+            chunks = format_order_digest(orders)
+        for chunk, text in chunks:
+            await _send(client, text)
+            await db.execute(
+                update(EcommerceOrder)
+                .where(EcommerceOrder.id.in_([order.id for order in chunk]))
+                .values(telegram_notified=True)
+            )
+            await db.commit()
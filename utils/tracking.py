@@ -1,89 +1,241 @@
 # utils/tracking.py
 #
 # Generates short human-readable tracking codes and QR codes.
-# Format: AB-XXXX-YY  (prefix + 4 random digits + 2 random uppercase letters)
+# Format: AB-XXXX-YY  (prefix + 4 digits + 2 uppercase letters)
 # Example: AB-4829-KT
 #
+# Codes are allocated, not drawn at random: each order takes the next value
+# of a sequence (tracking_code_seq on PostgreSQL) and the value goes
+# through a keyed Feistel permutation of the code space (10,000 × 676 =
+# 6,760,000 codes, seen as 2600 × 2600). Consecutive orders therefore get
+# codes that look random, and two values below 6.76M can never give the
+# same code: no lookup is needed. The unique constraint on
+# ecommerce_orders.tracking_code stays as a safety net (codes issued before
+# the allocator, changed key, more than 6.76M orders): the caller retries
+# with the next value.
+#
 # The QR code encodes the full public tracking URL so customers can scan
 # it directly without needing to type anything.
 #
-import random
-import string
-import base64
+# QR PNGs are rendered once per tracking code (PyPNG is pure Python, so a
+# render is CPU-heavy) and stored content-addressed: the file name is the
+# SHA-256 of the encoded URL + render settings, under QR_CACHE_DIR, with a
+# small in-process LRU in front. Served by GET /public/track/{code}/qr.png
+# with the digest as ETag: the content of a code never changes, so
+# browsers / CDNs may keep it for a year.
+#
+import hashlib
+import hmac
 import io
+import logging
 import os
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Tuple
 
 import qrcode
 from qrcode.image.pure import PyPNGImage
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from models.ecommerce_order import EcommerceOrder, tracking_code_sequence
+
+logger = logging.getLogger(__name__)
 
 # ── Config ────────────────────────────────────────────────────────────────────
 
 # Prefix shown in the code — change to match your brand (e.g. "DZ", "MED", "AB")
 CODE_PREFIX = os.getenv("TRACKING_CODE_PREFIX", "AB")
 
+# Key of the permutation: keep it secret and stable (changing it only costs
+# a few retries on already issued codes)
+TRACKING_CODE_KEY = (
+    os.getenv("TRACKING_CODE_KEY") or os.getenv("SECRET_KEY") or "tracking-codes"
+).encode()
+
 # Base URL of your public storefront — used to build the QR code URL
 # e.g. https://yoursite.dz/track?code=AB-4829-KT
 STOREFRONT_URL = os.getenv("STOREFRONT_URL", "https://yoursite.dz")
 
+# Public base URL of this API, prefixed to the QR image URL returned at
+# checkout (empty → relative URL, e.g. /public/track/AB-4829-KT/qr.png)
+PUBLIC_API_URL = os.getenv("PUBLIC_API_URL", "").rstrip("/")
 
-# ── Code generation ───────────────────────────────────────────────────────────
+# Rendered QR PNGs (content-addressed, safe to delete: they are re-rendered)
+QR_CACHE_DIR = os.getenv("QR_CACHE_DIR", os.path.join("data", "qr_cache"))
+QR_MEMORY_CACHE_ENTRIES = int(os.getenv("QR_MEMORY_CACHE_ENTRIES", "256"))
 
+# Part of the content address: change it when the rendering below changes
+_QR_RENDER_SETTINGS = "v1:M:8:3"
 
-def generate_tracking_code() -> str:
-    """
-    Generate a short, readable tracking code.
-    Format: {PREFIX}-{4 digits}-{2 uppercase letters}
-    Example: AB-4829-KT
 
-    Collision probability is negligible for typical COD volumes
-    (10,000 * 676 = ~6.7M combinations per prefix).
-    The caller (order creation) should verify uniqueness in DB and retry if needed.
+# ── Code allocation ───────────────────────────────────────────────────────────
+
+_LETTERS = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+_HALF = 2600  # the code space is _HALF × _HALF
+CODE_SPACE = _HALF * _HALF  # 10,000 × 676
+_FEISTEL_ROUNDS = 8
+
+
+def _round_value(epoch: int, round_index: int, value: int) -> int:
+    digest = hmac.new(
+        TRACKING_CODE_KEY, f"{epoch}:{round_index}:{value}".encode(), hashlib.sha256
+    ).digest()
+    return int.from_bytes(digest[:8], "big") % _HALF
+
+
+def permute(index: int, epoch: int = 0) -> int:
+    """
+    Bijection of [0, CODE_SPACE): each round maps (left, right) to
+    (right, left + F(right) mod 2600), which can always be undone.
+    `epoch` selects another permutation (used once the space is exhausted).
     """
-    digits = "".join(random.choices(string.digits, k=4))
-    letters = "".join(random.choices(string.ascii_uppercase, k=2))
-    return f"{CODE_PREFIX}-{digits}-{letters}"
+    left, right = divmod(index, _HALF)
+    for round_index in range(_FEISTEL_ROUNDS):
+        left, right = right, (left + _round_value(epoch, round_index, right)) % _HALF
+    return left * _HALF + right
 
 
-# ── QR code generation ────────────────────────────────────────────────────────
+def format_tracking_code(value: int) -> str:
+    """0 ≤ value < CODE_SPACE → {PREFIX}-{4 digits}-{2 letters}"""
+    digits, letters = divmod(value, len(_LETTERS) ** 2)
+    return f"{CODE_PREFIX}-{digits:04d}-{_LETTERS[letters // 26]}{_LETTERS[letters % 26]}"
+
+
+def tracking_code_for(sequence_value: int) -> str:
+    """Tracking code of the n-th allocation (n ≥ 1)"""
+    epoch, index = divmod(sequence_value - 1, CODE_SPACE)
+    return format_tracking_code(permute(index, epoch))
 
 
-def generate_qr_base64(tracking_code: str) -> str:
+def next_tracking_code(db: Session, attempt: int = 0) -> str:
     """
-    Generate a QR code PNG for the given tracking code.
-    The QR code encodes the full tracking URL:
-      {STOREFRONT_URL}/track?code={tracking_code}
+    Allocate a tracking code in the current transaction.
 
-    Returns a base64-encoded PNG string (no data URI prefix).
-    The frontend can use it as:
-      <img src="data:image/png;base64,{result}" />
+    PostgreSQL: next value of tracking_code_seq (never blocks, never reused).
+    Other dialects (SQLite in local development, one writer at a time):
+    highest order id + 1 + attempt.
     """
-    tracking_url = f"{STOREFRONT_URL}/track?code={tracking_code}"
+    if db.get_bind().dialect.name == "postgresql":
+        value = db.scalar(tracking_code_sequence.next_value())
+    else:
+        value = db.scalar(select(func.coalesce(func.max(EcommerceOrder.id), 0))) + 1 + attempt
+    return tracking_code_for(value)
+
+
+# ── QR code generation ────────────────────────────────────────────────────────
+
+
+def tracking_url(tracking_code: str) -> str:
+    """Storefront page encoded in the QR code"""
+    return f"{STOREFRONT_URL}/track?code={tracking_code}"
 
+
+def qr_code_url(tracking_code: str) -> str:
+    """URL of the cached QR image (GET /public/track/{code}/qr.png)"""
+    return f"{PUBLIC_API_URL}/public/track/{tracking_code}/qr.png"
+
+
+def render_qr_png(data: str) -> bytes:
+    """Render `data` as a QR code PNG (pure Python PNG backend, no Pillow)"""
     qr = qrcode.QRCode(
         version=1,
         error_correction=qrcode.constants.ERROR_CORRECT_M,
         box_size=8,
         border=3,
     )
-    qr.add_data(tracking_url)
+    qr.add_data(data)
     qr.make(fit=True)
 
-    # Use pure Python PNG backend — no Pillow required
     img = qr.make_image(image_factory=PyPNGImage)
 
     buffer = io.BytesIO()
     img.save(buffer)
-    buffer.seek(0)
+    return buffer.getvalue()
+
+
+# ── QR asset cache ────────────────────────────────────────────────────────────
+
+_memory: "OrderedDict[str, bytes]" = OrderedDict()
+_memory_lock = threading.Lock()
+
+
+def _digest(data: str) -> str:
+    return hashlib.sha256(f"{_QR_RENDER_SETTINGS}|{data}".encode()).hexdigest()
+
+
+def _path(digest: str) -> str:
+    return os.path.join(QR_CACHE_DIR, digest[:2], f"{digest}.png")
 
-    return base64.b64encode(buffer.read()).decode("utf-8")
+
+def _remember(digest: str, png: bytes) -> None:
+    with _memory_lock:
+        _memory[digest] = png
+        _memory.move_to_end(digest)
+        while len(_memory) > QR_MEMORY_CACHE_ENTRIES:
+            _memory.popitem(last=False)
+
+
+def _write_atomic(path: str, png: bytes) -> None:
+    """Concurrent renders of the same code end with one complete file"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(png)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+def tracking_qr_digest(tracking_code: str) -> str:
+    """Content address of the QR code of `tracking_code` (no render)"""
+    return _digest(tracking_url(tracking_code))
+
+
+def tracking_qr_png(tracking_code: str) -> Tuple[bytes, str]:
+    """
+    (PNG bytes, digest) of the QR code of `tracking_code`: memory, then disk,
+    rendered and stored on the first call only. Blocking (file I/O, render).
+    """
+    data = tracking_url(tracking_code)
+    digest = tracking_qr_digest(tracking_code)
+    with _memory_lock:
+        png = _memory.get(digest)
+        if png is not None:
+            _memory.move_to_end(digest)
+            return png, digest
+
+    path = _path(digest)
+    try:
+        with open(path, "rb") as f:
+            png = f.read()
+    except FileNotFoundError:
+        png = render_qr_png(data)
+        try:
+            _write_atomic(path, png)
+        except OSError as e:
+            # read-only / full disk: still served, rendered again next time
+            logger.warning(f"Could not store QR code {path}: {e}")
+    _remember(digest, png)
+    return png, digest
+
+
+def prerender_tracking_qr(tracking_code: str) -> None:
+    """Warm the cache after checkout (run as a background task)"""
+    tracking_qr_png(tracking_code)
 
 
 def generate_tracking_assets(tracking_code: str) -> dict:
     """
-    Convenience wrapper — returns both the code and the QR base64.
+    Tracking links returned at checkout (the QR image is fetched from
+    qr_code_url, not inlined)
     """
     return {
         "tracking_code": tracking_code,
-        "qr_code_base64": generate_qr_base64(tracking_code),
-        "tracking_url": f"{STOREFRONT_URL}/track?code={tracking_code}",
+        "qr_code_url": qr_code_url(tracking_code),
+        "tracking_url": tracking_url(tracking_code),
     }